@@ -4,31 +4,181 @@ FastAPI 后端服务
 """
 
 import os
-import shutil
+import json
+import asyncio
+import hashlib
 import traceback
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Optional, Dict
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Iterable
+from urllib.parse import parse_qs
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
 # 导入自定义模块
 from src.config import config
+from src.models import Question, OCRResult
+from src.image_processor import image_processor
 from src.ocr_service import ocr_service
 from src.question_splitter import question_splitter
 from src.exporter import exporter
-from src.utils import validate_image_file
+from src.job_queue import job_manager, Job, JOB_DONE, JOB_FAILED
+from src.document_store import document_store, StoredDocument
+from src.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.tracing import Trace, trace_log, current_trace, start_trace, end_trace
+from src.question_editor import question_editor, EditDelta, EditError
+from src.upload_store import upload_store, IngestedUpload, UploadRejected
+from src.pdf_processor import pdf_processor, PDFError, MIN_DPI, MAX_DPI
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时预热 OCR 连接池并启动后台任务 worker，关闭时释放资源"""
+    await ocr_service.warmup_async()
+    await job_manager.start(_run_ocr_job)
+    await upload_store.start()
+    yield
+    await upload_store.stop()
+    await job_manager.stop()
+    await ocr_service.aclose()
 
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title="AI 智能切题工具 API",
     description="自动识别、分割图片中的题目",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# 上传的图片随引用它的识别结果和排队中的任务保留，不会被超时清理或容量淘汰提前删除
+upload_store.add_pin_source(document_store.image_paths)
+upload_store.add_pin_source(
+    lambda: [payload['image_path'] for payload in job_manager.active_payloads() if 'image_path' in payload]
+)
+
+# multipart 表单中每个文件除内容以外的开销（边界、字段头等）
+MULTIPART_OVERHEAD = 64 * 1024
+
+# 上传接口路径 -> (单次请求最多包含的文件数, 单个文件的最大字节数)
+UPLOAD_ENDPOINTS = {
+    '/api/upload': (1, config.upload_max_file_bytes),
+    '/api/upload/stream': (1, config.upload_max_file_bytes),
+    '/api/upload/batch': (config.batch_max_files, config.upload_max_file_bytes),
+    '/api/upload/pdf': (1, config.pdf_max_file_bytes),
+    '/api/jobs': (1, config.upload_max_file_bytes),
+}
+
+
+class _RequestBodyTooLarge(Exception):
+    """请求体在读取过程中超过上限"""
+
+
+class UploadSizeLimitMiddleware:
+    """
+    拒绝过大的上传请求
+    
+    - 有 Content-Length 时在读取请求体之前拒绝
+    - 没有 Content-Length（分块传输）时边读边计数，超过上限立即停止读取并返回 413
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] not in UPLOAD_ENDPOINTS:
+            await self.app(scope, receive, send)
+            return
+
+        max_files, max_file_bytes = UPLOAD_ENDPOINTS[scope['path']]
+        limit = (max_file_bytes + MULTIPART_OVERHEAD) * max_files
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"上传内容过大，单个文件不能超过 {max_file_bytes // (1024 * 1024)}MB"}
+        )
+        content_length = dict(scope['headers']).get(b'content-length', b'')
+        if content_length.isdigit() and int(content_length) > limit:
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+
+        async def receive_with_limit():
+            nonlocal received, exceeded
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    exceeded = True
+                    raise _RequestBodyTooLarge()
+            return message
+
+        async def send_unless_exceeded(message):
+            # 超过上限后丢弃应用自己的错误响应（表单解析可能把异常转换为 400）
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, receive_with_limit, send_unless_exceeded)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded:
+            await response(scope, receive, send)
+
+
+class TracingMiddleware:
+    """
+    为每个请求创建追踪记录，在响应头中返回追踪 ID 和各阶段耗时（Server-Timing）
+    
+    - 请求头 X-Trace-Id 合法时沿用该 ID，否则生成新的 ID
+    - 流式响应的响应头在开始输出时发送，只包含此前完成的阶段；完整记录写入追踪日志
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        trace_id = dict(scope['headers']).get(b'x-trace-id', b'').decode('latin-1')
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        trace = Trace(
+            trace_id=trace_id or None,
+            method=scope['method'],
+            path=scope['path'],
+            debug=query.get('debug', [''])[0].lower() in ('1', 'true')
+        )
+        
+        async def send_with_trace(message):
+            if message['type'] == 'http.response.start':
+                trace.status = message['status']
+                message = {**message, 'headers': list(message.get('headers', [])) + [
+                    (b'x-trace-id', trace.trace_id.encode('latin-1')),
+                    (b'server-timing', trace.server_timing().encode('latin-1')),
+                ]}
+            await send(message)
+        
+        token = start_trace(trace)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            end_trace(token)
+            # 只记录经过处理阶段的请求（不记录图片、统计等简单请求）
+            if trace_log is not None and trace.spans:
+                await asyncio.to_thread(trace_log.write, trace)
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # 配置 CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,12 +186,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "Server-Timing"],
 )
 
-# 临时文件目录
-TEMP_DIR = Path("temp_uploads")
-TEMP_DIR.mkdir(exist_ok=True)
-
+# 请求追踪放在最外层，被拒绝的请求也带有追踪 ID
+app.add_middleware(TracingMiddleware)
 
 # ============ 数据模型 ============
 
@@ -51,6 +200,7 @@ class QuestionResponse(BaseModel):
     text: str
     has_bounding_box: bool
     bounding_box: Optional[Dict[str, float]] = None  # 边界框坐标 {x1, y1, x2, y2}
+    block_ids: List[int] = []  # 文本块编号（与点选 / 框选结果中的 index 对应）
 
 
 class OCRResponse(BaseModel):
@@ -59,14 +209,488 @@ class OCRResponse(BaseModel):
     message: str
     questions: List[QuestionResponse]
     image_url: str
+    document_id: Optional[str] = None  # 识别结果的文档 ID，用于导出等后续请求
+    preview_url: Optional[str] = None  # 缩小后的预览图地址（用于显示，坐标仍基于原图尺寸）
+    image_width: Optional[int] = None  # 原图宽度
+    image_height: Optional[int] = None  # 原图高度
+    raw_response_id: Optional[str] = None  # 原始 API 响应的结果 ID（通过 /api/raw-responses/{id} 查看）
+    debug: Optional[Dict[str, Any]] = None  # 本次请求的追踪记录（请求带 ?debug=true 时返回）
+
+
+class BlockHitResponse(BaseModel):
+    """查询命中的文本块"""
+    index: int  # 文本块在文档中的编号
+    question_id: int  # 所属题目 ID
+    text: str
+    bounding_box: Dict[str, float]  # 边界框坐标 {x1, y1, x2, y2}
+
+
+class SpatialQueryResponse(BaseModel):
+    """点选 / 框选查询响应模型"""
+    question_ids: List[int]  # 命中的题目 ID
+    blocks: List[BlockHitResponse]  # 命中的文本块
+
+
+class MergeRequest(BaseModel):
+    """合并题目请求模型"""
+    question_ids: List[int]  # 要合并的题目 ID（至少两道）
+
+
+class SplitRequest(BaseModel):
+    """拆分题目请求模型"""
+    question_id: int
+    block: int  # 文本块编号，该文本块及之后的文本块成为新题目
+
+
+class MoveBlockRequest(BaseModel):
+    """移动文本块请求模型"""
+    block: int  # 文本块编号
+    question_id: int  # 目标题目 ID
+
+
+class EditResponse(BaseModel):
+    """题目编辑响应模型（只返回变化的题目）"""
+    success: bool
+    updated: List[QuestionResponse]  # 新增或内容变化的题目
+    removed: List[int]  # 被删除的题目 ID
+    order: List[int]  # 编辑后全部题目 ID（按文档中的顺序）
 
 
 class ExportRequest(BaseModel):
     """导出请求模型"""
+    document_id: str  # 上传时返回的文档 ID
     question_ids: List[int]
     export_format: str = 'both'  # 'text', 'image', 'both'
 
 
+class JobStatusResponse(BaseModel):
+    """后台任务状态响应模型"""
+    job_id: str
+    status: str  # 'pending', 'running', 'done', 'failed'
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class BatchItemResponse(OCRResponse):
+    """批量上传中单张图片的响应模型"""
+    index: int  # 图片在上传列表中的序号
+    filename: Optional[str] = None
+
+
+class PDFPageResponse(OCRResponse):
+    """PDF 中单页的响应模型"""
+    page: int  # 页码（从 1 开始）
+    page_count: int  # PDF 总页数
+
+
+# ============ 辅助函数 ============
+
+# 正在执行的后台任务（保留引用，避免任务被垃圾回收）
+_background_tasks: set = set()
+
+
+async def _ingest_upload(file: UploadFile, keep_data: bool = True) -> IngestedUpload:
+    """
+    校验文件类型，单次读取上传内容完成大小限制、格式判断、哈希计算和写入
+    
+    Args:
+        file: 上传的文件
+        keep_data: 是否保留文件内容；为 False 时（批量上传）返回的 data 为 None，
+            预览图也从存储读取，不会有多个文件的内容同时留在内存中
+        
+    Returns:
+        IngestedUpload: 存储后的文件信息（保留文件内容时后续识别无需再次读取）
+        
+    Raises:
+        HTTPException: 文件名无效、格式不支持、文件过大或图片损坏
+    """
+    # 验证文件类型
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="文件名无效")
+    
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in ['.jpg', '.jpeg', '.png', '.bmp']:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的文件格式: {file_ext}"
+        )
+    
+    # 读取并保存上传的文件（磁盘 I/O 放到线程池，避免阻塞事件循环）
+    try:
+        with metrics.stage('ingest'):
+            upload = await run_in_threadpool(upload_store.ingest, file.file, config.upload_max_file_bytes)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    metrics.add_received('upload', upload.bytes_read)
+    
+    if not keep_data:
+        upload.data = None
+    
+    # 在后台生成预览图（与 OCR 识别并行，有内存中的图片内容时直接使用）
+    _schedule_previews(upload.path.name, upload.data)
+    return upload
+
+
+def _schedule_previews(name: str, data: Optional[bytes] = None):
+    """在后台线程中生成图片的预览图"""
+    task = asyncio.create_task(run_in_threadpool(upload_store.ensure_previews, name, data))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _ingest_pdf(file: UploadFile) -> IngestedUpload:
+    """
+    校验并保存上传的 PDF（内容直接写入磁盘，不保留在内存中）
+    
+    Raises:
+        HTTPException: 文件名无效、不是 PDF 或文件过大
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="文件名无效")
+    
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext != '.pdf':
+        raise HTTPException(status_code=400, detail=f"不支持的文件格式: {file_ext}")
+    
+    try:
+        with metrics.stage('ingest_pdf'):
+            upload = await run_in_threadpool(upload_store.ingest_pdf, file.file, config.pdf_max_file_bytes)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    metrics.add_received('pdf', upload.bytes_read)
+    return upload
+
+
+async def _recognize_pdf_page(pdf: IngestedUpload, page: int, dpi: int) -> StoredDocument:
+    """
+    光栅化 PDF 的一页并识别、分割题目
+    
+    页面图片和 OCR 缓存都以 (PDF 哈希, 页码, DPI) 为键，重复上传同一 PDF 时
+    已渲染的页面直接从存储读取，已识别的页面直接命中缓存。
+    
+    Args:
+        pdf: 已保存的 PDF
+        page: 页码（从 1 开始）
+        dpi: 光栅化分辨率
+        
+    Returns:
+        StoredDocument: 该页的识别结果
+    """
+    page_key = hashlib.sha256(f"{pdf.content_hash}:{page}:{dpi}".encode('utf-8')).hexdigest()
+    page_name = f"{page_key}.png"
+    
+    image_path = await run_in_threadpool(upload_store.resolve, page_name)
+    image_data = None
+    if image_path is None:
+        pdf_path = await run_in_threadpool(upload_store.resolve, pdf.path.name)
+        if pdf_path is None:
+            raise PDFError("PDF 文件已过期，请重新上传", status_code=404)
+        with metrics.stage('pdf_render'):
+            image_data = await run_in_threadpool(pdf_processor.render_page, str(pdf_path), page, dpi)
+        image_path = await run_in_threadpool(upload_store.store, image_data, page_name)
+        _schedule_previews(page_name, image_data)
+    
+    return await _recognize_and_split(image_path, page_key, image_data)
+
+
+async def _recognize_and_split(
+    image_path: Path,
+    image_hash: Optional[str] = None,
+    image_data: Optional[bytes] = None
+) -> StoredDocument:
+    """
+    对图片进行 OCR 识别并分割题目，结果保存到文档存储
+    
+    Args:
+        image_path: 图片路径
+        image_hash: 图片内容哈希（上传时已计算）
+        image_data: 已在内存中的图片内容（提供时不再读取文件）
+        
+    Returns:
+        StoredDocument: 保存的文档（包含题目列表）
+    """
+    # 调用 OCR 服务（异步请求，等待期间不阻塞其他请求）
+    ocr_result = await ocr_service.recognize_image_async(
+        str(image_path), image_hash=image_hash, image_data=image_data
+    )
+    return await _split_and_store(ocr_result, image_path, image_data)
+
+
+async def _split_and_store(
+    ocr_result: OCRResult,
+    image_path: Path,
+    image_data: Optional[bytes] = None
+) -> StoredDocument:
+    """
+    分割题目并将结果保存到文档存储
+    
+    Args:
+        ocr_result: OCR 识别结果
+        image_path: 图片路径
+        image_data: 已在内存中的图片内容（提供时不再读取文件）
+        
+    Returns:
+        StoredDocument: 保存的文档
+    """
+    # 分割题目（使用 OCR 结果进行分割，保留边界框坐标）
+    with metrics.stage('split'):
+        questions = question_splitter.split_ocr_result(ocr_result)
+    with metrics.stage('image_size'):
+        image_size = await run_in_threadpool(image_processor.get_image_size, str(image_path), image_data)
+    with metrics.stage('store'):
+        document = document_store.put(questions, str(image_path), image_size, ocr_result.raw_response_id)
+    metrics.observe_page(len(ocr_result.text_blocks), len(questions))
+    return document
+
+
+def _resolve_upload(filename: str) -> Path:
+    """
+    通过上传文件存储的索引查找图片
+    
+    Raises:
+        HTTPException: 图片不存在或已被清理
+    """
+    file_path = upload_store.resolve(filename)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="图片不存在或已过期")
+    return file_path
+
+
+def _get_document(document_id: str) -> StoredDocument:
+    """
+    查询文档
+    
+    Raises:
+        HTTPException: 文档不存在或已过期
+    """
+    document = document_store.get(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="文档不存在或已过期，请重新上传图片")
+    return document
+
+
+def _select_export(request: ExportRequest):
+    """
+    查找要导出的题目和原图路径
+    
+    Returns:
+        (题目列表, 原图路径)
+    
+    Raises:
+        HTTPException: 文档或原图不存在，或未找到指定的题目
+    """
+    document = _get_document(request.document_id)
+    image_path = document.image_path
+    if request.export_format in ('image', 'both'):
+        # 导出图片时通过上传文件存储的索引查找原图（同时刷新访问时间）
+        image_path = str(_resolve_upload(Path(image_path).name))
+    
+    # 筛选要导出的题目
+    question_ids = set(request.question_ids)
+    selected_questions = [
+        q for q in document.questions if q.question_id in question_ids
+    ]
+    
+    if not selected_questions:
+        raise HTTPException(status_code=400, detail="未找到指定的题目")
+    return selected_questions, image_path
+
+
+def _build_question_response(question: Question, document: StoredDocument) -> QuestionResponse:
+    """将题目转换为响应模型"""
+    box = question.bounding_box
+    return QuestionResponse(
+        question_id=question.question_id,
+        text=question.text,
+        has_bounding_box=box is not None,
+        bounding_box={
+            'x1': box.x1,
+            'y1': box.y1,
+            'x2': box.x2,
+            'y2': box.y2
+        } if box else None,
+        block_ids=document.index.block_ids(question) if document.index else []
+    )
+
+
+def _build_edit_response(document: StoredDocument, delta: EditDelta) -> EditResponse:
+    """构造题目编辑响应"""
+    return EditResponse(
+        success=True,
+        updated=[_build_question_response(q, document) for q in delta.updated],
+        removed=delta.removed,
+        order=[q.question_id for q in document.questions]
+    )
+
+
+def _build_spatial_response(
+    document: StoredDocument,
+    question_ids: List[int],
+    blocks: List[int]
+) -> SpatialQueryResponse:
+    """构造点选 / 框选查询响应"""
+    index = document.index
+    return SpatialQueryResponse(
+        question_ids=question_ids,
+        blocks=[
+            BlockHitResponse(
+                index=i,
+                question_id=index.block_questions[i],
+                text=index.blocks[i].text,
+                bounding_box={
+                    'x1': index.blocks[i].box.x1,
+                    'y1': index.blocks[i].box.y1,
+                    'x2': index.blocks[i].box.x2,
+                    'y2': index.blocks[i].box.y2
+                }
+            )
+            for i in blocks
+        ]
+    )
+
+
+def _build_ocr_response(
+    document: StoredDocument,
+    response_model: type = OCRResponse,
+    **extra_fields
+) -> OCRResponse:
+    """
+    构造 OCR 响应
+    
+    Args:
+        document: 识别结果文档
+        response_model: 响应模型类（OCRResponse 或其子类）
+        **extra_fields: 子类额外的字段
+        
+    Returns:
+        OCRResponse: 响应模型
+    """
+    with metrics.stage('response'):
+        questions = document.questions
+        image_url = f"/api/image/{Path(document.image_path).name}"
+        preview_url = None
+        if config.preview_default_width in config.preview_widths:
+            preview_url = f"{image_url}?size={config.preview_default_width}"
+        width, height = document.image_size or (None, None)
+        response = response_model(
+            success=True,
+            message=f"成功识别并分割出 {len(questions)} 道题目",
+            questions=[_build_question_response(q, document) for q in questions],
+            image_url=image_url,
+            document_id=document.document_id,
+            preview_url=preview_url,
+            image_width=width,
+            image_height=height,
+            raw_response_id=document.raw_response_id,
+            **extra_fields
+        )
+    
+    # 调试信息在构造响应之后生成，包含构造响应的耗时
+    trace = current_trace()
+    if trace is not None and trace.debug:
+        response.debug = trace.to_dict()
+    return response
+
+
+def _metered_zip(chunks: Iterable[bytes]) -> Iterable[bytes]:
+    """统计 ZIP 导出的耗时（从开始生成到最后一个片段发出）和输出字节数"""
+    with metrics.stage('export_zip'):
+        for chunk in chunks:
+            metrics.add_sent('export_zip', len(chunk))
+            yield chunk
+
+
+async def _run_ocr_job(job: Job) -> OCRResponse:
+    """
+    后台任务处理函数：OCR 识别并分割题目
+    
+    Args:
+        job: 后台任务，payload 中包含 image_path
+        
+    Returns:
+        OCRResponse: 识别结果
+    """
+    document = await _recognize_and_split(Path(job.payload['image_path']), job.payload.get('image_hash'))
+    return _build_ocr_response(document)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """
+    格式化一条 Server-Sent Events 消息
+    
+    Args:
+        event: 事件类型
+        data: 事件数据（序列化为 JSON）
+        
+    Returns:
+        str: SSE 消息文本
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _build_batch_error(index: int, filename: Optional[str], message: str) -> BatchItemResponse:
+    """构造批量上传中单张图片的失败响应"""
+    return BatchItemResponse(
+        index=index,
+        filename=filename,
+        success=False,
+        message=message,
+        questions=[],
+        image_url=""
+    )
+
+
+def _build_page_error(page: int, page_count: int, message: str) -> PDFPageResponse:
+    """构造 PDF 中单页的失败响应"""
+    return PDFPageResponse(
+        page=page,
+        page_count=page_count,
+        success=False,
+        message=message,
+        questions=[],
+        image_url=""
+    )
+
+
+async def _stream_as_completed(items: Iterable[Awaitable[BaseModel]]) -> AsyncIterator[str]:
+    """
+    并发执行并按完成顺序输出 NDJSON 行
+    
+    Args:
+        items: 返回响应模型的协程
+        
+    Yields:
+        str: 每个响应序列化后的一行 JSON
+    """
+    tasks = [asyncio.create_task(item) for item in items]
+    try:
+        for task in asyncio.as_completed(tasks):
+            item = await task
+            yield json.dumps(jsonable_encoder(item), ensure_ascii=False) + "\n"
+    finally:
+        # 客户端断开时取消尚未完成的识别任务
+        for task in tasks:
+            task.cancel()
+
+
+async def _unpin_after(name: str, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    转发流式输出，输出结束（或客户端断开）后解除上传文件的固定
+    
+    Args:
+        name: 处理期间固定的文件名
+        stream: 要转发的流
+    """
+    try:
+        async for line in stream:
+            yield line
+    finally:
+        await stream.aclose()
+        upload_store.unpin(name)
+
+
 # ============ API 端点 ============
 
 @app.get("/")
@@ -90,103 +714,281 @@ async def health_check():
     }
 
 
+@app.get("/api/pool/stats")
+async def pool_stats():
+    """OCR API 连接池统计（用于根据流量调整连接池大小）"""
+    return ocr_service.get_pool_stats()
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """OCR 结果缓存统计"""
+    return ocr_service.get_cache_stats()
+
+
+@app.get("/api/raw-responses/stats")
+async def raw_response_stats():
+    """原始 API 响应保留统计"""
+    return ocr_service.get_raw_response_stats()
+
+
+@app.get("/api/raw-responses/{result_id}")
+async def get_raw_response(result_id: str):
+    """获取写入磁盘日志的原始 API 响应（用于调试）"""
+    raw_response = await run_in_threadpool(ocr_service.get_raw_response, result_id)
+    if raw_response is None:
+        raise HTTPException(status_code=404, detail="原始响应不存在或已被清理")
+    return raw_response
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    监控指标（Prometheus 文本格式）
+    
+    - 各处理阶段的耗时直方图及异常计数、收发字节数、每页文本块数和题目数
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="未启用监控指标（METRICS_ENABLED=false）")
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/preprocess/stats")
+async def preprocess_stats():
+    """图片预处理统计（节省的上传字节数和耗时）"""
+    return ocr_service.get_preprocess_stats()
+
+
 @app.post("/api/upload", response_model=OCRResponse)
 async def upload_and_process(file: UploadFile = File(...)):
     """
     上传图片并进行 OCR 识别和题目分割
     """
     try:
-        # 验证文件类型
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="文件名无效")
+        # 保存并验证上传的文件
+        upload = await _ingest_upload(file)
         
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in ['.jpg', '.jpeg', '.png', '.bmp']:
-            raise HTTPException(
-                status_code=400,
-                detail=f"不支持的文件格式: {file_ext}"
-            )
-        
-        # 保存上传的文件
-        temp_file_path = TEMP_DIR / file.filename
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # 验证图片文件
-        is_valid, error_msg = validate_image_file(str(temp_file_path))
-        if not is_valid:
-            temp_file_path.unlink()
-            raise HTTPException(status_code=400, detail=error_msg)
-        
-        # 调用 OCR 服务
-        ocr_result = ocr_service.recognize_image(str(temp_file_path))
-
-        # 分割题目（使用 OCR 结果进行分割，保留边界框坐标）
-        questions = question_splitter.split_ocr_result(ocr_result)
+        # OCR 识别并分割题目（直接使用内存中的图片内容），结果按文档 ID 保存，导出时通过 document_id 引用
+        document = await _recognize_and_split(upload.path, upload.content_hash, upload.data)
 
-        # 构造响应
-        question_responses = [
-            QuestionResponse(
-                question_id=q.question_id,
-                text=q.text,
-                has_bounding_box=q.bounding_box is not None,
-                bounding_box={
-                    'x1': q.bounding_box.x1,
-                    'y1': q.bounding_box.y1,
-                    'x2': q.bounding_box.x2,
-                    'y2': q.bounding_box.y2
-                } if q.bounding_box else None
-            )
-            for q in questions
-        ]
-        
-        # 将题目和图片路径存储在全局变量中（简化版，生产环境应使用数据库）
-        app.state.current_questions = questions
-        app.state.current_image_path = str(temp_file_path)
-
-        # 构造图片 URL
-        image_url = f"/api/image/{temp_file_path.name}"
-
-        return OCRResponse(
-            success=True,
-            message=f"成功识别并分割出 {len(questions)} 道题目",
-            questions=question_responses,
-            image_url=image_url
-        )
+        return _build_ocr_response(document)
     
+    except HTTPException:
+        raise
     except Exception as e:
         error_detail = f"处理失败: {str(e)}"
         print(f"\n❌ 错误详情:\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_detail)
 
 
+@app.post("/api/upload/stream")
+async def upload_and_stream(file: UploadFile = File(...)):
+    """
+    上传图片并流式返回识别结果（Server-Sent Events）
+    
+    事件类型：
+    - start: 图片已接收，data 中包含 image_url
+    - block: 识别出一个完整的文本块，data 中包含 index、text 和 bounding_box
+    - result: 识别完成，data 为完整的 OCRResponse（已分割题目）
+    - error: 处理失败，data 中包含 message
+    """
+    upload = await _ingest_upload(file)
+    temp_file_path = upload.path
+    
+    async def event_stream():
+        yield _sse_event('start', {'image_url': f"/api/image/{temp_file_path.name}"})
+        try:
+            index = 0
+            async for event, data in ocr_service.recognize_image_stream(
+                str(temp_file_path), image_hash=upload.content_hash, image_data=upload.data
+            ):
+                if event == 'block':
+                    yield _sse_event('block', {
+                        'index': index,
+                        'text': data.text,
+                        'bounding_box': {
+                            'x1': data.box.x1,
+                            'y1': data.box.y1,
+                            'x2': data.box.x2,
+                            'y2': data.box.y2
+                        }
+                    })
+                    index += 1
+                else:
+                    document = await _split_and_store(data, temp_file_path, upload.data)
+                    response = _build_ocr_response(document)
+                    yield _sse_event('result', jsonable_encoder(response))
+        except Exception as e:
+            print(f"\n❌ 错误详情:\n{traceback.format_exc()}")
+            yield _sse_event('error', {'message': f"处理失败: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """
+    批量上传图片，并发进行 OCR 识别和题目分割
+    
+    以 NDJSON 流返回结果：每张图片处理完成后立即输出一行 BatchItemResponse，
+    输出顺序为完成顺序，通过 index 字段对应上传顺序。
+    """
+    if len(files) > config.batch_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多上传 {config.batch_max_files} 张图片"
+        )
+    
+    # 先保存并验证所有文件（响应开始流式输出后上传文件会被关闭）
+    # 批量上传不在内存中保留图片内容，识别时再从存储读取
+    saved_files = []
+    for index, file in enumerate(files):
+        try:
+            upload = await _ingest_upload(file, keep_data=False)
+            saved_files.append((index, file.filename, upload.path, upload.content_hash, None))
+        except HTTPException as e:
+            saved_files.append((index, file.filename, None, None, e.detail))
+    
+    semaphore = asyncio.Semaphore(config.batch_concurrency)
+    
+    async def process(
+        index: int,
+        filename: str,
+        temp_file_path: Optional[Path],
+        image_hash: Optional[str],
+        error: Optional[str]
+    ):
+        if error is not None:
+            return _build_batch_error(index, filename, error)
+        async with semaphore:
+            try:
+                document = await _recognize_and_split(temp_file_path, image_hash)
+            except Exception as e:
+                print(f"\n❌ 错误详情 ({filename}):\n{traceback.format_exc()}")
+                return _build_batch_error(index, filename, f"处理失败: {str(e)}")
+        return _build_ocr_response(
+            document, response_model=BatchItemResponse, index=index, filename=filename
+        )
+    
+    return StreamingResponse(
+        _stream_as_completed(process(*item) for item in saved_files),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/api/upload/pdf")
+async def upload_pdf(file: UploadFile = File(...), dpi: Optional[int] = Form(None)):
+    """
+    上传 PDF，逐页光栅化并识别、分割题目
+    
+    页面按需逐页渲染，同时处理的页数不超过 PDF_PAGE_CONCURRENCY，内存占用与总页数无关。
+    以 NDJSON 流返回结果：每页处理完成后立即输出一行 PDFPageResponse，
+    输出顺序为完成顺序，通过 page 字段对应页码。
+    """
+    dpi = dpi or pdf_processor.dpi
+    if not MIN_DPI <= dpi <= MAX_DPI:
+        raise HTTPException(status_code=400, detail=f"DPI 必须在 {MIN_DPI} 到 {MAX_DPI} 之间")
+    
+    upload = await _ingest_pdf(file)
+    # 逐页渲染期间固定 PDF，避免中途被容量淘汰或超时清理
+    upload_store.pin(upload.path.name)
+    try:
+        page_count = await run_in_threadpool(pdf_processor.page_count, str(upload.path))
+    except PDFError as e:
+        upload_store.unpin(upload.path.name)
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    semaphore = asyncio.Semaphore(config.pdf_page_concurrency)
+    
+    async def process(page: int):
+        # 获得并发许可后才开始渲染，尚未轮到的页面不占用内存
+        async with semaphore:
+            try:
+                document = await _recognize_pdf_page(upload, page, dpi)
+            except Exception as e:
+                print(f"\n❌ 错误详情 ({file.filename} 第 {page} 页):\n{traceback.format_exc()}")
+                return _build_page_error(page, page_count, f"处理失败: {str(e)}")
+        return _build_ocr_response(
+            document, response_model=PDFPageResponse, page=page, page_count=page_count
+        )
+    
+    return StreamingResponse(
+        _unpin_after(upload.path.name, _stream_as_completed(process(page) for page in range(1, page_count + 1))),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/api/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_job(file: UploadFile = File(...)):
+    """
+    提交后台 OCR 任务，立即返回任务 ID
+    
+    通过 GET /api/jobs/{job_id} 查询状态，完成后通过 GET /api/jobs/{job_id}/result 获取结果
+    """
+    upload = await _ingest_upload(file)
+    try:
+        job = job_manager.submit({
+            'image_path': str(upload.path),
+            'image_hash': upload.content_hash,
+            'filename': file.filename
+        })
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="任务队列已满，请稍后重试")
+    return job.to_status_dict()
+
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    """后台任务队列统计"""
+    return job_manager.get_stats()
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """查询后台任务状态"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return job.to_status_dict()
+
+
+@app.get("/api/jobs/{job_id}/result", response_model=OCRResponse)
+async def get_job_result(job_id: str):
+    """获取后台任务结果（任务未完成时返回 409）"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != JOB_DONE:
+        raise HTTPException(status_code=409, detail=f"任务尚未完成，当前状态: {job.status}")
+    return job.result
+
+
 @app.post("/api/export")
 async def export_questions(request: ExportRequest):
     """
     导出选中的题目
     """
     try:
-        # 获取当前的题目列表和图片路径
-        if not hasattr(app.state, 'current_questions'):
-            raise HTTPException(status_code=400, detail="没有可导出的题目，请先上传图片")
-        
-        questions = app.state.current_questions
-        image_path = app.state.current_image_path
-        
-        # 筛选要导出的题目
-        selected_questions = [
-            q for q in questions if q.question_id in request.question_ids
-        ]
+        selected_questions, image_path = _select_export(request)
         
-        if not selected_questions:
-            raise HTTPException(status_code=400, detail="未找到指定的题目")
-        
-        # 批量导出
-        results = exporter.export_questions_batch(
-            selected_questions,
-            image_path,
-            export_format=request.export_format
-        )
+        # 批量导出（图片裁剪较耗时，放到线程池执行）
+        with metrics.stage('export'):
+            results = await run_in_threadpool(
+                exporter.export_questions_batch,
+                selected_questions,
+                image_path,
+                export_format=request.export_format
+            )
+        if metrics.enabled:
+            metrics.add_sent('export', sum(
+                Path(path).stat().st_size for result in results.values() for path in result.values()
+            ))
         
         return {
             "success": True,
@@ -195,17 +997,168 @@ async def export_questions(request: ExportRequest):
             "export_dir": exporter.get_export_dir()
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
 
+@app.post("/api/export/zip")
+async def export_questions_zip(request: ExportRequest):
+    """
+    将选中的题目打包为 ZIP 流式下载
+    
+    - 逐题生成文本和裁剪图片并立即写出，不写入导出目录，内存占用与题目数量无关
+    - 原图和裁剪坐标在开始输出之前检查，无效时返回 4xx 而不是中断的压缩包
+    """
+    selected_questions, image_path = _select_export(request)
+    try:
+        chunks = exporter.iter_zip_export(selected_questions, image_path, export_format=request.export_format)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="图片不存在或已过期")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 同步生成器由 Starlette 在线程池中迭代，不阻塞事件循环
+    return StreamingResponse(
+        _metered_zip(chunks),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="questions_{request.document_id}.zip"'}
+    )
+
+
+@app.get("/api/uploads/stats")
+async def upload_stats():
+    """上传文件存储统计"""
+    return upload_store.get_stats()
+
+
+@app.get("/api/documents/stats")
+async def document_stats():
+    """识别结果存储统计"""
+    return document_store.get_stats()
+
+
+@app.get("/api/documents/{document_id}", response_model=OCRResponse)
+async def get_document(document_id: str):
+    """获取已保存的识别结果"""
+    return _build_ocr_response(_get_document(document_id))
+
+
+@app.get("/api/documents/{document_id}/hit", response_model=SpatialQueryResponse)
+async def hit_test(document_id: str, x: float, y: float):
+    """
+    点选：查询原图坐标 (x, y) 处的题目和文本块
+    
+    - 题目按边界框面积从小到大排列（嵌套时最内层的题目在前）
+    """
+    document = _get_document(document_id)
+    question_ids, blocks = document.index.hit_test(x, y)
+    return _build_spatial_response(document, question_ids, blocks)
+
+
+@app.get("/api/documents/{document_id}/region", response_model=SpatialQueryResponse)
+async def query_region(
+    document_id: str,
+    x1: float,
+    y1: float,
+    x2: float,
+    y2: float,
+    contained: bool = False
+):
+    """
+    框选：查询与原图坐标中的矩形区域相交的文本块及其所属题目
+    
+    - contained 为 true 时只选择完全位于区域内的文本块
+    - 题目按在文档中的顺序排列
+    """
+    document = _get_document(document_id)
+    question_ids, blocks = document.index.query_region(x1, y1, x2, y2, contained)
+    return _build_spatial_response(document, question_ids, blocks)
+
+
+@app.post("/api/documents/{document_id}/merge", response_model=EditResponse)
+async def merge_questions(document_id: str, request: MergeRequest):
+    """
+    合并题目
+    
+    - 合并后的题目使用文档中第一道题的 ID，其余题目被删除
+    - 只返回变化的题目，不重新识别
+    """
+    document = _get_document(document_id)
+    try:
+        delta = question_editor.merge(document, request.question_ids)
+    except EditError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return _build_edit_response(document, delta)
+
+
+@app.post("/api/documents/{document_id}/split", response_model=EditResponse)
+async def split_question(document_id: str, request: SplitRequest):
+    """
+    从指定文本块处拆分题目
+    
+    - 该文本块及之后的文本块成为新题目（使用新的题目 ID，排在原题目之后）
+    """
+    document = _get_document(document_id)
+    try:
+        delta = question_editor.split(document, request.question_id, request.block)
+    except EditError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return _build_edit_response(document, delta)
+
+
+@app.post("/api/documents/{document_id}/move", response_model=EditResponse)
+async def move_block(document_id: str, request: MoveBlockRequest):
+    """
+    将文本块移到另一道题目
+    
+    - 文本块按阅读顺序插入目标题目；原题目不再包含文本块时被删除
+    """
+    document = _get_document(document_id)
+    try:
+        delta = question_editor.move_block(document, request.block, request.question_id)
+    except EditError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return _build_edit_response(document, delta)
+
+
+@app.delete("/api/documents/{document_id}")
+async def delete_document(document_id: str):
+    """删除已保存的识别结果"""
+    if not document_store.remove(document_id):
+        raise HTTPException(status_code=404, detail="文档不存在或已过期")
+    return {"success": True}
+
+
 @app.get("/api/image/{filename}")
-async def get_image(filename: str):
-    """获取上传的图片"""
-    file_path = TEMP_DIR / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="图片不存在")
-    return FileResponse(file_path)
+async def get_image(filename: str, request: Request, size: Optional[int] = None):
+    """
+    获取上传的图片或预览图
+    
+    - size 为空时返回原图，否则返回指定宽度的预览图（原图不比该宽度大时返回原图）
+    - 图片按内容哈希命名、内容不会变化，因此使用强 ETag 并允许长期缓存
+    """
+    if size is None:
+        file_path = await run_in_threadpool(upload_store.resolve, filename)
+    elif size in upload_store.preview_widths:
+        file_path = await run_in_threadpool(upload_store.get_preview, filename, size)
+    else:
+        widths = ', '.join(str(w) for w in upload_store.preview_widths)
+        raise HTTPException(status_code=400, detail=f"不支持的预览尺寸: {size}，可选: {widths}")
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="图片不存在或已过期")
+    
+    variant = 'original' if file_path.name == filename else f"{size}-q{upload_store.preview_quality}"
+    etag = f'"{Path(filename).stem}-{variant}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(file_path, headers=headers)
 
 
 # ============ 启动服务 ============
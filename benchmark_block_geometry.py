@@ -0,0 +1,100 @@
+"""
+题目几何信息性能测试
+对比逐个文本块计算包围盒和文本（每次访问都重新计算）与列式存储加缓存聚合结果的耗时
+
+用法: python benchmark_block_geometry.py [题目数量] [每题文本块数量]
+"""
+
+import sys
+import time
+import random
+
+from src.models import BoundingBox, Question, TextBlock
+
+# 导出和构建响应时每道题访问包围盒和文本的大致次数
+ACCESSES_PER_QUESTION = 4
+
+
+def make_questions(count: int, blocks_per_question: int, seed: int = 0):
+    """生成题目，每题包含多个文本块"""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        question = Question(question_id=i + 1)
+        for j in range(blocks_per_question):
+            y = i * 1000 + j * 40
+            question.add_text_block(TextBlock(
+                text=f"第 {j} 行文本内容" * rng.randint(1, 4),
+                box=BoundingBox(rng.randint(0, 100), y, rng.randint(400, 1200), y + 30)
+            ))
+        questions.append(question)
+    return questions
+
+
+def legacy_access(questions):
+    """原实现：每次访问都逐个文本块计算包围盒并拼接文本（作为对照）"""
+    for question in questions:
+        for _ in range(ACCESSES_PER_QUESTION):
+            blocks = question.text_blocks
+            BoundingBox(
+                min(block.box.x1 for block in blocks),
+                min(block.box.y1 for block in blocks),
+                max(block.box.x2 for block in blocks),
+                max(block.box.y2 for block in blocks)
+            )
+            '\n'.join(block.text for block in blocks)
+
+
+def columnar_access(questions):
+    """列式存储：聚合结果在文本块变化前只计算一次"""
+    for question in questions:
+        for _ in range(ACCESSES_PER_QUESTION):
+            question.bounding_box
+            question.text
+
+
+def build_and_access(questions):
+    """从文本块列表重新构建题目后访问（包含构建列式视图的开销）"""
+    rebuilt = [Question(question_id=q.question_id, text_blocks=list(q.text_blocks)) for q in questions]
+    columnar_access(rebuilt)
+
+
+def timed(func, repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    blocks_per_question = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    print("=" * 80)
+    print(f"题目几何信息性能测试：{count} 道题目，每题 {blocks_per_question} 个文本块")
+    print("=" * 80)
+
+    questions = make_questions(count, blocks_per_question)
+
+    # 正确性：两种方式的结果一致
+    for question in questions:
+        blocks = question.text_blocks
+        assert question.bounding_box.to_tuple() == (
+            min(b.box.x1 for b in blocks), min(b.box.y1 for b in blocks),
+            max(b.box.x2 for b in blocks), max(b.box.y2 for b in blocks)
+        )
+        assert question.text == '\n'.join(b.text for b in blocks)
+
+    legacy = timed(lambda: legacy_access(questions))
+    columnar = timed(lambda: columnar_access(questions))
+    rebuilt = timed(lambda: build_and_access(questions))
+    print(f"逐块计算       {legacy * 1000:8.2f} ms")
+    print(f"列式 + 缓存    {columnar * 1000:8.2f} ms  x{legacy / columnar:.1f}")
+    print(f"含构建视图     {rebuilt * 1000:8.2f} ms  x{legacy / rebuilt:.1f}")
+
+
+if __name__ == '__main__':
+    main()
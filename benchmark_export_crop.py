@@ -0,0 +1,95 @@
+"""
+题目图片导出性能测试
+对比逐题打开并解码原图的裁剪方式与只解码一次、批量裁剪的方式在大尺寸页面上的耗时
+
+用法: python benchmark_export_crop.py [题目数量]
+"""
+
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from src.image_processor import image_processor
+from src.models import BoundingBox
+
+# 测试页面：A4 在 300 DPI / 600 DPI 下的尺寸
+PAGE_SIZES = [(2480, 3508), (4960, 7016)]
+
+
+def make_page(path: Path, size, image_format: str):
+    """生成一张带文字区域的大尺寸页面"""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for y in range(100, size[1] - 100, 60):
+        draw.rectangle([120, y, size[0] - 120, y + 24], fill=(30, 30, 30))
+    image.save(path, format=image_format, quality=90)
+
+
+def make_boxes(size, count: int, seed: int = 0):
+    """沿页面高度均匀生成题目边界框"""
+    rng = random.Random(seed)
+    width, height = size
+    step = height / count
+    return [
+        BoundingBox(rng.randint(50, 200), i * step + 10, width - rng.randint(50, 200), (i + 1) * step - 10)
+        for i in range(count)
+    ]
+
+
+def legacy_crop(page: Path, boxes, out_dir: Path):
+    """原实现：每道题单独打开并解码原图（作为对照）"""
+    for i, box in enumerate(boxes):
+        image_processor.crop_image_by_box(str(page), box, str(out_dir / f"legacy_{i}.png"))
+
+
+def batch_crop(page: Path, boxes, out_dir: Path):
+    """只解码一次原图，批量裁剪"""
+    image_processor.crop_images_by_boxes(
+        str(page), [(box, str(out_dir / f"batch_{i}.png")) for i, box in enumerate(boxes)]
+    )
+
+
+def timed(func, repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+
+    print("=" * 80)
+    print(f"题目图片导出性能测试：每页 {count} 道题目")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        for size in PAGE_SIZES:
+            for image_format, suffix in (('PNG', '.png'), ('JPEG', '.jpg')):
+                page = out_dir / f"page_{size[0]}{suffix}"
+                make_page(page, size, image_format)
+                boxes = make_boxes(size, count)
+
+                # 正确性：两种方式裁剪出的图片完全一致
+                legacy_crop(page, boxes, out_dir)
+                batch_crop(page, boxes, out_dir)
+                for i in range(count):
+                    with Image.open(out_dir / f"legacy_{i}.png") as a, Image.open(out_dir / f"batch_{i}.png") as b:
+                        assert a.size == b.size and a.tobytes() == b.tobytes()
+
+                legacy = timed(lambda: legacy_crop(page, boxes, out_dir))
+                batch = timed(lambda: batch_crop(page, boxes, out_dir))
+                print(f"{image_format:<5} {size[0]}x{size[1]:<6} 逐题解码 {legacy * 1000:8.1f} ms  "
+                      f"解码一次 {batch * 1000:8.1f} ms  x{legacy / batch:.2f}")
+
+
+if __name__ == '__main__':
+    main()
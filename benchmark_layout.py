@@ -0,0 +1,102 @@
+"""
+版面分析性能测试
+在包含大量小文本块（按词切分）的双栏页面上测试阅读顺序计算的耗时，验证耗时随文本块数量近似线性增长
+
+用法: python benchmark_layout.py [最大文本块数量]
+"""
+
+import sys
+import time
+import random
+
+from src.layout_analyzer import LayoutAnalyzer
+from src.models import BlockColumns, BoundingBox, TextBlock
+
+# 页面宽度和栏的位置（像素）
+PAGE_WIDTH = 2480
+COLUMNS = [(120, 1180), (1300, 2360)]
+LINE_HEIGHT = 36
+WORD_WIDTH = (40, 160)
+
+
+def make_page(count: int, seed: int = 0):
+    """
+    生成按词切分的双栏页面，每隔一段插入一个通栏标题
+
+    Returns:
+        (文本块列表, 每个文本块的期望阅读顺序编号)
+    """
+    rng = random.Random(seed)
+    blocks = []
+    expected = []
+    y = 100
+    section = 0
+    while len(blocks) < count:
+        # 通栏标题
+        blocks.append(TextBlock(text=f"第 {section} 部分", box=BoundingBox(120, y, 2360, y + LINE_HEIGHT)))
+        expected.append((section, 0, 0, 0))
+        y += LINE_HEIGHT * 2
+        lines = rng.randint(20, 60)
+        for column, (left, right) in enumerate(COLUMNS):
+            for line in range(lines):
+                top = y + line * LINE_HEIGHT * 1.5 + rng.uniform(-3, 3)
+                x = left
+                word = 0
+                while x < right - WORD_WIDTH[1]:
+                    width = rng.uniform(*WORD_WIDTH)
+                    blocks.append(TextBlock(text="词", box=BoundingBox(x, top, x + width, top + LINE_HEIGHT)))
+                    expected.append((section, 1 + column, line, word))
+                    x += width + rng.uniform(8, 20)
+                    word += 1
+        y += lines * LINE_HEIGHT * 1.5 + LINE_HEIGHT
+        section += 1
+
+    # 打乱顺序，模拟 OCR 返回的任意顺序
+    shuffled = list(range(len(blocks)))
+    rng.shuffle(shuffled)
+    return [blocks[i] for i in shuffled], [expected[i] for i in shuffled]
+
+
+def legacy_order(blocks):
+    """原实现：按 round(y1 / 10) * 10 和 x1 排序（作为对照，双栏会左右交错）"""
+    return sorted(range(len(blocks)), key=lambda i: (round(blocks[i].box.y1 / 10) * 10, blocks[i].box.x1))
+
+
+def timed(func, repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print("=" * 80)
+    print("版面分析性能测试：按词切分的双栏页面")
+    print("=" * 80)
+
+    analyzer = LayoutAnalyzer()
+    count = 1000
+    while count <= largest:
+        blocks, expected = make_page(count)
+        columns = BlockColumns(blocks)
+
+        # 正确性：阅读顺序与生成时的顺序完全一致
+        order = analyzer.reading_order(columns)
+        assert [expected[i] for i in order] == sorted(expected)
+        legacy_correct = [expected[i] for i in legacy_order(blocks)] == sorted(expected)
+
+        elapsed = timed(lambda: analyzer.reading_order(columns))
+        legacy = timed(lambda: legacy_order(blocks))
+        print(f"{len(blocks):>7} 个文本块  版面分析 {elapsed * 1000:8.2f} ms "
+              f"({elapsed * 1e6 / len(blocks):.2f} us/块)  原排序 {legacy * 1000:7.2f} ms "
+              f"(顺序{'正确' if legacy_correct else '错误'})")
+        count *= 5 if str(count).startswith('1') else 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+DeepSeek OCR 响应解析性能测试
+对比原逐行正则解析与单遍增量解析器在数 MB 合成响应上的吞吐量
+
+用法: python benchmark_ocr_parser.py [文本块数量]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+
+from src.ocr_parser import DeepSeekOCRParser, iter_deepseek_blocks
+from src.utils import parse_deepseek_ocr_response
+
+
+def legacy_parse(content: str):
+    """原逐行多次正则匹配的解析实现（作为对照）"""
+    blocks = []
+    current_box = None
+    current_text_lines = []
+
+    for line in content.split('\n'):
+        det_match = re.search(r'<\|det\|>(\[\[.*?\]\])<\|/det\|>', line)
+        if det_match:
+            if current_box is not None and current_text_lines:
+                text = '\n'.join(current_text_lines).strip()
+                if text:
+                    blocks.append({'text': text, 'box': current_box})
+            try:
+                coords = json.loads(det_match.group(1))
+                if coords and len(coords) > 0 and len(coords[0]) == 4:
+                    current_box = coords[0]
+                else:
+                    current_box = [0, 0, 0, 0]
+            except (json.JSONDecodeError, IndexError, ValueError):
+                current_box = [0, 0, 0, 0]
+            current_text_lines = []
+            text_after_tag = re.sub(r'<\|ref\|>.*?<\|/ref\|>', '', line)
+            text_after_tag = re.sub(r'<\|det\|>.*?<\|/det\|>', '', text_after_tag).strip()
+            if text_after_tag:
+                current_text_lines.append(text_after_tag)
+        else:
+            clean_line = re.sub(r'<\|ref\|>.*?<\|/ref\|>', '', line).strip()
+            if clean_line:
+                current_text_lines.append(clean_line)
+
+    if current_box is not None and current_text_lines:
+        text = '\n'.join(current_text_lines).strip()
+        if text:
+            blocks.append({'text': text, 'box': current_box})
+    return blocks
+
+
+def make_response(block_count: int, seed: int = 0) -> str:
+    """生成合成的 DeepSeek OCR 响应"""
+    rng = random.Random(seed)
+    sentence = "某CPU中部分数据通路如图所示，其中GPRs为通用寄存器组，FR为标志寄存器 \\(n>100000\\) "
+    parts = []
+    for i in range(block_count):
+        y = rng.randint(0, 990)
+        parts.append(
+            f"<|ref|>text<|/ref|><|det|>[[{rng.randint(0, 500)}, {y}, {rng.randint(500, 999)}, {y + 9}]]<|/det|>   \n"
+        )
+        parts.append(f"{i + 1}.(10分){sentence * rng.randint(1, 6)}\n")
+        for _ in range(rng.randint(0, 3)):
+            parts.append(f"  （{rng.randint(1, 9)}）{sentence * rng.randint(1, 4)}  \n")
+    return ''.join(parts)
+
+
+def timed(func, repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def feed_in_chunks(content: str, chunk_size: int):
+    """按固定大小切分后增量输入"""
+    chunks = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+    return list(iter_deepseek_blocks(chunks))
+
+
+def main():
+    block_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    content = make_response(block_count)
+    size_mb = len(content.encode('utf-8')) / 1024 / 1024
+
+    print("=" * 80)
+    print(f"DeepSeek OCR 解析性能测试：{block_count} 个文本块，{size_mb:.1f} MB")
+    print("=" * 80)
+
+    # 正确性：与原实现结果一致，且任意切分结果相同
+    expected = legacy_parse(content)
+    assert parse_deepseek_ocr_response(content) == expected
+    assert feed_in_chunks(content, 7) == expected
+    assert feed_in_chunks(content, 4096) == expected
+    print(f"✓ 结果与原实现一致（{len(expected)} 个文本块）\n")
+
+    cases = [
+        ("原逐行正则解析", lambda: legacy_parse(content)),
+        ("单遍解析（整段输入）", lambda: parse_deepseek_ocr_response(content)),
+        ("单遍解析（4 KB 分片）", lambda: feed_in_chunks(content, 4096)),
+        ("单遍解析（64 B 分片）", lambda: feed_in_chunks(content, 64)),
+    ]
+    baseline = None
+    for name, func in cases:
+        seconds = timed(func)
+        baseline = baseline or seconds
+        print(f"{name:<24} {seconds * 1000:8.1f} ms  {size_mb / seconds:8.1f} MB/s  "
+              f"x{baseline / seconds:.2f}")
+
+
+if __name__ == '__main__':
+    main()
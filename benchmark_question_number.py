@@ -0,0 +1,83 @@
+"""
+题号识别性能测试
+对比依次尝试每个题号正则表达式与合并为单个正则表达式的分类器在大量文本行上的耗时
+
+用法: python benchmark_question_number.py [行数]
+"""
+
+import re
+import sys
+import time
+import random
+
+from src.question_splitter import QuestionSplitter
+
+
+def make_lines(count: int, seed: int = 0):
+    """生成题库文本行：约四分之一是带各种题号的题目开头，其余为正文"""
+    rng = random.Random(seed)
+    starts = ["{n}. 下列说法正确的是", "（{n}）求函数的值", "{n}、填空题", "【{n}】阅读材料", "[{n}] 计算"]
+    bodies = ["这是题目的正文内容，包含一些文字和公式", "A. 选项内容", "B. 另一个选项", "解：由题意可知"]
+    lines = []
+    for i in range(count):
+        if rng.random() < 0.25:
+            lines.append(rng.choice(starts).format(n=i % 200 + 1))
+        elif rng.random() < 0.02:
+            lines.append("三、解答题")
+        else:
+            lines.append(rng.choice(bodies))
+    return lines
+
+
+def legacy_classify(compiled_patterns, lines):
+    """原实现：每行去除空白后依次尝试每个模式（作为对照）"""
+    results = []
+    for text in lines:
+        for pattern in compiled_patterns:
+            match = pattern.match(text.strip())
+            if match:
+                results.append((True, match.group(1)))
+                break
+        else:
+            results.append((False, None))
+    return results
+
+
+def combined_classify(splitter, lines):
+    """合并后的分类器"""
+    return [splitter.is_question_start(text) for text in lines]
+
+
+def timed(func, repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print("=" * 80)
+    print(f"题号识别性能测试：{count} 行")
+    print("=" * 80)
+
+    lines = make_lines(count)
+    custom = [r'^Q(\d+)[:：]', r'^\s*第(\d+)题', r'^\s*(\d+)[\.、．]\s*']
+    for name, splitter in (("默认模式", QuestionSplitter()), ("自定义模式", QuestionSplitter(custom))):
+        compiled = [re.compile(p) for p in splitter.patterns]
+
+        # 正确性：两种方式的结果完全一致
+        assert legacy_classify(compiled, lines) == combined_classify(splitter, lines)
+
+        legacy = timed(lambda: legacy_classify(compiled, lines))
+        combined = timed(lambda: combined_classify(splitter, lines))
+        print(f"{name:<6} 依次匹配 {legacy * 1000:8.1f} ms  单次匹配 {combined * 1000:8.1f} ms  "
+              f"x{legacy / combined:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+空间索引性能测试
+对比逐个比较所有文本块与网格索引的点查询、框查询耗时
+
+用法: python benchmark_spatial_index.py [查询次数]
+"""
+
+import sys
+import time
+import random
+
+from src.spatial_index import GridIndex
+
+# 页面尺寸：A4 在 300 DPI 下
+PAGE_SIZE = (2480, 3508)
+BLOCK_COUNTS = [1000, 5000, 20000]
+
+
+def make_boxes(count: int, seed: int = 0):
+    """生成大小不一的文本块边界框"""
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        x, y = rng.uniform(0, PAGE_SIZE[0] - 100), rng.uniform(0, PAGE_SIZE[1] - 40)
+        boxes.append((x, y, x + rng.uniform(20, 400), y + rng.uniform(20, 40)))
+    return boxes
+
+
+def linear_point(boxes, x, y):
+    """逐个比较（作为对照）"""
+    return [i for i, (a, b, c, d) in enumerate(boxes) if a <= x <= c and b <= y <= d]
+
+
+def linear_rect(boxes, x1, y1, x2, y2):
+    """逐个比较（作为对照）"""
+    return [i for i, (a, b, c, d) in enumerate(boxes) if a <= x2 and x1 <= c and b <= y2 and y1 <= d]
+
+
+def per_query(func, queries) -> float:
+    """返回每次查询的平均耗时（秒）"""
+    start = time.perf_counter()
+    for query in queries:
+        func(*query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(1)
+
+    print("=" * 80)
+    print(f"空间索引性能测试：每种查询 {count} 次")
+    print("=" * 80)
+
+    for blocks in BLOCK_COUNTS:
+        boxes = make_boxes(blocks)
+        start = time.perf_counter()
+        index = GridIndex(*zip(*boxes))
+        build = time.perf_counter() - start
+
+        points = [(rng.uniform(0, PAGE_SIZE[0]), rng.uniform(0, PAGE_SIZE[1])) for _ in range(count)]
+        rects = [(x, y, x + rng.uniform(50, 600), y + rng.uniform(50, 400)) for x, y in points]
+
+        # 正确性：两种方式的结果一致
+        for point, rect in zip(points[:50], rects[:50]):
+            assert index.query_point(*point) == linear_point(boxes, *point)
+            assert index.query_rect(*rect) == linear_rect(boxes, *rect)
+
+        linear_p = per_query(lambda x, y: linear_point(boxes, x, y), points)
+        indexed_p = per_query(index.query_point, points)
+        linear_r = per_query(lambda *r: linear_rect(boxes, *r), rects)
+        indexed_r = per_query(index.query_rect, rects)
+        print(f"{blocks:>6} 个文本块  建索引 {build * 1000:6.1f} ms")
+        print(f"       点查询  逐个比较 {linear_p * 1e6:8.1f} us  网格索引 {indexed_p * 1e6:6.1f} us  "
+              f"x{linear_p / indexed_p:.0f}")
+        print(f"       框查询  逐个比较 {linear_r * 1e6:8.1f} us  网格索引 {indexed_r * 1e6:6.1f} us  "
+              f"x{linear_r / indexed_r:.0f}")
+
+
+if __name__ == '__main__':
+    main()
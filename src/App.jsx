@@ -10,13 +10,16 @@ const API_BASE_URL = 'http://localhost:8000';
 function App() {
   const [imageUrl, setImageUrl] = useState(null);
   const [questions, setQuestions] = useState([]);
+  const [documentId, setDocumentId] = useState(null);
+  const [originalSize, setOriginalSize] = useState(null);
   const [loading, setLoading] = useState(false);
 
   const handleUploadSuccess = (data) => {
-    // 将相对路径转换为完整 URL
-    const fullImageUrl = data.image_url.startsWith('http')
-      ? data.image_url
-      : `${API_BASE_URL}${data.image_url}`;
+    // 优先显示缩小后的预览图，将相对路径转换为完整 URL
+    const displayUrl = data.preview_url || data.image_url;
+    const fullImageUrl = displayUrl.startsWith('http')
+      ? displayUrl
+      : `${API_BASE_URL}${displayUrl}`;
 
     console.log('上传成功，数据:', data);
     console.log('图片 URL:', fullImageUrl);
@@ -24,6 +27,11 @@ function App() {
 
     setImageUrl(fullImageUrl);
     setQuestions(data.questions);
+    setDocumentId(data.document_id);
+    // 边界框坐标基于原图尺寸，显示预览图时需要按原图尺寸换算
+    setOriginalSize(data.image_width && data.image_height
+      ? { width: data.image_width, height: data.image_height }
+      : null);
     message.success(`图片识别成功！识别到 ${data.questions.length} 道题目`);
   };
 
@@ -55,11 +63,15 @@ function App() {
         ) : (
           <PreviewPanel 
             imageUrl={imageUrl}
+            documentId={documentId}
+            originalSize={originalSize}
             questions={questions}
             setQuestions={setQuestions}
             onReset={() => {
               setImageUrl(null);
               setQuestions([]);
+              setDocumentId(null);
+              setOriginalSize(null);
             }}
           />
         )}
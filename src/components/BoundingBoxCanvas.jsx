@@ -1,9 +1,23 @@
 import React, { useRef, useEffect, useState, useCallback } from 'react';
+import { hitTest, queryRegion } from '../services/api';
 import './BoundingBoxCanvas.css';
 
-const BoundingBoxCanvas = ({ questions, imageSize, selectedQuestionId, onQuestionHover }) => {
+// 拖动超过该距离（显示像素）时视为框选，否则视为点选
+const DRAG_THRESHOLD = 4;
+
+const BoundingBoxCanvas = ({
+  documentId,
+  questions,
+  imageSize,
+  selectedQuestionId,
+  onQuestionHover,
+  onBlockClick,
+  onRegionSelect
+}) => {
   const canvasRef = useRef(null);
   const [hoveredQuestionId, setHoveredQuestionId] = useState(null);
+  const [dragBox, setDragBox] = useState(null);
+  const dragStartRef = useRef(null);
 
   // 预定义的颜色数组，用于区分不同题目
   const colors = [
@@ -105,14 +119,20 @@ const BoundingBoxCanvas = ({ questions, imageSize, selectedQuestionId, onQuestio
         bounding_box.y1 - labelHeight + padding
       );
     });
-  }, [questions, imageSize, hoveredQuestionId, selectedQuestionId]);
 
-  // 处理鼠标移动事件
-  const handleMouseMove = (e) => {
-    const canvas = canvasRef.current;
-    if (!canvas) return;
+    // 绘制框选区域
+    if (dragBox) {
+      ctx.setLineDash([6, 4]);
+      ctx.strokeStyle = '#595959';
+      ctx.lineWidth = 2;
+      ctx.strokeRect(dragBox.x1, dragBox.y1, dragBox.x2 - dragBox.x1, dragBox.y2 - dragBox.y1);
+      ctx.setLineDash([]);
+    }
+  }, [questions, imageSize, hoveredQuestionId, selectedQuestionId, dragBox]);
 
-    const rect = canvas.getBoundingClientRect();
+  // 将鼠标事件的位置转换为原图坐标
+  const toImagePoint = (e) => {
+    const rect = canvasRef.current.getBoundingClientRect();
     // 鼠标在 Canvas 显示区域的坐标
     const displayX = e.clientX - rect.left;
     const displayY = e.clientY - rect.top;
@@ -120,43 +140,91 @@ const BoundingBoxCanvas = ({ questions, imageSize, selectedQuestionId, onQuestio
     // 转换为 Canvas 内部坐标系统（原始图片坐标系统）
     const scaleX = imageSize.naturalWidth / imageSize.displayWidth;
     const scaleY = imageSize.naturalHeight / imageSize.displayHeight;
-    const x = displayX * scaleX;
-    const y = displayY * scaleY;
+    return { x: displayX * scaleX, y: displayY * scaleY, displayX, displayY };
+  };
 
-    // 检查鼠标是否在某个边界框内
-    let foundQuestionId = null;
-    const questionsWithBox = questions.filter(q => q.bounding_box);
+  const updateHovered = (questionId) => {
+    setHoveredQuestionId(questionId);
+    if (onQuestionHover) {
+      onQuestionHover(questionId);
+    }
+    if (canvasRef.current) {
+      canvasRef.current.style.cursor = questionId ? 'pointer' : 'default';
+    }
+  };
 
-    for (const question of questionsWithBox) {
-      const { question_id, bounding_box } = question;
-      if (
-        x >= bounding_box.x1 &&
-        x <= bounding_box.x2 &&
-        y >= bounding_box.y1 &&
-        y <= bounding_box.y2
-      ) {
-        foundQuestionId = question_id;
-        break;
-      }
+  // 悬停高亮在本地按题目边界框判断（每次移动鼠标都会触发，不请求服务端）
+  const findQuestionAt = (x, y) => {
+    const question = questions.find(({ bounding_box }) => (
+      bounding_box &&
+      x >= bounding_box.x1 &&
+      x <= bounding_box.x2 &&
+      y >= bounding_box.y1 &&
+      y <= bounding_box.y2
+    ));
+    return question ? question.question_id : null;
+  };
+
+  // 处理鼠标移动事件
+  const handleMouseMove = (e) => {
+    if (!canvasRef.current) return;
+    const point = toImagePoint(e);
+
+    const start = dragStartRef.current;
+    if (start) {
+      const dragging = Math.abs(point.displayX - start.displayX) > DRAG_THRESHOLD
+        || Math.abs(point.displayY - start.displayY) > DRAG_THRESHOLD;
+      setDragBox(dragging ? {
+        x1: Math.min(start.x, point.x),
+        y1: Math.min(start.y, point.y),
+        x2: Math.max(start.x, point.x),
+        y2: Math.max(start.y, point.y)
+      } : null);
+      return;
     }
 
+    const foundQuestionId = findQuestionAt(point.x, point.y);
     if (foundQuestionId !== hoveredQuestionId) {
-      setHoveredQuestionId(foundQuestionId);
-      if (onQuestionHover) {
-        onQuestionHover(foundQuestionId);
-      }
+      updateHovered(foundQuestionId);
     }
+  };
 
-    // 更改鼠标样式
-    canvas.style.cursor = foundQuestionId ? 'pointer' : 'default';
+  const handleMouseDown = (e) => {
+    if (!canvasRef.current || !documentId) return;
+    dragStartRef.current = toImagePoint(e);
+  };
+
+  // 松开鼠标：拖动过时按区域框选题目，否则点选文本块（均由服务端的空间索引查询）
+  const handleMouseUp = async (e) => {
+    const start = dragStartRef.current;
+    dragStartRef.current = null;
+    if (!start) return;
+
+    const box = dragBox;
+    setDragBox(null);
+    try {
+      if (box) {
+        const result = await queryRegion(documentId, box);
+        if (onRegionSelect) {
+          onRegionSelect(result.question_ids);
+        }
+      } else {
+        const point = toImagePoint(e);
+        const result = await hitTest(documentId, point.x, point.y);
+        if (onBlockClick) {
+          onBlockClick(result.blocks[0] || null);
+        }
+      }
+    } catch (error) {
+      console.error('查询失败:', error);
+    }
   };
 
   // 处理鼠标离开事件
   const handleMouseLeave = () => {
-    setHoveredQuestionId(null);
-    if (onQuestionHover) {
-      onQuestionHover(null);
-    }
+    dragStartRef.current = null;
+    setDragBox(null);
+    updateHovered(null);
   };
 
   // 当 questions、imageSize 或 hoveredQuestionId 变化时重新绘制
@@ -175,6 +243,8 @@ const BoundingBoxCanvas = ({ questions, imageSize, selectedQuestionId, onQuestio
         height: `${imageSize.displayHeight}px`
       }}
       onMouseMove={handleMouseMove}
+      onMouseDown={handleMouseDown}
+      onMouseUp={handleMouseUp}
       onMouseLeave={handleMouseLeave}
     />
   );
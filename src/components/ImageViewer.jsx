@@ -3,7 +3,16 @@ import { Card, Spin, Alert } from 'antd';
 import BoundingBoxCanvas from './BoundingBoxCanvas';
 import './ImageViewer.css';
 
-const ImageViewer = ({ imageUrl, questions = [], selectedQuestionId, onQuestionHover }) => {
+const ImageViewer = ({
+  imageUrl,
+  documentId,
+  originalSize,
+  questions = [],
+  selectedQuestionId,
+  onQuestionHover,
+  onBlockClick,
+  onRegionSelect
+}) => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(false);
   const [imageSize, setImageSize] = useState({
@@ -24,7 +33,10 @@ const ImageViewer = ({ imageUrl, questions = [], selectedQuestionId, onQuestionH
     requestAnimationFrame(() => {
       requestAnimationFrame(() => {
         if (imageRef.current) {
-          const { naturalWidth, naturalHeight, offsetWidth, offsetHeight } = imageRef.current;
+          const { offsetWidth, offsetHeight } = imageRef.current;
+          // 显示的可能是缩小后的预览图，边界框坐标基于原图尺寸
+          const naturalWidth = originalSize?.width || imageRef.current.naturalWidth;
+          const naturalHeight = originalSize?.height || imageRef.current.naturalHeight;
 
           // 如果 offsetWidth 仍然为 0，使用 naturalWidth 作为后备
           const displayWidth = offsetWidth || naturalWidth;
@@ -61,7 +73,10 @@ const ImageViewer = ({ imageUrl, questions = [], selectedQuestionId, onQuestionH
 
       const timer = setTimeout(() => {
         if (imageRef.current) {
-          const { naturalWidth, naturalHeight, offsetWidth, offsetHeight } = imageRef.current;
+          const { offsetWidth, offsetHeight } = imageRef.current;
+          // 显示的可能是缩小后的预览图，边界框坐标基于原图尺寸
+          const naturalWidth = originalSize?.width || imageRef.current.naturalWidth;
+          const naturalHeight = originalSize?.height || imageRef.current.naturalHeight;
           const displayWidth = offsetWidth || naturalWidth;
           const displayHeight = offsetHeight || naturalHeight;
 
@@ -121,10 +136,13 @@ const ImageViewer = ({ imageUrl, questions = [], selectedQuestionId, onQuestionH
           />
           {!loading && !error && imageSize.naturalWidth > 0 && (
             <BoundingBoxCanvas
+              documentId={documentId}
               questions={questions}
               imageSize={imageSize}
               selectedQuestionId={selectedQuestionId}
               onQuestionHover={onQuestionHover}
+              onBlockClick={onBlockClick}
+              onRegionSelect={onRegionSelect}
             />
           )}
         </div>
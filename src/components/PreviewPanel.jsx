@@ -3,44 +3,77 @@ import { Row, Col, Button, Space, message } from 'antd';
 import { ReloadOutlined } from '@ant-design/icons';
 import ImageViewer from './ImageViewer';
 import QuestionList from './QuestionList';
-import { exportQuestions } from '../services/api';
+import { exportQuestions, exportQuestionsZip, mergeQuestions, splitQuestion, moveBlock } from '../services/api';
 import './PreviewPanel.css';
 
-const PreviewPanel = ({ imageUrl, questions, setQuestions, onReset }) => {
+const PreviewPanel = ({ imageUrl, documentId, originalSize, questions, setQuestions, onReset }) => {
   const [selectedQuestions, setSelectedQuestions] = useState([]);
   const [exporting, setExporting] = useState(false);
   const [hoveredQuestionId, setHoveredQuestionId] = useState(null);
+  // 在原图上点选的文本块，用于拆分题目或移到其他题目
+  const [activeBlock, setActiveBlock] = useState(null);
 
-  const handleMerge = () => {
+  // 将编辑结果（只包含变化的题目）应用到题目列表
+  const applyEditDelta = (delta) => {
+    const byId = new Map(questions.map(q => [q.question_id, q]));
+    delta.removed.forEach(id => byId.delete(id));
+    delta.updated.forEach(q => byId.set(q.question_id, q));
+    setQuestions(delta.order.map(id => byId.get(id)));
+  };
+
+  // 点选文本块时记住该文本块，并切换其所属题目的选中状态
+  const handleBlockClick = (block) => {
+    setActiveBlock(block);
+    if (!block) return;
+    setSelectedQuestions(selectedQuestions.includes(block.question_id)
+      ? selectedQuestions.filter(id => id !== block.question_id)
+      : [...selectedQuestions, block.question_id]);
+  };
+
+  // 框选时选中区域内的全部题目
+  const handleRegionSelect = (questionIds) => {
+    setSelectedQuestions(questionIds);
+  };
+
+  const handleMerge = async () => {
     if (selectedQuestions.length < 2) {
       message.warning('请至少选择两道题目进行合并');
       return;
     }
 
-    // 按 ID 排序
-    const sortedIds = [...selectedQuestions].sort((a, b) => a - b);
-    
-    // 找到要合并的题目
-    const questionsToMerge = questions.filter(q => sortedIds.includes(q.question_id));
-    
-    // 合并文本
-    const mergedText = questionsToMerge.map(q => q.text).join('\n\n');
-    
-    // 创建新题目
-    const newQuestion = {
-      question_id: sortedIds[0],
-      text: mergedText,
-    };
-
-    // 移除被合并的题目，添加新题目
-    const newQuestions = questions
-      .filter(q => !sortedIds.includes(q.question_id))
-      .concat(newQuestion)
-      .sort((a, b) => a.question_id - b.question_id);
-
-    setQuestions(newQuestions);
-    setSelectedQuestions([]);
-    message.success('题目合并成功');
+    try {
+      const delta = await mergeQuestions(documentId, selectedQuestions);
+      applyEditDelta(delta);
+      setSelectedQuestions([]);
+      setActiveBlock(null);
+      message.success('题目合并成功');
+    } catch (error) {
+      message.error(`合并失败: ${error.message}`);
+    }
+  };
+
+  const handleSplit = async (questionId, block) => {
+    try {
+      const delta = await splitQuestion(documentId, questionId, block);
+      applyEditDelta(delta);
+      setActiveBlock(null);
+      message.success('题目拆分成功');
+    } catch (error) {
+      message.error(`拆分失败: ${error.message}`);
+    }
+  };
+
+  const handleMoveBlock = async (block, questionId) => {
+    try {
+      const delta = await moveBlock(documentId, block, questionId);
+      applyEditDelta(delta);
+      // 原题目被删除时同时取消选中
+      setSelectedQuestions(selectedQuestions.filter(id => !delta.removed.includes(id)));
+      setActiveBlock(null);
+      message.success('文本块移动成功');
+    } catch (error) {
+      message.error(`移动失败: ${error.message}`);
+    }
   };
 
   const handleExport = async (format) => {
@@ -51,7 +84,7 @@ const PreviewPanel = ({ imageUrl, questions, setQuestions, onReset }) => {
 
     setExporting(true);
     try {
-      const result = await exportQuestions(selectedQuestions, format);
+      const result = await exportQuestions(documentId, selectedQuestions, format);
       message.success(`导出成功！文件保存在: ${result.export_dir}`);
     } catch (error) {
       message.error(`导出失败: ${error.message}`);
@@ -60,6 +93,28 @@ const PreviewPanel = ({ imageUrl, questions, setQuestions, onReset }) => {
     }
   };
 
+  const handleDownloadZip = async () => {
+    if (selectedQuestions.length === 0) {
+      message.warning('请至少选择一道题目进行导出');
+      return;
+    }
+
+    setExporting(true);
+    try {
+      const blob = await exportQuestionsZip(documentId, selectedQuestions, 'both');
+      const url = URL.createObjectURL(blob);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `questions_${documentId}.zip`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      message.error(`导出失败: ${error.message}`);
+    } finally {
+      setExporting(false);
+    }
+  };
+
   return (
     <div className="preview-panel">
       <Space style={{ marginBottom: 16 }}>
@@ -95,15 +150,26 @@ const PreviewPanel = ({ imageUrl, questions, setQuestions, onReset }) => {
         >
           导出全部
         </Button>
+        <Button 
+          onClick={handleDownloadZip}
+          disabled={selectedQuestions.length === 0}
+          loading={exporting}
+        >
+          下载 ZIP
+        </Button>
       </Space>
 
       <Row gutter={24} style={{ height: 'calc(100% - 48px)' }}>
         <Col span={12} style={{ height: '100%' }}>
           <ImageViewer
             imageUrl={imageUrl}
+            documentId={documentId}
+            originalSize={originalSize}
             questions={questions}
             selectedQuestionId={hoveredQuestionId}
             onQuestionHover={setHoveredQuestionId}
+            onBlockClick={handleBlockClick}
+            onRegionSelect={handleRegionSelect}
           />
         </Col>
         <Col span={12} style={{ height: '100%' }}>
@@ -112,6 +178,9 @@ const PreviewPanel = ({ imageUrl, questions, setQuestions, onReset }) => {
             selectedQuestions={selectedQuestions}
             setSelectedQuestions={setSelectedQuestions}
             hoveredQuestionId={hoveredQuestionId}
+            activeBlock={activeBlock}
+            onSplit={handleSplit}
+            onMoveBlock={handleMoveBlock}
           />
         </Col>
       </Row>
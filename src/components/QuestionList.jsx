@@ -1,11 +1,19 @@
 import React from 'react';
-import { Card, List, Checkbox, Typography, Empty } from 'antd';
+import { Card, List, Checkbox, Typography, Empty, Button } from 'antd';
 import { FileTextOutlined } from '@ant-design/icons';
 import './QuestionList.css';
 
 const { Text, Paragraph } = Typography;
 
-const QuestionList = ({ questions, selectedQuestions, setSelectedQuestions, hoveredQuestionId }) => {
+const QuestionList = ({
+  questions,
+  selectedQuestions,
+  setSelectedQuestions,
+  hoveredQuestionId,
+  activeBlock,
+  onSplit,
+  onMoveBlock
+}) => {
   const handleSelectChange = (questionId, checked) => {
     if (checked) {
       setSelectedQuestions([...selectedQuestions, questionId]);
@@ -14,6 +22,31 @@ const QuestionList = ({ questions, selectedQuestions, setSelectedQuestions, hove
     }
   };
 
+  // 原图上点选了文本块时，所属题目可以从该文本块处拆分（不是第一个文本块时），其他题目可以移入该文本块
+  const renderBlockAction = (question) => {
+    if (!activeBlock) return null;
+
+    const stop = (handler) => (e) => {
+      e.stopPropagation();
+      handler();
+    };
+    if (activeBlock.question_id !== question.question_id) {
+      return (
+        <Button size="small" type="link" onClick={stop(() => onMoveBlock(activeBlock.index, question.question_id))}>
+          移入选中文本块
+        </Button>
+      );
+    }
+    if (question.block_ids.indexOf(activeBlock.index) > 0) {
+      return (
+        <Button size="small" type="link" onClick={stop(() => onSplit(question.question_id, activeBlock.index))}>
+          从选中文本块处拆分
+        </Button>
+      );
+    }
+    return null;
+  };
+
   const handleSelectAll = (checked) => {
     if (checked) {
       setSelectedQuestions(questions.map(q => q.question_id));
@@ -73,6 +106,7 @@ const QuestionList = ({ questions, selectedQuestions, setSelectedQuestions, hove
                   <Text strong style={{ marginLeft: 8 }}>
                     题目 {question.question_id}
                   </Text>
+                  <span style={{ marginLeft: 'auto' }}>{renderBlockAction(question)}</span>
                 </div>
                 <Paragraph 
                   className="question-text"
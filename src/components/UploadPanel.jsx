@@ -1,19 +1,42 @@
 import React, { useState } from 'react';
 import { Upload, Button, Space, Typography, Spin } from 'antd';
 import { InboxOutlined, UploadOutlined } from '@ant-design/icons';
-import { uploadImage } from '../services/api';
+import { uploadImage, uploadImageStream } from '../services/api';
 import './UploadPanel.css';
 
 const { Dragger } = Upload;
 const { Title, Text } = Typography;
 
+/**
+ * 流式识别图片，每识别出一个文本块就更新进度；浏览器不支持读取响应流时一次性上传
+ */
+const recognize = async (file, onProgress) => {
+  if (typeof ReadableStream === 'undefined') {
+    return uploadImage(file);
+  }
+
+  let result = null;
+  let failure = null;
+  let blocks = 0;
+  await uploadImageStream(file, {
+    onBlock: () => onProgress(++blocks),
+    onResult: (data) => { result = data; },
+    onError: (data) => { failure = new Error(data.message); },
+  });
+  if (failure) throw failure;
+  if (!result) throw new Error('识别结果不完整，请重试');
+  return result;
+};
+
 const UploadPanel = ({ onSuccess, onError, loading, setLoading }) => {
   const [fileList, setFileList] = useState([]);
+  const [recognized, setRecognized] = useState(0);
 
   const handleUpload = async (file) => {
     setLoading(true);
+    setRecognized(0);
     try {
-      const data = await uploadImage(file);
+      const data = await recognize(file, setRecognized);
       onSuccess(data);
       setFileList([]);
     } catch (error) {
@@ -40,7 +63,10 @@ const UploadPanel = ({ onSuccess, onError, loading, setLoading }) => {
 
   return (
     <div className="upload-panel">
-      <Spin spinning={loading} tip="正在识别图片，请稍候...">
+      <Spin
+        spinning={loading}
+        tip={recognized > 0 ? `已识别 ${recognized} 个文本块...` : '正在识别图片，请稍候...'}
+      >
         <Space direction="vertical" size="large" style={{ width: '100%', maxWidth: 600 }}>
           <div style={{ textAlign: 'center' }}>
             <Title level={3}>上传图片开始识别</Title>
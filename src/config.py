@@ -33,6 +33,91 @@ class Config:
         self.ocr_timeout: int = int(os.getenv('OCR_TIMEOUT', '30'))
         self.max_tokens: int = int(os.getenv('MAX_TOKENS', '8192'))
         
+        # 连接池配置
+        self.ocr_pool_max_connections: int = int(os.getenv('OCR_POOL_MAX_CONNECTIONS', '20'))
+        self.ocr_pool_max_keepalive: int = int(os.getenv('OCR_POOL_MAX_KEEPALIVE', '10'))
+        self.ocr_pool_keepalive_expiry: float = float(os.getenv('OCR_POOL_KEEPALIVE_EXPIRY', '60'))
+        self.ocr_pool_warmup: int = int(os.getenv('OCR_POOL_WARMUP', '0'))
+        
+        # 图片预处理配置（发送给 OCR API 前缩放并重新编码）
+        self.ocr_preprocess_enabled: bool = os.getenv('OCR_PREPROCESS_ENABLED', 'true').lower() == 'true'
+        self.ocr_max_image_side: int = int(os.getenv('OCR_MAX_IMAGE_SIDE', '1280'))
+        self.ocr_upload_format: str = os.getenv('OCR_UPLOAD_FORMAT', 'jpeg').lower()
+        self.ocr_upload_quality: int = int(os.getenv('OCR_UPLOAD_QUALITY', '85'))
+        self.ocr_grayscale_tolerance: int = int(os.getenv('OCR_GRAYSCALE_TOLERANCE', '8'))
+        
+        # 长图切块识别配置（按重叠的水平条带并发识别）
+        self.ocr_tile_enabled: bool = os.getenv('OCR_TILE_ENABLED', 'true').lower() == 'true'
+        self.ocr_tile_min_aspect: float = float(os.getenv('OCR_TILE_MIN_ASPECT', '2.0'))
+        self.ocr_tile_aspect: float = float(os.getenv('OCR_TILE_ASPECT', '1.4'))
+        self.ocr_tile_overlap: float = float(os.getenv('OCR_TILE_OVERLAP', '0.1'))
+        self.ocr_tile_max: int = int(os.getenv('OCR_TILE_MAX', '16'))
+        self.ocr_tile_concurrency: int = int(os.getenv('OCR_TILE_CONCURRENCY', '4'))
+        
+        # OCR 结果缓存配置
+        self.ocr_cache_enabled: bool = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ocr_cache_dir: Path = Path(__file__).parent.parent / os.getenv('OCR_CACHE_DIR', 'cache/ocr')
+        self.ocr_cache_memory_items: int = int(os.getenv('OCR_CACHE_MEMORY_ITEMS', '256'))
+        self.ocr_cache_disk_max_bytes: int = int(os.getenv('OCR_CACHE_DISK_MAX_BYTES', str(200 * 1024 * 1024)))
+        
+        # 原始 API 响应保留策略（memory / drop / spill）
+        self.ocr_raw_response_retention: str = os.getenv('OCR_RAW_RESPONSE_RETENTION', 'memory').lower()
+        self.ocr_raw_response_log_dir: Path = Path(__file__).parent.parent / os.getenv(
+            'OCR_RAW_RESPONSE_LOG_DIR', 'cache/raw_responses'
+        )
+        self.ocr_raw_response_log_max_bytes: int = int(
+            os.getenv('OCR_RAW_RESPONSE_LOG_MAX_BYTES', str(200 * 1024 * 1024))
+        )
+        self.ocr_raw_response_log_segment_bytes: int = int(
+            os.getenv('OCR_RAW_RESPONSE_LOG_SEGMENT_BYTES', str(16 * 1024 * 1024))
+        )
+        
+        # 版面分析配置（题目分割前按阅读顺序排列文本块）
+        self.layout_column_detection: bool = os.getenv('LAYOUT_COLUMN_DETECTION', 'true').lower() == 'true'
+        self.layout_min_column_width: float = float(os.getenv('LAYOUT_MIN_COLUMN_WIDTH', '0.25'))
+        
+        # 批量上传配置
+        self.batch_concurrency: int = int(os.getenv('BATCH_CONCURRENCY', '8'))
+        self.batch_max_files: int = int(os.getenv('BATCH_MAX_FILES', '100'))
+        
+        # 后台任务配置
+        self.job_workers: int = int(os.getenv('JOB_WORKERS', '4'))
+        self.job_result_ttl: float = float(os.getenv('JOB_RESULT_TTL', '3600'))
+        self.job_max_pending: int = int(os.getenv('JOB_MAX_PENDING', '1000'))
+        
+        # 识别结果存储配置
+        self.document_max_items: int = int(os.getenv('DOCUMENT_MAX_ITEMS', '1000'))
+        self.document_ttl: float = float(os.getenv('DOCUMENT_TTL', '7200'))
+        
+        # 上传文件存储配置
+        self.upload_dir: Path = Path(__file__).parent.parent / os.getenv('UPLOAD_DIR', 'temp_uploads')
+        self.upload_ttl: float = float(os.getenv('UPLOAD_TTL', '86400'))
+        self.upload_max_bytes: int = int(os.getenv('UPLOAD_MAX_BYTES', str(1024 * 1024 * 1024)))
+        self.upload_sweep_interval: float = float(os.getenv('UPLOAD_SWEEP_INTERVAL', '300'))
+        self.upload_max_file_bytes: int = int(os.getenv('UPLOAD_MAX_FILE_BYTES', str(20 * 1024 * 1024)))
+        
+        # PDF 配置（按页光栅化后识别）
+        self.pdf_dpi: int = int(os.getenv('PDF_DPI', '200'))
+        self.pdf_max_pages: int = int(os.getenv('PDF_MAX_PAGES', '200'))
+        self.pdf_max_file_bytes: int = int(os.getenv('PDF_MAX_FILE_BYTES', str(100 * 1024 * 1024)))
+        self.pdf_page_concurrency: int = int(os.getenv('PDF_PAGE_CONCURRENCY', '4'))
+        self.pdf_render_timeout: Optional[int] = int(os.getenv('PDF_RENDER_TIMEOUT', '120')) or None
+        self.pdf_poppler_path: Optional[str] = os.getenv('POPPLER_PATH') or None
+        
+        # 预览图配置
+        self.preview_widths: list[int] = [
+            int(width) for width in os.getenv('PREVIEW_WIDTHS', '512,1024,2048').split(',') if width.strip()
+        ]
+        self.preview_quality: int = int(os.getenv('PREVIEW_QUALITY', '80'))
+        self.preview_default_width: int = int(os.getenv('PREVIEW_DEFAULT_WIDTH', '1024'))
+        
+        # 监控指标配置（各处理阶段的耗时和计数，通过 /metrics 输出）
+        self.metrics_enabled: bool = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+        
+        # 请求追踪配置（每个请求的阶段耗时写入 JSONL 日志，留空时不写入）
+        trace_log_path = os.getenv('TRACE_LOG_PATH', '')
+        self.trace_log_path: Optional[Path] = Path(__file__).parent.parent / trace_log_path if trace_log_path else None
+        
         # 导出配置
         self.export_dir: Path = Path(__file__).parent.parent / os.getenv('EXPORT_DIR', 'exports')
         
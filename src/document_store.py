@@ -0,0 +1,165 @@
+"""
+文档存储模块
+按文档 ID 保存每次上传的识别结果（题目列表和图片路径），供导出等后续请求使用
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import config
+from .models import Question
+from .spatial_index import DocumentIndex
+
+
+@dataclass
+class StoredDocument:
+    """一次上传对应的识别结果"""
+    document_id: str  # 文档 ID
+    image_path: str  # 图片路径
+    questions: List[Question] = field(default_factory=list)  # 题目列表
+    image_size: Optional[Tuple[int, int]] = None  # 原图尺寸 (宽, 高)，题目坐标基于该尺寸
+    raw_response_id: Optional[str] = None  # 写入磁盘日志的原始响应 ID
+    index: Optional[DocumentIndex] = field(default=None, repr=False)  # 文本块和题目的空间索引
+    created_at: float = field(default_factory=time.time)  # 创建时间
+    last_access: float = field(default_factory=time.time)  # 最近访问时间
+
+
+class DocumentStore:
+    """文档存储（内存 LRU + 空闲超时淘汰，O(1) 查询）"""
+
+    def __init__(self, max_documents: int = 1000, ttl: float = 7200):
+        """
+        初始化文档存储
+
+        Args:
+            max_documents: 最多保存的文档数，超出后淘汰最久未访问的文档
+            ttl: 文档在未被访问时的保留时间（秒）
+        """
+        self.max_documents = max_documents
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._documents: OrderedDict[str, StoredDocument] = OrderedDict()
+
+        self.evicted = 0
+        self.expired = 0
+
+    def put(
+        self,
+        questions: List[Question],
+        image_path: str,
+        image_size: Optional[Tuple[int, int]] = None,
+        raw_response_id: Optional[str] = None
+    ) -> StoredDocument:
+        """
+        保存识别结果
+
+        Args:
+            questions: 题目列表
+            image_path: 图片路径
+            image_size: 原图尺寸 (宽, 高)
+            raw_response_id: 写入磁盘日志的原始响应 ID
+
+        Returns:
+            StoredDocument: 新建的文档
+        """
+        document = StoredDocument(
+            document_id=uuid.uuid4().hex,
+            image_path=image_path,
+            questions=questions,
+            image_size=image_size,
+            raw_response_id=raw_response_id,
+            index=DocumentIndex(questions)
+        )
+        with self._lock:
+            self._purge_expired()
+            self._documents[document.document_id] = document
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+                self.evicted += 1
+        return document
+
+    def get(self, document_id: str) -> Optional[StoredDocument]:
+        """
+        查询文档（同时刷新访问时间）
+
+        Args:
+            document_id: 文档 ID
+
+        Returns:
+            Optional[StoredDocument]: 文档，不存在或已过期时返回 None
+        """
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is None:
+                return None
+            now = time.time()
+            if now - document.last_access > self.ttl:
+                del self._documents[document_id]
+                self.expired += 1
+                return None
+            document.last_access = now
+            self._documents.move_to_end(document_id)
+            return document
+
+    def remove(self, document_id: str) -> bool:
+        """
+        删除文档
+
+        Args:
+            document_id: 文档 ID
+
+        Returns:
+            bool: 文档存在并已删除时返回 True
+        """
+        with self._lock:
+            return self._documents.pop(document_id, None) is not None
+
+    def image_paths(self) -> List[str]:
+        """
+        未过期文档引用的图片路径（上传文件存储据此保留这些图片）
+
+        Returns:
+            List[str]: 图片路径列表
+        """
+        with self._lock:
+            self._purge_expired()
+            return [document.image_path for document in self._documents.values()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取文档存储统计信息
+
+        Returns:
+            Dict[str, Any]: 文档数、上限及淘汰次数
+        """
+        with self._lock:
+            self._purge_expired()
+            return {
+                'documents': len(self._documents),
+                'max_documents': self.max_documents,
+                'ttl': self.ttl,
+                'evicted': self.evicted,
+                'expired': self.expired,
+            }
+
+    def _purge_expired(self):
+        """从最久未访问的一端清理过期文档（调用方需持有锁）"""
+        deadline = time.time() - self.ttl
+        while self._documents:
+            document = next(iter(self._documents.values()))
+            if document.last_access >= deadline:
+                break
+            self._documents.popitem(last=False)
+            self.expired += 1
+
+
+# 全局文档存储实例
+document_store = DocumentStore(
+    max_documents=config.document_max_items,
+    ttl=config.document_ttl
+)
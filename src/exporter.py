@@ -3,12 +3,15 @@
 实现题目导出为文本和图片
 """
 
+import io
+import zipfile
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Iterator, Set
 from datetime import datetime
 
 from .models import Question
 from .image_processor import image_processor
+from .metrics import metrics
 from .utils import get_safe_filename
 from .config import config
 
@@ -94,12 +97,7 @@ class Exporter:
             else:
                 filename = f"question_{timestamp}.png"
         
-        # 确保文件名安全且为 .png 格式
-        safe_filename = get_safe_filename(filename)
-        if not safe_filename.lower().endswith('.png'):
-            safe_filename = Path(safe_filename).stem + '.png'
-        
-        output_path = self.export_dir / safe_filename
+        output_path = self._image_output_path(filename)
         
         # 裁剪并保存图片
         image_processor.crop_question_image(
@@ -132,6 +130,7 @@ class Exporter:
         """
         results = {}
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        image_crops = []
         
         for question in questions:
             result = {}
@@ -146,22 +145,91 @@ class Exporter:
                 )
                 result['text'] = text_path
             
-            # 导出图片
-            if export_format in ['image', 'both']:
+            # 导出图片（先收集，之后原图只解码一次统一裁剪）
+            if export_format in ['image', 'both'] and question.bounding_box is not None:
                 image_filename = f"{prefix}question_{question.question_id}_{timestamp}.png"
-                image_path = self.export_question_as_image(
-                    question,
-                    original_image_path,
-                    filename=image_filename,
-                    include_question_id=False
-                )
-                if image_path:
-                    result['image'] = image_path
+                image_crops.append((question, str(self._image_output_path(image_filename))))
             
             results[question.question_id] = result
         
+        if image_crops:
+            with metrics.stage('export_crop'):
+                image_paths = image_processor.crop_question_images(original_image_path, image_crops)
+            for (question, _), image_path in zip(image_crops, image_paths):
+                if image_path:
+                    results[question.question_id]['image'] = image_path
+        
         return results
     
+    def iter_zip_export(
+        self,
+        questions: List[Question],
+        original_image_path: str,
+        export_format: str = 'both',
+        prefix: str = ''
+    ) -> Iterator[bytes]:
+        """
+        逐题生成文本和裁剪图片并写入 ZIP，边生成边产出压缩包内容（不写入导出目录）
+        
+        原图只解码一次；每写完一个文件就产出已生成的字节，内存中最多保留一张裁剪图片。
+        原图是否存在和裁剪坐标在调用时立即检查，开始输出后不会再因输入无效而中断。
+        
+        Args:
+            questions: 题目列表
+            original_image_path: 原始图片路径
+            export_format: 导出格式，可选 'text', 'image', 'both'
+            prefix: 压缩包内文件名前缀
+            
+        Returns:
+            Iterator[bytes]: ZIP 文件内容片段
+            
+        Raises:
+            FileNotFoundError: 需要导出图片但原图不存在
+            ValueError: 裁剪坐标无效
+        """
+        with_images = export_format in ['image', 'both']
+        image_questions = [q for q in questions if with_images and q.bounding_box is not None]
+        crops = image_processor.iter_crops(
+            original_image_path, [q.bounding_box for q in image_questions]
+        ) if image_questions else iter(())
+        image_ids = {q.question_id for q in image_questions}
+        return self._zip_chunks(questions, crops, image_ids, export_format, prefix)
+    
+    @staticmethod
+    def _zip_chunks(
+        questions: List[Question],
+        crops: Iterator[bytes],
+        image_ids: Set[int],
+        export_format: str,
+        prefix: str
+    ) -> Iterator[bytes]:
+        """按题目顺序写入文本和裁剪图片，每写完一个文件产出一次"""
+        stream = _ZipStream()
+        with zipfile.ZipFile(stream, mode='w') as archive:
+            for question in questions:
+                name = get_safe_filename(f"{prefix}question_{question.question_id}")
+                
+                # 文本压缩率高，使用 DEFLATE
+                if export_format in ['text', 'both']:
+                    archive.writestr(f"{name}.txt", question.text.encode('utf-8'),
+                                     compress_type=zipfile.ZIP_DEFLATED)
+                    yield stream.drain()
+                
+                # PNG 已经压缩过，直接存储
+                if question.question_id in image_ids:
+                    archive.writestr(f"{name}.png", next(crops), compress_type=zipfile.ZIP_STORED)
+                    yield stream.drain()
+        
+        # 写入中央目录
+        yield stream.drain()
+    
+    def _image_output_path(self, filename: str) -> Path:
+        """确保文件名安全且为 .png 格式，返回导出路径"""
+        safe_filename = get_safe_filename(filename)
+        if not safe_filename.lower().endswith('.png'):
+            safe_filename = Path(safe_filename).stem + '.png'
+        return self.export_dir / safe_filename
+    
     def get_export_dir(self) -> str:
         """获取导出目录路径"""
         return str(self.export_dir)
@@ -177,6 +245,27 @@ class Exporter:
         self.export_dir.mkdir(parents=True, exist_ok=True)
 
 
+class _ZipStream(io.RawIOBase):
+    """只写的 ZIP 输出流，暂存写入的数据直到被取走"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        """取走已写入的数据"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
 # 全局导出器实例
 exporter = Exporter()
 
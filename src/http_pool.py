@@ -0,0 +1,254 @@
+"""
+HTTP 连接池模块
+为 OCR API 调用提供长连接复用的同步 / 异步 HTTP 客户端，并统计连接池使用情况
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator, Callable
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class _ConnectionCountingTransport(httpx.AsyncBaseTransport):
+    """
+    统计新建连接数的异步传输层包装
+
+    通过 httpcore 的 trace 扩展观察 TCP 连接的建立（复用已有连接时不会触发），
+    不访问 httpx 的内部连接池。
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, on_connect: Callable[[], None]):
+        self._transport = transport
+        self._on_connect = on_connect
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        outer = request.extensions.get('trace')
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            if event_name == 'connection.connect_tcp.complete':
+                self._on_connect()
+            if outer is not None:
+                await outer(event_name, info)
+
+        request.extensions = {**request.extensions, 'trace': trace}
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class PooledHTTPClient:
+    """带连接池的 HTTP 客户端（同步使用 requests.Session，异步使用 httpx.AsyncClient）"""
+
+    def __init__(
+        self,
+        timeout: float,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 60.0,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        初始化 HTTP 客户端
+
+        Args:
+            timeout: 请求超时时间（秒）
+            max_connections: 每个主机的最大连接数
+            max_keepalive: 保持空闲的最大连接数
+            keepalive_expiry: 空闲连接的保持时间（秒）
+            async_transport: 自定义异步传输层（主要用于测试）
+        """
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self._async_transport = async_transport
+
+        self._session: Optional[requests.Session] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+        # 异步并发闸门：超过连接数上限的请求在此排队，便于统计等待次数
+        # （同步连接池由 HTTPAdapter(pool_block=True) 限制，不单独统计等待）
+        self._async_gate: Optional[asyncio.Semaphore] = None
+
+        # 统计数据
+        self._lock = threading.Lock()
+        self._requests_total = 0
+        self._in_flight = 0
+        self._connections_opened = 0
+        self._waited_total = 0
+        self._wait_seconds_total = 0.0
+
+    # ============ 同步接口 ============
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        发送同步 POST 请求（复用连接）
+
+        Args:
+            url: 请求地址
+            **kwargs: 传递给 requests.Session.post 的参数
+
+        Returns:
+            requests.Response: 响应对象
+        """
+        session = self._get_session()
+        kwargs.setdefault('timeout', self.timeout)
+
+        self._enter()
+        try:
+            return session.post(url, **kwargs)
+        finally:
+            self._exit()
+
+    def _get_session(self) -> requests.Session:
+        """获取同步会话（懒加载）"""
+        if self._session is None:
+            session = requests.Session()
+            session.trust_env = False  # 禁用代理
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=self.max_connections,
+                pool_block=True
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def close(self):
+        """关闭同步会话"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    # ============ 异步接口 ============
+
+    @asynccontextmanager
+    async def astream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        发送异步流式请求，在上下文中逐步读取响应体（连接在退出上下文前一直占用）
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+            **kwargs: 传递给 httpx.AsyncClient.stream 的参数
+
+        Yields:
+            httpx.Response: 尚未读取响应体的响应对象
+        """
+        client = self._get_async_client()
+        gate = await self._acquire_async_gate()
+
+        self._enter()
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                yield response
+        finally:
+            self._exit()
+            gate.release()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """获取异步客户端（懒加载，绑定到当前事件循环）"""
+        if self._async_client is None or self._async_client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry
+            )
+            transport = _ConnectionCountingTransport(
+                self._async_transport or httpx.AsyncHTTPTransport(limits=limits),
+                self._record_connect
+            )
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=limits,
+                transport=transport,
+                trust_env=False  # 禁用代理
+            )
+        return self._async_client
+
+    async def _acquire_async_gate(self) -> asyncio.Semaphore:
+        """获取异步并发闸门，连接数已满时排队等待并记录等待时间"""
+        if self._async_gate is None:
+            self._async_gate = asyncio.Semaphore(self.max_connections)
+        gate = self._async_gate
+
+        if gate.locked():
+            start = time.monotonic()
+            await gate.acquire()
+            self._record_wait(time.monotonic() - start)
+        else:
+            await gate.acquire()
+        return gate
+
+    async def awarmup(self, url: str, count: int = 1, headers: Optional[Dict[str, str]] = None):
+        """
+        预先建立异步连接，避免首批请求承担 TCP / TLS 握手开销
+        （与普通请求一样经过并发闸门并计入统计）
+
+        Args:
+            url: 用于建立连接的地址（同一主机）
+            count: 预建立的连接数
+            headers: 请求头
+        """
+        async def _head():
+            try:
+                async with self.astream('HEAD', url, headers=headers):
+                    pass
+            except httpx.HTTPError:
+                pass
+
+        await asyncio.gather(*[_head() for _ in range(min(count, self.max_connections))])
+
+    async def aclose(self):
+        """关闭异步客户端"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self._async_gate = None
+
+    # ============ 统计 ============
+
+    def _enter(self):
+        with self._lock:
+            self._requests_total += 1
+            self._in_flight += 1
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _record_connect(self):
+        with self._lock:
+            self._connections_opened += 1
+
+    def _record_wait(self, seconds: float):
+        with self._lock:
+            self._waited_total += 1
+            self._wait_seconds_total += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            Dict[str, Any]: 包含进行中的请求数、异步请求新建的连接数、等待次数等
+                （connections_opened_total 接近 requests_total 时说明连接很少被复用，
+                应增大 max_keepalive 或 keepalive_expiry；requests_waited 持续增长时应增大 max_connections）
+        """
+        with self._lock:
+            return {
+                'max_connections': self.max_connections,
+                'max_keepalive': self.max_keepalive,
+                'requests_in_flight': self._in_flight,
+                'requests_total': self._requests_total,
+                'connections_opened_total': self._connections_opened,
+                'requests_waited': self._waited_total,
+                'wait_seconds_total': round(self._wait_seconds_total, 6),
+            }
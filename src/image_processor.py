@@ -3,11 +3,89 @@
 提供图片裁剪、坐标计算等功能
 """
 
+import io
+import math
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple, Optional
-from PIL import Image
+from typing import List, Tuple, Optional, Dict, Any, Iterator
+from PIL import Image, ImageChops, features
 
 from .models import BoundingBox, Question
+from .utils import get_image_mime_type
+
+
+# 预处理输出格式对应的 PIL 格式名和 MIME 类型
+OCR_UPLOAD_FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+# DeepSeek OCR 返回的坐标按发送图片的宽高归一化到 0-999（与发送图片的像素尺寸无关）
+OCR_COORD_RANGE = 999
+
+
+@dataclass
+class PreparedImage:
+    """预处理后准备发送给 OCR API 的图片"""
+    mime_type: str  # 发送图片的 MIME 类型
+    original_size: Tuple[int, int]  # 原图尺寸 (宽, 高)
+    sent_size: Tuple[int, int]  # 发送图片的尺寸 (宽, 高)
+    original_bytes: int  # 原图文件大小
+    sent_bytes: int  # 发送图片编码后的大小（Base64 之前）
+    data: Optional[bytes] = None  # 重新编码后的图片内容
+    source_path: Optional[str] = None  # 直接发送原图时的文件路径（发送时按块读取）
+    grayscale: bool = False  # 是否转换为灰度图
+    offset: Tuple[int, int] = (0, 0)  # 切块在原图中的左上角坐标（未切块时为原点）
+    
+    @property
+    def scale_x(self) -> float:
+        """归一化坐标到原图（切块时为切块区域）像素坐标的 x 方向缩放比例"""
+        return self.original_size[0] / OCR_COORD_RANGE
+    
+    @property
+    def scale_y(self) -> float:
+        """归一化坐标到原图（切块时为切块区域）像素坐标的 y 方向缩放比例"""
+        return self.original_size[1] / OCR_COORD_RANGE
+    
+    @property
+    def bytes_saved(self) -> int:
+        """相比直接发送原图节省的字节数"""
+        return self.original_bytes - self.sent_bytes
+    
+    def to_stats(self) -> Dict[str, Any]:
+        """转换为统计信息字典"""
+        return {
+            'original_size': list(self.original_size),
+            'sent_size': list(self.sent_size),
+            'original_bytes': self.original_bytes,
+            'sent_bytes': self.sent_bytes,
+            'bytes_saved': self.bytes_saved,
+            'grayscale': self.grayscale,
+        }
+
+
+@dataclass
+class ImageTile:
+    """长图切分出的水平条带（坐标位于原图坐标系）"""
+    top: int  # 条带上边界
+    bottom: int  # 条带下边界
+    keep_top: float  # 条带负责的区域上边界（与上一条带的重叠区按中线划分）
+    keep_bottom: float  # 条带负责的区域下边界
+    overlap_top: float = 0.0  # 与上一条带的重叠区下边界（即上一条带的下边界）
+    overlap_bottom: float = float('inf')  # 与下一条带的重叠区上边界（即下一条带的上边界）
+    
+    @property
+    def height(self) -> int:
+        """获取条带高度"""
+        return self.bottom - self.top
+    
+    def owns(self, box: BoundingBox) -> bool:
+        """文本块的中心是否位于条带负责的区域内"""
+        return self.keep_top <= box.center_y < self.keep_bottom
+    
+    def in_overlap(self, box: BoundingBox) -> bool:
+        """文本块是否与相邻条带的重叠区相交（需要与相邻条带的识别结果去重）"""
+        return box.y1 < self.overlap_top or box.y2 > self.overlap_bottom
 
 
 class ImageProcessor:
@@ -41,20 +119,11 @@ class ImageProcessor:
         
         # 打开图片
         with Image.open(image_path) as img:
-            width, height = img.size
-            
             # 添加边距并确保坐标在图片范围内
-            x1 = max(0, int(box.x1) - padding)
-            y1 = max(0, int(box.y1) - padding)
-            x2 = min(width, int(box.x2) + padding)
-            y2 = min(height, int(box.y2) + padding)
-            
-            # 验证坐标
-            if x1 >= x2 or y1 >= y2:
-                raise ValueError(f"无效的裁剪坐标: ({x1}, {y1}, {x2}, {y2})")
+            crop_box = ImageProcessor._padded_crop_box(box, img.size, padding)
             
             # 裁剪图片
-            cropped = img.crop((x1, y1, x2, y2))
+            cropped = img.crop(crop_box)
             
             # 确保输出目录存在
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
@@ -94,6 +163,143 @@ class ImageProcessor:
             padding
         )
     
+    @staticmethod
+    def crop_images_by_boxes(
+        image_path: str,
+        crops: List[Tuple[BoundingBox, str]],
+        padding: int = 10,
+        data: Optional[bytes] = None
+    ) -> List[str]:
+        """
+        只解码一次原图，按多个边界框裁剪并分别保存
+        
+        Args:
+            image_path: 原始图片路径
+            crops: (边界框, 输出图片路径) 列表
+            padding: 边距（像素）
+            data: 已在内存中的图片内容（提供时不再读取 image_path）
+            
+        Returns:
+            List[str]: 输出图片路径列表，与 crops 顺序一致
+            
+        Raises:
+            FileNotFoundError: 图片文件不存在
+            ValueError: 坐标无效（在写入任何文件之前检查）
+        """
+        if data is None and not Path(image_path).exists():
+            raise FileNotFoundError(f"图片文件不存在: {image_path}")
+        
+        with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
+            crop_boxes = [ImageProcessor._padded_crop_box(box, img.size, padding) for box, _ in crops]
+            
+            # 完整解码一次，之后的裁剪都直接使用内存中的像素
+            img.load()
+            for crop_box, (_, output_path) in zip(crop_boxes, crops):
+                Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                img.crop(crop_box).save(output_path)
+        
+        return [output_path for _, output_path in crops]
+    
+    @staticmethod
+    def iter_crops(
+        image_path: str,
+        boxes: List[BoundingBox],
+        padding: int = 10,
+        image_format: str = 'PNG',
+        data: Optional[bytes] = None
+    ) -> Iterator[bytes]:
+        """
+        只解码一次原图，按顺序逐个裁剪并编码（需要时才编码下一张，内存中最多保留一张裁剪结果）
+        
+        图片是否存在和所有坐标在调用时立即检查（只读取图片头），而不是等到取第一张裁剪结果时。
+        
+        Args:
+            image_path: 原始图片路径
+            boxes: 边界框列表
+            padding: 边距（像素）
+            image_format: 输出格式（PIL 格式名）
+            data: 已在内存中的图片内容（提供时不再读取 image_path）
+            
+        Returns:
+            Iterator[bytes]: 与 boxes 顺序一致的裁剪图片内容
+            
+        Raises:
+            FileNotFoundError: 图片文件不存在
+            ValueError: 坐标无效
+        """
+        if data is None and not Path(image_path).exists():
+            raise FileNotFoundError(f"图片文件不存在: {image_path}")
+        
+        size = ImageProcessor.get_image_size(image_path, data)
+        crop_boxes = [ImageProcessor._padded_crop_box(box, size, padding) for box in boxes]
+        return ImageProcessor._encode_crops(image_path, crop_boxes, image_format, data)
+    
+    @staticmethod
+    def _encode_crops(
+        image_path: str,
+        crop_boxes: List[Tuple[int, int, int, int]],
+        image_format: str,
+        data: Optional[bytes]
+    ) -> Iterator[bytes]:
+        """解码原图并逐个产出已检查过的裁剪区域的编码结果"""
+        with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
+            img.load()
+            for crop_box in crop_boxes:
+                buffer = io.BytesIO()
+                img.crop(crop_box).save(buffer, format=image_format)
+                yield buffer.getvalue()
+    
+    @staticmethod
+    def crop_question_images(
+        image_path: str,
+        crops: List[Tuple[Question, str]],
+        padding: int = 10,
+        data: Optional[bytes] = None
+    ) -> List[Optional[str]]:
+        """
+        批量裁剪多道题目对应的图片区域（原图只解码一次）
+        
+        Args:
+            image_path: 原始图片路径
+            crops: (题目, 输出图片路径) 列表
+            padding: 边距（像素）
+            data: 已在内存中的图片内容（提供时不再读取 image_path）
+            
+        Returns:
+            List[Optional[str]]: 输出图片路径列表，与 crops 顺序一致，没有边界框的题目为 None
+        """
+        boxes = [(question.bounding_box, output_path) for question, output_path in crops]
+        written = iter(ImageProcessor.crop_images_by_boxes(
+            image_path,
+            [(box, output_path) for box, output_path in boxes if box is not None],
+            padding,
+            data
+        ))
+        return [next(written) if box is not None else None for box, _ in boxes]
+    
+    @staticmethod
+    def _padded_crop_box(
+        box: BoundingBox,
+        image_size: Tuple[int, int],
+        padding: int
+    ) -> Tuple[int, int, int, int]:
+        """
+        添加边距并限制在图片范围内的裁剪区域
+        
+        Raises:
+            ValueError: 坐标无效
+        """
+        width, height = image_size
+        x1 = max(0, int(box.x1) - padding)
+        y1 = max(0, int(box.y1) - padding)
+        x2 = min(width, int(box.x2) + padding)
+        y2 = min(height, int(box.y2) + padding)
+        
+        # 验证坐标
+        if x1 >= x2 or y1 >= y2:
+            raise ValueError(f"无效的裁剪坐标: ({x1}, {y1}, {x2}, {y2})")
+        return x1, y1, x2, y2
+    
     @staticmethod
     def calculate_bounding_box(boxes: List[BoundingBox]) -> Optional[BoundingBox]:
         """
@@ -116,17 +322,18 @@ class ImageProcessor:
         return BoundingBox(min_x, min_y, max_x, max_y)
     
     @staticmethod
-    def get_image_size(image_path: str) -> Tuple[int, int]:
+    def get_image_size(image_path: str, data: Optional[bytes] = None) -> Tuple[int, int]:
         """
         获取图片尺寸
         
         Args:
             image_path: 图片路径
+            data: 已在内存中的图片内容（提供时不再读取 image_path）
             
         Returns:
             Tuple[int, int]: (宽度, 高度)
         """
-        with Image.open(image_path) as img:
+        with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
             return img.size
     
     @staticmethod
@@ -176,6 +383,279 @@ class ImageProcessor:
         
         return output_path
 
+    
+    @staticmethod
+    def prepare_for_ocr(
+        image_path: str,
+        max_side: int = 1280,
+        image_format: str = 'jpeg',
+        quality: int = 85,
+        gray_tolerance: int = 8,
+        data: Optional[bytes] = None
+    ) -> PreparedImage:
+        """
+        将图片缩放到 OCR 模型的有效输入分辨率并重新编码，减小请求体积
+        
+        Args:
+            image_path: 原始图片路径
+            max_side: 长边的最大像素数
+            image_format: 输出格式，'jpeg' 或 'webp'
+            quality: 输出质量（1-100）
+            gray_tolerance: 各颜色通道的最大差值不超过该值时视为灰度图
+            data: 已在内存中的图片内容（提供时不再读取 image_path）
+            
+        Returns:
+            PreparedImage: 预处理结果，归一化坐标按 scale_x / scale_y 映射回原图
+        """
+        original_bytes = len(data) if data is not None else Path(image_path).stat().st_size
+        if image_format not in OCR_UPLOAD_FORMATS or (image_format == 'webp' and not features.check('webp')):
+            image_format = 'jpeg'
+        pil_format, mime_type = OCR_UPLOAD_FORMATS[image_format]
+        
+        with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
+            original_size = img.size
+            scale = min(1.0, max_side / max(original_size))
+            target_size = (
+                max(1, round(original_size[0] * scale)),
+                max(1, round(original_size[1] * scale))
+            )
+            
+            # JPEG 可以在解码时直接按 1/2、1/4、1/8 缩小，避免完整解码大图
+            if img.format == 'JPEG' and scale < 0.5:
+                img.draft('RGB', target_size)
+            
+            prepared = ImageProcessor._flatten_to_rgb(img)
+        
+        encoded, grayscale = ImageProcessor._encode_for_ocr(
+            prepared, target_size, pil_format, quality, gray_tolerance
+        )
+        
+        # 没有缩放且重新编码后反而更大时，直接发送原图
+        if scale == 1.0 and len(encoded) >= original_bytes:
+            return PreparedImage(
+                mime_type=get_image_mime_type(image_path),
+                original_size=original_size,
+                sent_size=original_size,
+                original_bytes=original_bytes,
+                sent_bytes=original_bytes,
+                data=data,
+                source_path=image_path if data is None else None
+            )
+        
+        return PreparedImage(
+            mime_type=mime_type,
+            original_size=original_size,
+            sent_size=target_size,
+            original_bytes=original_bytes,
+            sent_bytes=len(encoded),
+            data=encoded,
+            grayscale=grayscale
+        )
+    
+    @staticmethod
+    def plan_tiles(
+        size: Tuple[int, int],
+        min_aspect: float = 2.0,
+        tile_aspect: float = 1.4,
+        overlap: float = 0.1,
+        max_tiles: int = 16
+    ) -> List[ImageTile]:
+        """
+        将长图切分为相互重叠的水平条带
+        
+        Args:
+            size: 原图尺寸 (宽, 高)
+            min_aspect: 高宽比超过该值时才切分
+            tile_aspect: 条带的高宽比
+            overlap: 相邻条带的重叠高度占条带高度的比例，应大于单行文字的高度
+            max_tiles: 条带数量上限，超出时增大条带高度
+            
+        Returns:
+            List[ImageTile]: 条带列表，不需要切分时返回空列表
+        """
+        width, height = size
+        if width <= 0 or height <= width * min_aspect:
+            return []
+        
+        band = max(1, round(width * tile_aspect))
+        gap = round(band * overlap)
+        count = max(1, math.ceil((height - gap) / max(1, band - gap)))
+        if count > max_tiles:
+            count = max_tiles
+            band = math.ceil((height + (count - 1) * gap) / count)
+        if count < 2:
+            return []
+        
+        # 条带在高度方向上均匀分布，最后一个条带与原图底部对齐
+        step = (height - band) / (count - 1)
+        bounds = [(round(i * step), min(height, round(i * step) + band)) for i in range(count)]
+        bounds[-1] = (bounds[-1][0], height)
+        
+        tiles = []
+        for i, (top, bottom) in enumerate(bounds):
+            keep_top = 0.0 if i == 0 else (top + bounds[i - 1][1]) / 2
+            keep_bottom = float('inf') if i == count - 1 else (bottom + bounds[i + 1][0]) / 2
+            tiles.append(ImageTile(
+                top=top,
+                bottom=bottom,
+                keep_top=keep_top,
+                keep_bottom=keep_bottom,
+                overlap_top=0.0 if i == 0 else bounds[i - 1][1],
+                overlap_bottom=float('inf') if i == count - 1 else bounds[i + 1][0]
+            ))
+        return tiles
+    
+    @staticmethod
+    def prepare_tiles(
+        image_path: str,
+        tiles: List[ImageTile],
+        max_side: int = 1280,
+        image_format: str = 'jpeg',
+        quality: int = 85,
+        gray_tolerance: int = 8,
+        data: Optional[bytes] = None
+    ) -> List[PreparedImage]:
+        """
+        只解码一次原图，将每个条带缩放并重新编码为单独的 OCR 输入
+        
+        Args:
+            image_path: 原始图片路径
+            tiles: plan_tiles 生成的条带列表
+            max_side: 每个条带长边的最大像素数
+            image_format: 输出格式，'jpeg' 或 'webp'
+            quality: 输出质量（1-100）
+            gray_tolerance: 各颜色通道的最大差值不超过该值时视为灰度图
+            data: 已在内存中的图片内容（提供时不再读取 image_path）
+            
+        Returns:
+            List[PreparedImage]: 与条带一一对应的预处理结果，归一化坐标先按条带尺寸缩放再按 offset 映射回原图
+        """
+        original_bytes = len(data) if data is not None else Path(image_path).stat().st_size
+        if image_format not in OCR_UPLOAD_FORMATS or (image_format == 'webp' and not features.check('webp')):
+            image_format = 'jpeg'
+        pil_format, mime_type = OCR_UPLOAD_FORMATS[image_format]
+        
+        with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
+            width, height = img.size
+            scale = min(1.0, max_side / max(width, max(tile.height for tile in tiles)))
+            
+            # 所有条带使用相同的缩放比例，JPEG 可以在解码时直接缩小
+            if img.format == 'JPEG' and scale < 0.5:
+                img.draft('RGB', (max(1, round(width * scale)), max(1, round(height * scale))))
+            decoded = ImageProcessor._flatten_to_rgb(img)
+        
+        factor_x = decoded.width / width
+        factor_y = decoded.height / height
+        prepared_tiles = []
+        for tile in tiles:
+            band = decoded.crop((0, round(tile.top * factor_y), decoded.width, round(tile.bottom * factor_y)))
+            target_size = (max(1, round(width * scale)), max(1, round(tile.height * scale)))
+            encoded, grayscale = ImageProcessor._encode_for_ocr(
+                band, target_size, pil_format, quality, gray_tolerance
+            )
+            prepared_tiles.append(PreparedImage(
+                mime_type=mime_type,
+                original_size=(width, tile.height),
+                sent_size=target_size,
+                # 原图按条带高度分摊的字节数（用于统计节省的流量）
+                original_bytes=round(original_bytes * tile.height / height),
+                sent_bytes=len(encoded),
+                data=encoded,
+                grayscale=grayscale,
+                offset=(0, tile.top)
+            ))
+        return prepared_tiles
+    
+    @staticmethod
+    def _encode_for_ocr(
+        img: Image.Image,
+        target_size: Tuple[int, int],
+        pil_format: str,
+        quality: int,
+        gray_tolerance: int
+    ) -> Tuple[bytes, bool]:
+        """
+        缩放到目标尺寸并编码
+        
+        Returns:
+            Tuple[bytes, bool]: (编码后的内容, 是否转换为灰度图)
+        """
+        if img.size != target_size:
+            img = img.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        
+        # 颜色通道几乎一致时转为灰度图，体积更小且不影响识别
+        grayscale = ImageProcessor._is_grayscale(img, gray_tolerance)
+        if grayscale:
+            img = img.convert('L')
+        
+        buffer = io.BytesIO()
+        img.save(buffer, format=pil_format, quality=quality, optimize=True)
+        return buffer.getvalue(), grayscale
+    
+    @staticmethod
+    def build_previews(
+        image_path: str,
+        widths: List[int],
+        quality: int = 80,
+        data: Optional[bytes] = None
+    ) -> Dict[int, bytes]:
+        """
+        生成多个宽度的 JPEG 预览图（只解码一次原图，从大到小逐级缩小）
+        
+        Args:
+            image_path: 原始图片路径
+            widths: 预览图宽度列表，不小于原图宽度的会被跳过
+            quality: JPEG 质量（1-100）
+            data: 已在内存中的图片内容（提供时不再读取 image_path）
+            
+        Returns:
+            Dict[int, bytes]: 宽度 -> 预览图的 JPEG 内容
+        """
+        with Image.open(io.BytesIO(data) if data is not None else image_path) as img:
+            original_width, original_height = img.size
+            targets = sorted((w for w in set(widths) if 0 < w < original_width), reverse=True)
+            if not targets:
+                return {}
+            
+            # JPEG 按最大的预览尺寸解码（1/2、1/4、1/8 缩小），避免完整解码大图
+            if img.format == 'JPEG':
+                img.draft('RGB', (targets[0], max(1, round(original_height * targets[0] / original_width))))
+            current = ImageProcessor._flatten_to_rgb(img)
+        
+        previews = {}
+        for width in targets:
+            height = max(1, round(original_height * width / original_width))
+            current = current.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            buffer = io.BytesIO()
+            current.save(buffer, format='JPEG', quality=quality, optimize=True)
+            previews[width] = buffer.getvalue()
+        return previews
+    
+    @staticmethod
+    def _flatten_to_rgb(img: Image.Image) -> Image.Image:
+        """将图片转换为 RGB / L 模式，透明区域填充为白色"""
+        if img.mode in ('RGB', 'L'):
+            return img.copy()
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            rgba = img.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return img.convert('RGB')
+    
+    @staticmethod
+    def _is_grayscale(img: Image.Image, tolerance: int) -> bool:
+        """判断 RGB 图片的各颜色通道是否几乎一致"""
+        if img.mode == 'L':
+            return True
+        if tolerance < 0:
+            return False
+        r, g, b = img.split()
+        return (
+            ImageChops.difference(r, g).getextrema()[1] <= tolerance
+            and ImageChops.difference(g, b).getextrema()[1] <= tolerance
+        )
+
 
 # 全局图像处理器实例
 image_processor = ImageProcessor()
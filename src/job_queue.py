@@ -0,0 +1,234 @@
+"""
+后台任务模块
+提供进程内的任务队列和 worker 池，用于异步执行耗时的 OCR 识别任务
+"""
+
+import time
+import uuid
+import asyncio
+import threading
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import config
+
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+@dataclass
+class Job:
+    """后台任务"""
+    job_id: str  # 任务 ID
+    payload: Dict[str, Any] = field(default_factory=dict)  # 任务参数
+    status: str = JOB_PENDING  # 任务状态
+    result: Any = None  # 任务结果
+    error: Optional[str] = None  # 错误信息
+    created_at: float = field(default_factory=time.time)  # 提交时间
+    started_at: Optional[float] = None  # 开始执行时间
+    finished_at: Optional[float] = None  # 完成时间
+
+    @property
+    def is_finished(self) -> bool:
+        """任务是否已结束（成功或失败）"""
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def to_status_dict(self) -> Dict[str, Any]:
+        """转换为状态字典（不包含结果）"""
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+JobHandler = Callable[[Job], Awaitable[Any]]
+
+
+class JobManager:
+    """任务管理器（asyncio 队列 + worker 池）"""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        result_ttl: float = 3600,
+        max_pending: int = 1000,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        初始化任务管理器
+
+        Args:
+            workers: 并发执行任务的 worker 数
+            result_ttl: 已完成任务的保留时间（秒）
+            max_pending: 队列中最多等待的任务数
+            clock: 返回当前时间（秒）的函数，用于任务时间戳和结果过期判断（测试时可替换）
+        """
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.max_pending = max_pending
+        self._clock = clock
+
+        # 任务表由事件循环修改，上传文件存储的清理线程也会读取（active_payloads），需要加锁
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._handler: Optional[JobHandler] = None
+
+    @property
+    def is_running(self) -> bool:
+        """worker 池是否已启动"""
+        return bool(self._tasks)
+
+    async def start(self, handler: JobHandler):
+        """
+        启动 worker 池
+
+        Args:
+            handler: 任务处理函数，接收 Job，返回任务结果
+        """
+        if self.is_running:
+            return
+        self._handler = handler
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        """停止 worker 池（执行中的任务被取消，未执行的任务被丢弃，均标记为失败）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            self._finish(job, JOB_FAILED, "服务停止，任务未执行")
+            self._queue.task_done()
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        """
+        提交任务
+
+        Args:
+            payload: 任务参数
+
+        Returns:
+            Job: 新建的任务
+
+        Raises:
+            RuntimeError: worker 池未启动
+            asyncio.QueueFull: 等待中的任务过多
+        """
+        if not self.is_running:
+            raise RuntimeError("任务队列未启动")
+        self._purge_expired()
+        job = Job(job_id=uuid.uuid4().hex, payload=payload, created_at=self._clock())
+        self._queue.put_nowait(job)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        查询任务
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            Optional[Job]: 任务，不存在或已过期时返回 None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and self._is_expired(job):
+                del self._jobs[job_id]
+                return None
+            return job
+
+    def active_payloads(self) -> List[Dict[str, Any]]:
+        """
+        排队中和执行中任务的参数（任务引用的文件在任务结束前不能被清理，可在其他线程中调用）
+
+        Returns:
+            List[Dict[str, Any]]: 任务参数列表
+        """
+        with self._lock:
+            return [job.payload for job in self._jobs.values() if not job.is_finished]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取任务队列统计信息
+
+        Returns:
+            Dict[str, Any]: 各状态的任务数和队列长度
+        """
+        counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {
+            'workers': self.workers,
+            'queue_size': self._queue.qsize() if self._queue else 0,
+            'max_pending': self.max_pending,
+            **counts,
+        }
+
+    async def _worker(self):
+        """worker 循环：从队列中取出任务并执行"""
+        while True:
+            job = await self._queue.get()
+            try:
+                job.status = JOB_RUNNING
+                job.started_at = self._clock()
+                result = await self._handler(job)
+                job.result = result
+                self._finish(job, JOB_DONE)
+            except asyncio.CancelledError:
+                # 服务停止时取消执行中的任务，任务结束后不再占用引用的文件
+                self._finish(job, JOB_FAILED, "服务停止，任务已取消")
+                raise
+            except Exception as e:
+                self._finish(job, JOB_FAILED, f"处理失败: {str(e)}")
+                print(f"\n❌ 任务 {job.job_id} 失败:\n{traceback.format_exc()}")
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        """标记任务结束（状态和完成时间同时更新）"""
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.finished_at = self._clock()
+
+    async def _sweeper(self):
+        """定期清理过期的任务结果"""
+        interval = max(1.0, min(self.result_ttl, 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            self._purge_expired()
+
+    def _is_expired(self, job: Job) -> bool:
+        return job.is_finished and self._clock() - job.finished_at > self.result_ttl
+
+    def _purge_expired(self):
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if self._is_expired(job)]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+# 全局任务管理器实例
+job_manager = JobManager(
+    workers=config.job_workers,
+    result_ttl=config.job_result_ttl,
+    max_pending=config.job_max_pending
+)
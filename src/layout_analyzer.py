@@ -0,0 +1,200 @@
+"""
+版面分析模块
+检测分栏和文本行，按真实阅读顺序排列文本块（双栏试卷先读完左栏再读右栏）
+"""
+
+from bisect import bisect_right
+from typing import List, Tuple, Dict, Iterable
+
+from .config import config
+from .models import BlockColumns
+
+
+class LayoutAnalyzer:
+    """
+    版面分析器
+
+    所有步骤都是对坐标区间的排序和扫描，复杂度为 O(n log n)，不做文本块之间的两两比较：
+    1. 对较窄文本块的 x 区间排序后合并，区间之间的空白即为栏间空隙（过窄的栏与相邻栏合并）
+    2. 横跨栏间空隙的文本块（标题、通栏题干等）将页面分为上下若干段
+    3. 每段内逐栏输出，栏内按中心点 y 坐标扫描分行，行内按 x 坐标排序；
+       正文栏的各行基本占满栏宽，段内少于两栏满足行数和行宽要求时（如两列排列的选项）
+       不分栏，整段逐行输出
+    """
+
+    def __init__(
+        self,
+        detect_columns: bool = True,
+        span_ratio: float = 0.5,
+        min_column_ratio: float = 0.25,
+        min_column_lines: int = 3,
+        min_column_fill: float = 0.6,
+        line_tolerance: float = 0.5
+    ):
+        """
+        初始化版面分析器
+
+        Args:
+            detect_columns: 是否检测分栏，为 False 时只分行
+            span_ratio: 宽度超过页面宽度该比例的文本块不参与分栏检测
+            min_column_ratio: 栏的最小宽度（占页面宽度的比例），更窄的栏与相邻栏合并
+            min_column_lines: 栏内的最少行数
+            min_column_fill: 栏内各行宽度的中位数占栏宽的最小比例
+            line_tolerance: 中心点 y 坐标之差小于文本块高度中位数的该倍数时视为同一行
+        """
+        self.detect_columns = detect_columns
+        self.span_ratio = span_ratio
+        self.min_column_ratio = min_column_ratio
+        self.min_column_lines = min_column_lines
+        self.min_column_fill = min_column_fill
+        self.line_tolerance = line_tolerance
+
+    def reading_order(self, columns: BlockColumns) -> List[int]:
+        """
+        计算文本块的阅读顺序
+
+        Args:
+            columns: 文本块的列式存储
+
+        Returns:
+            List[int]: 按阅读顺序排列的文本块下标
+        """
+        count = len(columns)
+        if count < 2:
+            return list(range(count))
+
+        x1, y1, x2, y2 = columns.x1, columns.y1, columns.x2, columns.y2
+        heights = sorted(b - a for a, b in zip(y1, y2))
+        tolerance = heights[count // 2] * self.line_tolerance
+
+        layout_columns = self.find_columns(columns) if self.detect_columns else []
+        if len(layout_columns) < 2:
+            return self._flatten(self._group_lines(columns, range(count), tolerance))
+
+        # 横跨栏间空隙的文本块作为分段标记，其余文本块归入所在的栏
+        mids = [(left[1] + right[0]) / 2 for left, right in zip(layout_columns, layout_columns[1:])]
+        spanning: List[int] = []
+        placed: List[Tuple[int, int]] = []  # (下标, 栏号)
+        for i in range(count):
+            column = bisect_right(mids, x1[i])
+            if column != bisect_right(mids, x2[i]):
+                spanning.append(i)
+            else:
+                placed.append((i, column))
+
+        spanning = self._flatten(self._group_lines(columns, spanning, tolerance))
+        boundaries = [(y1[i] + y2[i]) / 2 for i in spanning]
+
+        # 按 (段号, 栏号) 分组，段号为中心点上方的通栏文本块数量
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, column in placed:
+            segment = bisect_right(boundaries, (y1[i] + y2[i]) / 2)
+            cells.setdefault((segment, column), []).append(i)
+
+        order: List[int] = []
+        for segment in range(len(spanning) + 1):
+            column_lines = [
+                self._group_lines(columns, cells.get((segment, column), ()), tolerance)
+                for column in range(len(layout_columns))
+            ]
+            filled = sum(
+                self._is_filled(columns, lines, right - left)
+                for lines, (left, right) in zip(column_lines, layout_columns)
+            )
+            if filled >= 2:
+                for lines in column_lines:
+                    order.extend(self._flatten(lines))
+            else:
+                blocks = [i for lines in column_lines for line in lines for i in line]
+                order.extend(self._flatten(self._group_lines(columns, blocks, tolerance)))
+            if segment < len(spanning):
+                order.append(spanning[segment])
+        return order
+
+    def find_columns(self, columns: BlockColumns) -> List[Tuple[float, float]]:
+        """
+        检测分栏
+
+        Args:
+            columns: 文本块的列式存储
+
+        Returns:
+            List[Tuple[float, float]]: 从左到右各栏的 (左边界, 右边界)，不足两栏时只有一项或为空
+        """
+        x1, x2 = columns.x1, columns.x2
+        if not len(columns):
+            return []
+        page_left, page_right = min(x1), max(x2)
+        page_width = page_right - page_left
+        if page_width <= 0:
+            return []
+
+        # 合并较窄文本块的 x 区间
+        max_width = page_width * self.span_ratio
+        intervals = sorted((a, b) for a, b in zip(x1, x2) if b - a <= max_width)
+        merged: List[List[float]] = []
+        for left, right in intervals:
+            if merged and left <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], right)
+            else:
+                merged.append([left, right])
+
+        # 从左到右合并过窄的栏
+        min_width = page_width * self.min_column_ratio
+        groups: List[List[float]] = []
+        for left, right in merged:
+            if groups and groups[-1][1] - groups[-1][0] < min_width:
+                groups[-1][1] = max(groups[-1][1], right)
+            else:
+                groups.append([left, right])
+        if len(groups) > 1 and groups[-1][1] - groups[-1][0] < min_width:
+            last = groups.pop()
+            groups[-1][1] = max(groups[-1][1], last[1])
+
+        return [(left, right) for left, right in groups]
+
+    def _is_filled(self, columns: BlockColumns, lines: List[List[int]], width: float) -> bool:
+        """栏内行数足够，并且各行宽度的中位数占满栏宽的一定比例（正文栏）"""
+        if len(lines) < self.min_column_lines or width <= 0:
+            return False
+        x1, x2 = columns.x1, columns.x2
+        extents = sorted(max(x2[i] for i in line) - min(x1[i] for i in line) for line in lines)
+        return extents[len(extents) // 2] >= width * self.min_column_fill
+
+    @staticmethod
+    def _group_lines(columns: BlockColumns, indices: Iterable[int], tolerance: float) -> List[List[int]]:
+        """
+        将文本块分行
+
+        按中心点 y 坐标排序后扫描：与当前行第一个文本块的中心点相差不超过 tolerance 的属于同一行，
+        行内按 x 坐标排序（排序稳定，坐标相同的文本块保持原顺序）。
+
+        Returns:
+            List[List[int]]: 从上到下的各行文本块下标
+        """
+        x1, y1, y2 = columns.x1, columns.y1, columns.y2
+        by_center = sorted(indices, key=lambda i: y1[i] + y2[i])
+
+        lines: List[List[int]] = []
+        anchor = 0.0
+        for i in by_center:
+            center = (y1[i] + y2[i]) / 2
+            if not lines or center - anchor > tolerance:
+                lines.append([])
+                anchor = center
+            lines[-1].append(i)
+        for line in lines:
+            line.sort(key=lambda j: x1[j])
+        return lines
+
+    @staticmethod
+    def _flatten(lines: List[List[int]]) -> List[int]:
+        """按行展开文本块下标"""
+        return [i for line in lines for i in line]
+
+
+# 全局版面分析器实例
+layout_analyzer = LayoutAnalyzer(
+    detect_columns=config.layout_column_detection,
+    min_column_ratio=config.layout_min_column_width
+)
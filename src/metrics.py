@@ -0,0 +1,319 @@
+"""
+监控指标模块
+记录上传和导出流程各阶段的耗时直方图、字节数和错误计数，按 Prometheus 文本格式输出
+"""
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Dict, Tuple, List, Optional, Sequence
+
+from .config import config
+from .tracing import current_trace, record_span
+
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 耗时直方图的桶（秒）：覆盖从毫秒级的分割、解析到数十秒的 OCR 请求
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# 数量直方图的桶（每页文本块数、题目数）
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+def _escape(value: str) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """格式化标签，如 {stage="split",le="0.1"}，没有标签时返回空字符串"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _CounterChild:
+    """一组标签值对应的计数器"""
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    """一组标签值对应的直方图（各桶分别计数，输出时再累加）"""
+    __slots__ = ('upper_bounds', 'bucket_counts', 'sum', '_lock')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.bucket_counts = [0] * (len(upper_bounds) + 1)  # 最后一项为 +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.bucket_counts)
+
+
+class _MetricFamily:
+    """同名指标的各组标签值"""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """
+        获取标签值对应的指标（首次使用时创建）
+
+        Raises:
+            ValueError: 标签值数量与标签名不一致
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"指标 {self.name} 需要 {len(self.label_names)} 个标签值")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """输出 Prometheus 文本格式的各行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_MetricFamily):
+    """只增不减的计数器"""
+    kind = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _render_child(self, values: Tuple[str, ...], child: _CounterChild) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, values)} {_format_number(child.value)}"]
+
+
+class Histogram(_MetricFamily):
+    """按桶统计分布的直方图"""
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        with child._lock:
+            counts = list(child.bucket_counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for upper, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = f'le="{_format_number(upper)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}")
+        labels = _format_labels(self.label_names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class StageTimer:
+    """计时上下文管理器：退出时记录阶段耗时（同时写入当前请求的追踪记录），阶段抛出异常时按异常类型计数"""
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry: 'MetricsRegistry', stage: str):
+        self.registry = registry
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self) -> 'StageTimer':
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.registry.observe_stage(self.stage, perf_counter() - self.start, exc_type, self.start)
+        return False
+
+
+class _NoopTimer:
+    """未启用指标且不在请求中时使用的空计时器"""
+
+    def __enter__(self) -> '_NoopTimer':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    记录一次观测只需一次二分查找和一次加锁累加，可以在生产环境中常开。
+    """
+
+    def __init__(self, enabled: bool = True, prefix: str = 'cut_ai'):
+        """
+        初始化注册表并创建处理流程的通用指标
+
+        Args:
+            enabled: 是否记录指标，为 False 时各记录方法直接返回
+            prefix: 指标名前缀
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self._families: List[_MetricFamily] = []
+
+        self.stage_seconds = self.histogram(
+            'stage_duration_seconds', '各处理阶段的耗时（秒）', ('stage',)
+        )
+        self.stage_errors = self.counter(
+            'stage_errors_total', '各处理阶段抛出的异常数（按异常类型）', ('stage', 'error')
+        )
+        self.bytes_received = self.counter(
+            'bytes_received_total', '接收的字节数（上传文件、OCR API 响应）', ('source',)
+        )
+        self.bytes_sent = self.counter(
+            'bytes_sent_total', '发送的字节数（OCR API 请求、导出文件）', ('target',)
+        )
+        self.page_blocks = self.histogram(
+            'page_text_blocks', '每页识别出的文本块数', buckets=COUNT_BUCKETS
+        )
+        self.page_questions = self.histogram(
+            'page_questions', '每页分割出的题目数', buckets=COUNT_BUCKETS
+        )
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """注册计数器（名称自动加上前缀）"""
+        family = Counter(f"{self.prefix}_{name}", documentation, label_names)
+        self._families.append(family)
+        return family
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """注册直方图（名称自动加上前缀）"""
+        family = Histogram(f"{self.prefix}_{name}", documentation, label_names, buckets)
+        self._families.append(family)
+        return family
+
+    # ============ 处理流程 ============
+
+    def stage(self, name: str):
+        """
+        对一个处理阶段计时
+
+        用法::
+
+            with metrics.stage('split'):
+                questions = question_splitter.split_ocr_result(ocr_result)
+        """
+        if not self.enabled and current_trace() is None:
+            return _NOOP_TIMER
+        return StageTimer(self, name)
+
+    def observe_stage(
+        self,
+        name: str,
+        seconds: float,
+        error: Optional[type] = None,
+        start: Optional[float] = None
+    ):
+        """
+        记录阶段耗时（无法用 with 包住的阶段，如请求体发送过程中的 Base64 编码）
+
+        Args:
+            name: 阶段名
+            seconds: 耗时（秒）
+            error: 阶段抛出的异常类型
+            start: 阶段开始时的 perf_counter() 值（用于追踪记录，为 None 时视为刚刚结束）
+        """
+        record_span(name, seconds, error.__name__ if error is not None else None, start)
+        if not self.enabled:
+            return
+        self.stage_seconds.labels(name).observe(seconds)
+        if error is not None:
+            self.stage_errors.labels(name, error.__name__).inc()
+
+    def add_received(self, source: str, size: int):
+        """累计接收的字节数"""
+        if self.enabled:
+            self.bytes_received.labels(source).inc(size)
+
+    def add_sent(self, target: str, size: int):
+        """累计发送的字节数"""
+        if self.enabled:
+            self.bytes_sent.labels(target).inc(size)
+
+    def observe_page(self, blocks: int, questions: int):
+        """记录一页的文本块数和题目数"""
+        if self.enabled:
+            self.page_blocks.labels().observe(blocks)
+            self.page_questions.labels().observe(questions)
+
+    def render(self) -> str:
+        """
+        输出所有指标
+
+        Returns:
+            str: Prometheus 文本格式
+        """
+        lines: List[str] = []
+        for family in self._families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+# 全局指标注册表
+metrics = MetricsRegistry(enabled=config.metrics_enabled)
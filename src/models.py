@@ -3,13 +3,15 @@
 定义应用程序中使用的数据结构
 """
 
+import math
+from array import array
 from dataclasses import dataclass, field
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict, Any, Iterable
 
 
-@dataclass
+@dataclass(frozen=True)
 class BoundingBox:
-    """文本块的边界框坐标"""
+    """文本块的边界框坐标（不可变，题目缓存的包围盒和文本不会因原地修改而过期）"""
     x1: float  # 左上角 x 坐标
     y1: float  # 左上角 y 坐标
     x2: float  # 右下角 x 坐标
@@ -55,9 +57,9 @@ class BoundingBox:
             raise ValueError(f"无效的坐标格式: {coords}")
 
 
-@dataclass
+@dataclass(frozen=True)
 class TextBlock:
-    """OCR 识别的文本块"""
+    """OCR 识别的文本块（不可变，修改时替换整个文本块）"""
     text: str  # 文本内容
     box: BoundingBox  # 边界框
     confidence: Optional[float] = None  # 置信度（可选）
@@ -66,38 +68,206 @@ class TextBlock:
         return f"TextBlock(text='{self.text[:20]}...', box={self.box.to_tuple()})"
 
 
+class BlockColumns:
+    """
+    文本块的列式存储
+    
+    坐标按列保存在连续的 float 数组中（x1 / y1 / x2 / y2），文本按顺序保存，并记录每个文本块
+    在拼接文本中的起始偏移。包围盒和拼接文本直接在数组上计算（版面分析也直接读取坐标数组），
+    不需要逐个访问 TextBlock / BoundingBox 对象；包围盒和拼接文本在内容变化前只计算一次。
+    """
+    
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'confidence', 'texts', 'text_offsets', '_full_text', '_union')
+    
+    def __init__(self, blocks: Iterable[TextBlock] = ()):
+        """
+        初始化列式存储
+        
+        Args:
+            blocks: 初始的文本块
+        """
+        self.x1 = array('d')
+        self.y1 = array('d')
+        self.x2 = array('d')
+        self.y2 = array('d')
+        self.confidence = array('d')  # 没有置信度时为 NaN
+        self.texts: List[str] = []
+        self.text_offsets = array('q', [0])  # 第 i 个文本块在拼接文本中的起始偏移（末尾多一项）
+        self._full_text: Optional[str] = None
+        self._union: Optional[BoundingBox] = None
+        for block in blocks:
+            self.append(block.text, block.box, block.confidence)
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    def append(self, text: str, box: BoundingBox, confidence: Optional[float] = None):
+        """追加一个文本块"""
+        self.x1.append(box.x1)
+        self.y1.append(box.y1)
+        self.x2.append(box.x2)
+        self.y2.append(box.y2)
+        self.confidence.append(math.nan if confidence is None else confidence)
+        self.texts.append(text)
+        # 文本块之间以换行符分隔
+        self.text_offsets.append(self.text_offsets[-1] + len(text) + 1)
+        self._invalidate()
+    
+    def extend(self, other: 'BlockColumns'):
+        """追加另一组文本块（按列整体拼接）"""
+        base = self.text_offsets[-1]
+        self.x1.extend(other.x1)
+        self.y1.extend(other.y1)
+        self.x2.extend(other.x2)
+        self.y2.extend(other.y2)
+        self.confidence.extend(other.confidence)
+        self.texts.extend(other.texts)
+        self.text_offsets.extend(offset + base for offset in other.text_offsets[1:])
+        self._invalidate()
+    
+    def _invalidate(self):
+        """内容变化后清除缓存的聚合结果"""
+        self._full_text = None
+        self._union = None
+    
+    @property
+    def full_text(self) -> str:
+        """以换行符拼接的全部文本"""
+        if self._full_text is None:
+            self._full_text = '\n'.join(self.texts)
+        return self._full_text
+    
+    def text_range(self, start: int, stop: int) -> str:
+        """
+        获取连续多个文本块拼接后的文本（与 '\n'.join(texts[start:stop]) 相同）
+        
+        Args:
+            start: 起始文本块下标
+            stop: 结束文本块下标（不包含）
+        """
+        if start >= stop:
+            return ''
+        return self.full_text[self.text_offsets[start]:self.text_offsets[stop] - 1]
+    
+    def union(self) -> Optional[BoundingBox]:
+        """
+        计算包含所有文本块的最小边界框（结果会被缓存，不要修改返回的对象）
+        
+        Returns:
+            Optional[BoundingBox]: 最小包围盒，如果没有文本块则返回 None
+        """
+        if self._union is None and self.texts:
+            self._union = BoundingBox(min(self.x1), min(self.y1), max(self.x2), max(self.y2))
+        return self._union
+    
+    def box(self, index: int) -> BoundingBox:
+        """获取第 index 个文本块的边界框"""
+        return BoundingBox(self.x1[index], self.y1[index], self.x2[index], self.y2[index])
+    
+    def block(self, index: int) -> TextBlock:
+        """获取第 index 个文本块"""
+        confidence = self.confidence[index]
+        return TextBlock(self.texts[index], self.box(index), None if math.isnan(confidence) else confidence)
+    
+    def to_blocks(self) -> List[TextBlock]:
+        """转换为 TextBlock 列表"""
+        return [self.block(i) for i in range(len(self))]
+
+
+class TextBlockList(list):
+    """
+    text_blocks 列表：内容发生任何变化（添加、删除、替换、排序等）时清除所属对象缓存的列式视图
+    """
+    
+    __slots__ = ('_owner',)
+    
+    def __init__(self, blocks: Iterable[TextBlock] = (), owner=None):
+        super().__init__(blocks)
+        self._owner = owner
+    
+    def __reduce__(self):
+        # 复制和序列化时只保存文本块，所属对象恢复时重新关联
+        return TextBlockList, (list(self),)
+    
+    def _changed(self):
+        if self._owner is not None:
+            self._owner._columns = None
+
+
+def _invalidating(name: str):
+    method = getattr(list, name)
+    
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+    
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend',
+              'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(TextBlockList, _name, _invalidating(_name))
+
+
+class _ColumnsOwner:
+    """
+    持有 text_blocks 并缓存其列式视图的对象
+    
+    对 text_blocks 赋值或修改列表内容时清除缓存，下次访问时重建；
+    add_text_block 等方法绕过清除直接增量更新列式视图。
+    """
+    
+    def __setattr__(self, name, value):
+        if name == 'text_blocks':
+            value = TextBlockList(value, self)
+            object.__setattr__(self, '_columns', None)
+        object.__setattr__(self, name, value)
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.text_blocks = state['text_blocks']
+    
+    @property
+    def columns(self) -> BlockColumns:
+        """文本块的列式视图"""
+        if self._columns is None:
+            self._columns = BlockColumns(self.text_blocks)
+        return self._columns
+    
+    def _append_block(self, block: TextBlock):
+        """添加文本块并增量更新列式视图"""
+        columns = self.columns
+        list.append(self.text_blocks, block)
+        columns.append(block.text, block.box, block.confidence)
+
+
 @dataclass
-class Question:
+class Question(_ColumnsOwner):
     """题目数据模型"""
     question_id: int  # 题目编号
     text_blocks: List[TextBlock] = field(default_factory=list)  # 包含的文本块列表
+    _columns: Optional[BlockColumns] = field(default=None, init=False, repr=False, compare=False)
     
     @property
     def text(self) -> str:
         """获取题目的完整文本"""
-        return '\n'.join(block.text for block in self.text_blocks)
+        return self.columns.full_text
     
     @property
     def bounding_box(self) -> Optional[BoundingBox]:
         """
-        计算包含所有文本块的最小边界框
+        计算包含所有文本块的最小边界框（文本块变化前只计算一次，不要修改返回的对象）
         
         Returns:
             BoundingBox: 最小包围盒，如果没有文本块则返回 None
         """
-        if not self.text_blocks:
-            return None
-        
-        min_x = min(block.box.x1 for block in self.text_blocks)
-        min_y = min(block.box.y1 for block in self.text_blocks)
-        max_x = max(block.box.x2 for block in self.text_blocks)
-        max_y = max(block.box.y2 for block in self.text_blocks)
-        
-        return BoundingBox(min_x, min_y, max_x, max_y)
+        return self.columns.union()
     
     def add_text_block(self, block: TextBlock):
         """添加文本块"""
-        self.text_blocks.append(block)
+        self._append_block(block)
     
     def merge_with(self, other: 'Question'):
         """
@@ -106,7 +276,9 @@ class Question:
         Args:
             other: 要合并的题目
         """
-        self.text_blocks.extend(other.text_blocks)
+        columns = self.columns
+        list.extend(self.text_blocks, other.text_blocks)
+        columns.extend(other.columns)
     
     def __repr__(self) -> str:
         preview = self.text[:50].replace('\n', ' ') if self.text else ''
@@ -114,20 +286,65 @@ class Question:
 
 
 @dataclass
-class OCRResult:
+class OCRResult(_ColumnsOwner):
     """OCR 识别结果"""
     image_path: str  # 原始图片路径
     text_blocks: List[TextBlock] = field(default_factory=list)  # 所有识别的文本块
     raw_response: Optional[dict] = None  # 原始 API 响应（用于调试）
+    raw_response_id: Optional[str] = None  # 原始响应写入磁盘日志时的结果 ID
+    metadata: Dict[str, Any] = field(default_factory=dict)  # 本次处理的附加信息（不写入缓存）
+    _columns: Optional[BlockColumns] = field(default=None, init=False, repr=False, compare=False)
     
     def add_text_block(self, text: str, box: BoundingBox, confidence: Optional[float] = None):
         """添加文本块"""
-        self.text_blocks.append(TextBlock(text, box, confidence))
+        self._append_block(TextBlock(text, box, confidence))
     
     @property
     def full_text(self) -> str:
         """获取完整文本"""
-        return '\n'.join(block.text for block in self.text_blocks)
+        return self.columns.full_text
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为可 JSON 序列化的字典
+        
+        Returns:
+            Dict[str, Any]: 包含文本块和原始响应的字典
+        """
+        return {
+            'image_path': self.image_path,
+            'text_blocks': [
+                {
+                    'text': block.text,
+                    'box': list(block.box.to_tuple()),
+                    'confidence': block.confidence
+                }
+                for block in self.text_blocks
+            ],
+            'raw_response': self.raw_response,
+            'raw_response_id': self.raw_response_id
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'OCRResult':
+        """
+        从字典创建 OCRResult
+        
+        Args:
+            data: to_dict 生成的字典
+        """
+        result = cls(
+            image_path=data['image_path'],
+            raw_response=data.get('raw_response'),
+            raw_response_id=data.get('raw_response_id')
+        )
+        for block in data.get('text_blocks', []):
+            result.add_text_block(
+                text=block['text'],
+                box=BoundingBox.from_list(block['box']),
+                confidence=block.get('confidence')
+            )
+        return result
     
     def __repr__(self) -> str:
         return f"OCRResult(image={self.image_path}, blocks={len(self.text_blocks)})"
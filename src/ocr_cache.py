@@ -0,0 +1,237 @@
+"""
+OCR 结果缓存模块
+按图片内容哈希缓存解析后的 OCR 结果，包含内存 LRU 和磁盘两级缓存
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from .config import config
+from .models import OCRResult
+
+
+# 计算哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """
+    计算文件内容的 SHA-256 哈希
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        str: 十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """OCR 结果缓存（内存 LRU + 磁盘）"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        memory_items: int = 256,
+        disk_max_bytes: int = 200 * 1024 * 1024
+    ):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 磁盘缓存目录，为 None 时不启用磁盘缓存
+            memory_items: 内存中最多缓存的结果数
+            disk_max_bytes: 磁盘缓存的最大字节数，超出后淘汰最久未使用的条目
+        """
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+
+        # 磁盘索引：key -> 文件大小，按最近使用顺序排列
+        self._disk_index: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(image_hash: str, model_name: str, prompt: str, variant: str = '') -> str:
+        """
+        生成缓存键
+
+        Args:
+            image_hash: 图片内容哈希
+            model_name: OCR 模型名称
+            prompt: 提示词
+            variant: 其他影响识别结果的参数（如图片预处理设置）
+
+        Returns:
+            str: 缓存键
+        """
+        digest = hashlib.sha256()
+        for part in (image_hash, model_name, prompt, variant):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str, image_path: str) -> Optional[OCRResult]:
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键
+            image_path: 当前请求的图片路径（写入返回结果）
+
+        Returns:
+            Optional[OCRResult]: 命中时返回新的 OCRResult 副本，否则返回 None
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            else:
+                data = self._read_disk(key)
+                if data is not None:
+                    self.disk_hits += 1
+                    self._put_memory(key, data)
+                else:
+                    self.misses += 1
+                    return None
+
+        result = OCRResult.from_dict(data)
+        result.image_path = image_path
+        return result
+
+    def put(self, key: str, result: OCRResult):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            result: OCR 识别结果
+        """
+        data = result.to_dict()
+        with self._lock:
+            self._put_memory(key, data)
+            self._write_disk(key, data)
+
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk_index):
+                self._remove_disk(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 命中 / 未命中次数及各级缓存占用
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'memory_items': len(self._memory),
+                'disk_items': len(self._disk_index),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    # ============ 内存缓存 ============
+
+    def _put_memory(self, key: str, data: Dict[str, Any]):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # ============ 磁盘缓存 ============
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_disk_index(self):
+        """启动时扫描磁盘缓存目录，按修改时间恢复 LRU 顺序"""
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache_dir is None or key not in self._disk_index:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self._remove_disk(key)
+            return None
+        self._disk_index.move_to_end(key)
+        path.touch()
+        return data
+
+    def _write_disk(self, key: str, data: Dict[str, Any]):
+        if self.cache_dir is None:
+            return
+        encoded = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        if len(encoded) > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded)
+        tmp_path.replace(path)
+
+        self._disk_bytes -= self._disk_index.pop(key, 0)
+        self._disk_index[key] = len(encoded)
+        self._disk_bytes += len(encoded)
+        self._evict_disk()
+
+    def _remove_disk(self, key: str):
+        self._disk_bytes -= self._disk_index.pop(key, 0)
+        self._disk_path(key).unlink(missing_ok=True)
+
+    def _evict_disk(self):
+        """淘汰最久未使用的磁盘条目，直到总大小不超过上限"""
+        while self._disk_bytes > self.disk_max_bytes and self._disk_index:
+            key = next(iter(self._disk_index))
+            self._remove_disk(key)
+            self.evictions += 1
+
+
+# 全局 OCR 缓存实例
+ocr_cache = OCRCache(
+    cache_dir=config.ocr_cache_dir if config.ocr_cache_disk_max_bytes > 0 else None,
+    memory_items=config.ocr_cache_memory_items,
+    disk_max_bytes=config.ocr_cache_disk_max_bytes
+)
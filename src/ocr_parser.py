@@ -0,0 +1,201 @@
+"""
+DeepSeek OCR 响应解析模块
+提供单遍扫描、可增量输入的解析器，文本块在完整后立即产出
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+# DeepSeek OCR 标记
+REF_OPEN = '<|ref|>'
+REF_CLOSE = '<|/ref|>'
+DET_OPEN = '<|det|>'
+DET_CLOSE = '<|/det|>'
+
+# 坐标标记的起止（对应 <|det|>[[...]]<|/det|>）
+_DET_COORDS_OPEN = DET_OPEN + '[['
+_DET_COORDS_CLOSE = ']]' + DET_CLOSE
+
+# 坐标解析失败时使用的占位坐标
+_EMPTY_BOX = [0, 0, 0, 0]
+
+
+def _strip_tag_pairs(text: str, open_tag: str, close_tag: str) -> str:
+    """
+    删除所有成对的标记及其中的内容（等价于非贪婪的 re.sub(open.*?close, '')）
+
+    Args:
+        text: 原始文本
+        open_tag: 起始标记
+        close_tag: 结束标记
+
+    Returns:
+        str: 删除标记后的文本
+    """
+    start = text.find(open_tag)
+    if start < 0:
+        return text
+
+    parts = []
+    pos = 0
+    while start >= 0:
+        end = text.find(close_tag, start + len(open_tag))
+        if end < 0:
+            break
+        parts.append(text[pos:start])
+        pos = end + len(close_tag)
+        start = text.find(open_tag, pos)
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+def _parse_det_box(line: str) -> Optional[List[float]]:
+    """
+    查找行内第一个坐标标记并解析坐标
+
+    Args:
+        line: 一行文本
+
+    Returns:
+        Optional[List[float]]: [x1, y1, x2, y2]，坐标无效时为 [0, 0, 0, 0]；
+            行内没有坐标标记时返回 None
+    """
+    start = line.find(_DET_COORDS_OPEN)
+    if start < 0:
+        return None
+    coords_start = start + len(DET_OPEN)
+    end = line.find(_DET_COORDS_CLOSE, coords_start + 2)
+    if end < 0:
+        return None
+
+    # 快速路径：最常见的四个整数坐标，避免调用 JSON 解析
+    inner = line[coords_start + 2:end]
+    if inner.count(',') == 3 and inner.replace(',', '').replace(' ', '').isdigit():
+        try:
+            return [int(value) for value in inner.split(',')]
+        except ValueError:
+            pass
+
+    try:
+        coords = json.loads(line[coords_start:end + 2])  # [[x1, y1, x2, y2]]
+        if coords and len(coords) > 0 and len(coords[0]) == 4:
+            return coords[0]
+    except (json.JSONDecodeError, IndexError, ValueError, TypeError):
+        pass
+    return list(_EMPTY_BOX)
+
+
+class DeepSeekOCRParser:
+    """
+    DeepSeek OCR 响应的增量解析器（状态机）
+
+    DeepSeek OCR 返回格式示例:
+    <|ref|>text<|/ref|><|det|>[[x1, y1, x2, y2]]<|/det|>
+    实际文本内容
+
+    每个坐标标记开启一个新的文本块，之后的文本行都属于该块。
+    feed() 可以接收任意切分的片段（包括把标记切成两半的片段），
+    只处理已经完整的行，并在下一个坐标标记出现时产出上一个文本块。
+    """
+
+    def __init__(self):
+        """初始化解析器"""
+        self._pending: List[str] = []  # 尚未遇到换行符的行片段
+        self._box: Optional[List[float]] = None  # 当前文本块的坐标
+        self._lines: List[str] = []  # 当前文本块的文本行
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        输入一段内容
+
+        Args:
+            chunk: 任意长度的内容片段
+
+        Returns:
+            List[Dict]: 本次输入后完成的文本块列表，每个包含 'text' 和 'box' 字段
+        """
+        lines = chunk.split('\n')
+        if len(lines) == 1:
+            self._pending.append(chunk)
+            return []
+
+        if self._pending:
+            self._pending.append(lines[0])
+            lines[0] = ''.join(self._pending)
+        self._pending = [lines.pop()]
+
+        blocks: List[Dict[str, Any]] = []
+        for line in lines:
+            self._process_line(line, blocks)
+        return blocks
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        结束输入，处理剩余内容并产出最后一个文本块
+
+        Returns:
+            List[Dict]: 剩余的文本块列表
+        """
+        blocks: List[Dict[str, Any]] = []
+        if self._pending:
+            self._process_line(''.join(self._pending), blocks)
+            self._pending = []
+        self._flush(blocks)
+        self._box = None
+        return blocks
+
+    def _process_line(self, line: str, blocks: List[Dict[str, Any]]):
+        """处理一行完整的文本"""
+        # 快速路径：不含任何标记的普通文本行
+        if '<|' not in line:
+            text = line.strip()
+            if text:
+                self._lines.append(text)
+            return
+
+        box = _parse_det_box(line)
+        if box is None:
+            # 普通文本行，删除引用标记后加入当前文本块
+            text = _strip_tag_pairs(line, REF_OPEN, REF_CLOSE).strip()
+            if text:
+                self._lines.append(text)
+            return
+
+        # 坐标行：结束上一个文本块，开始新的文本块
+        self._flush(blocks)
+        self._box = box
+        self._lines = []
+
+        # 提取当前行中标记后面的文本
+        text = _strip_tag_pairs(line, REF_OPEN, REF_CLOSE)
+        text = _strip_tag_pairs(text, DET_OPEN, DET_CLOSE).strip()
+        if text:
+            self._lines.append(text)
+
+    def _flush(self, blocks: List[Dict[str, Any]]):
+        """保存当前文本块"""
+        if self._box is not None and self._lines:
+            text = '\n'.join(self._lines).strip()
+            if text:
+                blocks.append({
+                    'text': text,
+                    'box': self._box
+                })
+        self._lines = []
+
+
+def iter_deepseek_blocks(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    逐个产出流式内容中的文本块
+
+    Args:
+        chunks: 内容片段的迭代器
+
+    Yields:
+        Dict: 文本块，包含 'text' 和 'box' 字段
+    """
+    parser = DeepSeekOCRParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
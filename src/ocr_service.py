@@ -3,13 +3,34 @@ OCR 服务模块
 封装 DeepSeek OCR API 调用逻辑
 """
 
+import json
+import time
+import uuid
+import asyncio
+import threading
 import requests
-from typing import Optional, Dict, Any, List
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, AsyncIterator, Iterable, Tuple, Set
 from pathlib import Path
 
 from .config import config
+from .http_pool import PooledHTTPClient
+from .metrics import metrics
+from .tracing import record_usage
+from .image_processor import image_processor, PreparedImage, ImageTile
 from .models import OCRResult, TextBlock, BoundingBox
-from .utils import get_image_data_url, parse_deepseek_ocr_response, clean_ocr_text
+from .ocr_cache import OCRCache, ocr_cache, hash_file
+from .ocr_parser import DeepSeekOCRParser
+from .raw_response_log import RawResponseLog, raw_response_log, RETENTION_POLICIES, RETENTION_MEMORY, RETENTION_SPILL
+from .request_body import StreamingJSONBody, IMAGE_PLACEHOLDER
+from .utils import (
+    get_image_mime_type, parse_deepseek_ocr_response, clean_ocr_text, SUPPORTED_IMAGE_FORMATS
+)
+
+
+# 默认识别提示词
+DEFAULT_PROMPT = "请识别图片中的所有文字，保持原有格式和布局"
 
 
 class OCRService:
@@ -22,11 +43,53 @@ class OCRService:
         self.model_name = config.ocr_model_name
         self.timeout = config.ocr_timeout
         self.max_tokens = config.max_tokens
+        
+        # 长连接复用的 HTTP 客户端（同步 / 异步共用统计）
+        self.http = PooledHTTPClient(
+            timeout=self.timeout,
+            max_connections=config.ocr_pool_max_connections,
+            max_keepalive=config.ocr_pool_max_keepalive,
+            keepalive_expiry=config.ocr_pool_keepalive_expiry
+        )
+        
+        # 按图片内容缓存识别结果
+        self.cache: Optional[OCRCache] = ocr_cache if config.ocr_cache_enabled else None
+        
+        # 原始响应保留策略（spill 时写入磁盘日志）
+        self.raw_response_retention = config.ocr_raw_response_retention
+        if self.raw_response_retention not in RETENTION_POLICIES:
+            raise ValueError(f"无效的原始响应保留策略: {self.raw_response_retention}")
+        self.raw_response_log: Optional[RawResponseLog] = raw_response_log
+        
+        # 图片预处理（缩放并重新编码后再发送）
+        self.preprocess_enabled = config.ocr_preprocess_enabled
+        self.max_image_side = config.ocr_max_image_side
+        self.upload_format = config.ocr_upload_format
+        self.upload_quality = config.ocr_upload_quality
+        self.grayscale_tolerance = config.ocr_grayscale_tolerance
+        
+        # 长图切块识别（重叠的水平条带并发识别后合并）
+        self.tile_enabled = config.ocr_tile_enabled
+        self.tile_min_aspect = config.ocr_tile_min_aspect
+        self.tile_aspect = config.ocr_tile_aspect
+        self.tile_overlap = config.ocr_tile_overlap
+        self.tile_max = config.ocr_tile_max
+        self.tile_concurrency = config.ocr_tile_concurrency
+        
+        # 预处理统计
+        self._stats_lock = threading.Lock()
+        self._preprocess_totals = {
+            'requests': 0,
+            'original_bytes': 0,
+            'sent_bytes': 0,
+            'preprocess_seconds': 0.0,
+            'request_seconds': 0.0,
+        }
     
     def recognize_image(
         self, 
         image_path: str, 
-        prompt: str = "请识别图片中的所有文字，保持原有格式和布局",
+        prompt: str = DEFAULT_PROMPT,
         stream: bool = False
     ) -> OCRResult:
         """
@@ -45,20 +108,859 @@ class OCRService:
             ValueError: API 配置无效或响应格式错误
             requests.RequestException: API 请求失败
         """
-        # 验证配置
-        is_valid, error_msg = config.validate()
-        if not is_valid:
-            raise ValueError(f"配置无效: {error_msg}")
+        self._check_request(image_path)
+        
+        # 查询缓存
+        cache_key, cached = self._lookup_cache(image_path, prompt)
+        if cached is not None:
+            return cached
+        
+        # 长图切分为条带并发识别
+        tiled = self._prepare_tiles(image_path)
+        if tiled is not None:
+            return self._recognize_tiles_sync(image_path, prompt, cache_key, *tiled)
+        
+        # 预处理图片并获取 Data URL
+        prepared, preprocess_seconds = self._prepare_image(image_path)
+        
+        # 构造请求体
+        body = self._build_body(prepared, prompt, stream)
+        
+        try:
+            # 发送请求（复用连接池中的连接，已禁用代理；请求体按块编码发送）
+            request_start = time.perf_counter()
+            with metrics.stage('ocr_request'):
+                response = self.http.post(
+                    self.api_url,
+                    data=body,
+                    headers=self._build_headers(body),
+                    stream=stream
+                )
+                response.raise_for_status()
+                # 流式响应逐行读取 SSE 数据并拼接内容
+                if stream:
+                    lines = list(response.iter_lines(decode_unicode=True))
+                    received = sum(len(line) + 1 for line in lines)
+                    content, usage = self._read_sse_content(lines)
+                else:
+                    received = len(response.content)
+                    result_data = response.json()
+                    usage = result_data.get('usage')
+            self._record_request(body, received, request_start, response.elapsed.total_seconds(), usage)
+            
+            # 解析响应
+            if stream:
+                raw_response = self._stream_raw_response(content, usage)
+                ocr_result = self._build_result(image_path, content, raw_response, prepared)
+            else:
+                ocr_result = self._parse_response(image_path, result_data, prepared)
+            self._record_preprocess(ocr_result, prepared, preprocess_seconds,
+                                    time.perf_counter() - request_start)
+            self._store_cache(cache_key, ocr_result)
+            return ocr_result
+            
+        except requests.exceptions.Timeout:
+            raise requests.RequestException(f"API 请求超时（超过 {self.timeout} 秒）")
+        except requests.exceptions.RequestException as e:
+            raise requests.RequestException(f"API 请求失败: {str(e)}")
+        except (KeyError, IndexError) as e:
+            raise ValueError(f"API 响应解析失败: {str(e)}")
+    
+    async def recognize_image_async(
+        self,
+        image_path: str,
+        prompt: str = DEFAULT_PROMPT,
+        stream: bool = False,
+        image_hash: Optional[str] = None,
+        image_data: Optional[bytes] = None
+    ) -> OCRResult:
+        """
+        异步识别图片中的文字
+        
+        与 recognize_image 行为一致，但 HTTP 请求通过 httpx 异步发送，
+        等待 API 响应期间不会阻塞事件循环，单个 worker 可同时处理多个 OCR 请求。
+        
+        Args:
+            image_path: 图片文件路径
+            prompt: 提示词，指定识别要求
+            stream: 是否使用流式响应
+            image_hash: 图片内容的 SHA-256 哈希（已知时不再读取文件计算）
+            image_data: 已在内存中的图片内容（提供时不再读取文件）
+            
+        Returns:
+            OCRResult: OCR 识别结果
+            
+        Raises:
+            FileNotFoundError: 图片文件不存在
+            ValueError: API 配置无效或响应格式错误
+            requests.RequestException: API 请求失败（与同步接口保持一致）
+        """
+        if stream:
+            async for event, data in self.recognize_image_stream(image_path, prompt, image_hash, image_data):
+                if event == 'done':
+                    return data
+        
+        self._check_request(image_path)
+        
+        # 查询缓存（计算哈希需要读取文件，放到线程池中执行）
+        cache_key, cached = await asyncio.to_thread(self._lookup_cache, image_path, prompt, image_hash)
+        if cached is not None:
+            return cached
+        
+        # 长图切分为条带并发识别
+        tiled = await asyncio.to_thread(self._prepare_tiles, image_path, image_data)
+        if tiled is not None:
+            async for event, data in self._recognize_tiles(image_path, prompt, cache_key, *tiled):
+                if event == 'done':
+                    return data
+        
+        # 图片预处理和 Base64 编码放到线程池中执行，避免阻塞事件循环
+        prepared, preprocess_seconds = await asyncio.to_thread(self._prepare_image, image_path, image_data)
+        
+        try:
+            request_start = time.perf_counter()
+            result_data = await self._arequest_json(prepared, prompt)
+            ocr_result = self._parse_response(image_path, result_data, prepared)
+            self._record_preprocess(ocr_result, prepared, preprocess_seconds,
+                                    time.perf_counter() - request_start)
+            await asyncio.to_thread(self._store_cache, cache_key, ocr_result)
+            return ocr_result
+            
+        except httpx.TimeoutException:
+            raise requests.RequestException(f"API 请求超时（超过 {self.timeout} 秒）")
+        except httpx.HTTPError as e:
+            raise requests.RequestException(f"API 请求失败: {str(e)}")
+        except (KeyError, IndexError) as e:
+            raise ValueError(f"API 响应解析失败: {str(e)}")
+    
+    async def recognize_image_stream(
+        self,
+        image_path: str,
+        prompt: str = DEFAULT_PROMPT,
+        image_hash: Optional[str] = None,
+        image_data: Optional[bytes] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        流式识别图片中的文字，文本块一旦完整就立即产出
+        
+        Args:
+            image_path: 图片文件路径
+            prompt: 提示词，指定识别要求
+            image_hash: 图片内容的 SHA-256 哈希（已知时不再读取文件计算）
+            image_data: 已在内存中的图片内容（提供时不再读取文件）
+            
+        Yields:
+            Tuple[str, Any]: ('block', TextBlock) 表示新识别出的文本块；
+                最后产出 ('done', OCRResult) 表示完整的识别结果
+                
+        Raises:
+            FileNotFoundError: 图片文件不存在
+            ValueError: API 配置无效或响应格式错误
+            requests.RequestException: API 请求失败
+        """
+        self._check_request(image_path)
+        
+        # 命中缓存时直接逐块产出缓存结果
+        cache_key, cached = await asyncio.to_thread(self._lookup_cache, image_path, prompt, image_hash)
+        if cached is not None:
+            for block in cached.text_blocks:
+                yield 'block', block
+            yield 'done', cached
+            return
+        
+        # 长图的各个条带并发识别，每个条带完成后产出其中的文本块
+        tiled = await asyncio.to_thread(self._prepare_tiles, image_path, image_data)
+        if tiled is not None:
+            async for item in self._recognize_tiles(image_path, prompt, cache_key, *tiled):
+                yield item
+            return
+        
+        prepared, preprocess_seconds = await asyncio.to_thread(self._prepare_image, image_path, image_data)
+        body = self._build_body(prepared, prompt, stream=True)
+        
+        parser = DeepSeekOCRParser()
+        content_parts: List[str] = []
+        text_blocks: List[TextBlock] = []
+        usage = None
+        received = 0
+        ttfb = 0.0
+        
+        request_start = time.perf_counter()
+        # 产出文本块后等待调用方处理的时间，不计入请求耗时
+        paused = 0.0
+        error: Optional[type] = None
+        try:
+            async with self.http.astream(
+                'POST',
+                self.api_url,
+                content=body.aiter_bytes(),
+                headers=self._build_headers(body)
+            ) as response:
+                ttfb = time.perf_counter() - request_start
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    received += len(line) + 1
+                    delta, line_usage = self._parse_sse_line(line)
+                    usage = line_usage or usage
+                    if not delta:
+                        continue
+                    content_parts.append(delta)
+                    for block in parser.feed(delta):
+                        text_blocks.append(self._to_text_block(block, prepared))
+                        paused_at = time.perf_counter()
+                        yield 'block', text_blocks[-1]
+                        paused += time.perf_counter() - paused_at
+        except httpx.TimeoutException as e:
+            error = type(e)
+            raise requests.RequestException(f"API 请求超时（超过 {self.timeout} 秒）")
+        except httpx.HTTPError as e:
+            error = type(e)
+            raise requests.RequestException(f"API 请求失败: {str(e)}")
+        except Exception as e:
+            error = type(e)
+            raise
+        finally:
+            # 调用方停止读取（客户端断开）时只记录已接收部分的耗时，不计为错误
+            metrics.observe_stage('ocr_request', time.perf_counter() - request_start - paused,
+                                  error, request_start)
+        self._record_request(body, received, request_start, ttfb, usage)
+        
+        for block in parser.close():
+            text_blocks.append(self._to_text_block(block, prepared))
+            yield 'block', text_blocks[-1]
+        
+        content = ''.join(content_parts)
+        raw_response = self._stream_raw_response(content, usage)
+        if text_blocks:
+            ocr_result = OCRResult(image_path=image_path, text_blocks=text_blocks, raw_response=raw_response)
+        else:
+            # 没有解析出带坐标的文本块时，按非流式的方式回退为纯文本
+            ocr_result = self._build_result(image_path, content, raw_response, prepared)
+        self._record_preprocess(ocr_result, prepared, preprocess_seconds,
+                                time.perf_counter() - request_start)
+        await asyncio.to_thread(self._store_cache, cache_key, ocr_result)
+        yield 'done', ocr_result
+    
+    async def _arequest_json(self, prepared: PreparedImage, prompt: str) -> Dict[str, Any]:
+        """
+        异步发送一次非流式识别请求
+        
+        Args:
+            prepared: 预处理后的图片
+            prompt: 提示词
+            
+        Returns:
+            Dict[str, Any]: API 返回的 JSON 数据
+        """
+        body = self._build_body(prepared, prompt, stream=False)
+        start = time.perf_counter()
+        with metrics.stage('ocr_request'):
+            # 以流式方式接收响应，以便记录首字节时间
+            async with self.http.astream(
+                'POST',
+                self.api_url,
+                content=body.aiter_bytes(),
+                headers=self._build_headers(body)
+            ) as response:
+                ttfb = time.perf_counter() - start
+                response.raise_for_status()
+                await response.aread()
+            result_data = response.json()
+        self._record_request(body, len(response.content), start, ttfb, result_data.get('usage'))
+        return result_data
+    
+    def _request_json(self, prepared: PreparedImage, prompt: str) -> Dict[str, Any]:
+        """同步发送一次非流式识别请求，返回 API 的 JSON 数据"""
+        body = self._build_body(prepared, prompt, stream=False)
+        start = time.perf_counter()
+        with metrics.stage('ocr_request'):
+            response = self.http.post(self.api_url, data=body, headers=self._build_headers(body))
+            response.raise_for_status()
+            result_data = response.json()
+        self._record_request(body, len(response.content), start, response.elapsed.total_seconds(),
+                             result_data.get('usage'))
+        return result_data
+    
+    @staticmethod
+    def _record_request(
+        body: StreamingJSONBody,
+        received: int,
+        start: float,
+        ttfb: float,
+        usage: Optional[Dict[str, Any]]
+    ):
+        """
+        记录一次 API 请求的收发字节数、请求体的 Base64 编码耗时、首字节时间和 token 用量
+        
+        Args:
+            body: 请求体
+            received: 接收的响应字节数
+            start: 开始发送请求时的 perf_counter() 值
+            ttfb: 从开始发送请求到收到响应头的秒数
+            usage: API 返回的 token 用量
+        """
+        metrics.add_sent('ocr_request', len(body))
+        metrics.add_received('ocr_response', received)
+        metrics.observe_stage('encode', body.encode_seconds)
+        metrics.observe_stage('ocr_ttfb', ttfb, start=start)
+        record_usage(usage)
+    
+    def _prepare_tiles(
+        self,
+        image_path: str,
+        image_data: Optional[bytes] = None
+    ) -> Optional[Tuple[List[ImageTile], List[PreparedImage], float]]:
+        """
+        将长图切分为重叠的水平条带并逐个预处理
+        
+        Args:
+            image_path: 图片文件路径
+            image_data: 已在内存中的图片内容，提供时不再读取文件
+            
+        Returns:
+            Optional[Tuple]: (条带列表, 各条带的预处理结果, 预处理耗时秒数)，不需要切块时返回 None
+        """
+        if not self.tile_enabled:
+            return None
+        start = time.perf_counter()
+        tiles = image_processor.plan_tiles(
+            image_processor.get_image_size(image_path, image_data),
+            min_aspect=self.tile_min_aspect,
+            tile_aspect=self.tile_aspect,
+            overlap=self.tile_overlap,
+            max_tiles=self.tile_max
+        )
+        if not tiles:
+            return None
+        prepared_tiles = image_processor.prepare_tiles(
+            image_path,
+            tiles,
+            max_side=self.max_image_side,
+            image_format=self.upload_format,
+            quality=self.upload_quality,
+            gray_tolerance=self.grayscale_tolerance,
+            data=image_data
+        )
+        elapsed = time.perf_counter() - start
+        metrics.observe_stage('preprocess', elapsed)
+        return tiles, prepared_tiles, elapsed
+    
+    async def _recognize_tiles(
+        self,
+        image_path: str,
+        prompt: str,
+        cache_key: Optional[str],
+        tiles: List[ImageTile],
+        prepared_tiles: List[PreparedImage],
+        preprocess_seconds: float
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        并发识别长图的各个条带，总耗时取决于最慢的条带而不是整张图的高度
+        
+        Yields:
+            Tuple[str, Any]: 每个条带识别完成后产出不在重叠区的 ('block', TextBlock)，
+                重叠区的文本块在与相邻条带去重后产出，最后产出 ('done', OCRResult) 表示合并后的识别结果
+        """
+        semaphore = asyncio.Semaphore(max(1, self.tile_concurrency))
+        
+        async def request_tile(index: int) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                return index, await self._arequest_json(prepared_tiles[index], prompt)
+        
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(tiles)
+        tile_blocks: List[List[TextBlock]] = [[] for _ in tiles]
+        pending: Set[int] = set()  # 等待与相邻条带去重的文本块
+        request_start = time.perf_counter()
+        tasks = [asyncio.create_task(request_tile(i)) for i in range(len(tiles))]
+        try:
+            for future in asyncio.as_completed(tasks):
+                try:
+                    index, result_data = await future
+                    blocks = self._tile_blocks(result_data, tiles[index], prepared_tiles[index])
+                except httpx.TimeoutException:
+                    raise requests.RequestException(f"API 请求超时（超过 {self.timeout} 秒）")
+                except httpx.HTTPError as e:
+                    raise requests.RequestException(f"API 请求失败: {str(e)}")
+                except (KeyError, IndexError) as e:
+                    raise ValueError(f"API 响应解析失败: {str(e)}")
+                responses[index] = result_data
+                tile_blocks[index] = blocks
+                for block in blocks:
+                    if tiles[index].in_overlap(block.box):
+                        pending.add(id(block))
+                    else:
+                        yield 'block', block
+        finally:
+            # 任一条带失败时取消其余请求
+            for task in tasks:
+                task.cancel()
+        
+        ocr_result = self._merge_tiles(image_path, tiles, responses, tile_blocks)
+        for block in ocr_result.text_blocks:
+            if id(block) in pending:
+                yield 'block', block
+        self._record_tiles(ocr_result, prepared_tiles, preprocess_seconds,
+                           time.perf_counter() - request_start)
+        await asyncio.to_thread(self._store_cache, cache_key, ocr_result)
+        yield 'done', ocr_result
+    
+    def _recognize_tiles_sync(
+        self,
+        image_path: str,
+        prompt: str,
+        cache_key: Optional[str],
+        tiles: List[ImageTile],
+        prepared_tiles: List[PreparedImage],
+        preprocess_seconds: float
+    ) -> OCRResult:
+        """在线程池中并发识别长图的各个条带并合并结果"""
+        try:
+            request_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, self.tile_concurrency)) as pool:
+                responses = list(pool.map(lambda prepared: self._request_json(prepared, prompt), prepared_tiles))
+            tile_blocks = [
+                self._tile_blocks(result_data, tile, prepared)
+                for result_data, tile, prepared in zip(responses, tiles, prepared_tiles)
+            ]
+        except requests.exceptions.Timeout:
+            raise requests.RequestException(f"API 请求超时（超过 {self.timeout} 秒）")
+        except requests.exceptions.RequestException as e:
+            raise requests.RequestException(f"API 请求失败: {str(e)}")
+        except (KeyError, IndexError) as e:
+            raise ValueError(f"API 响应解析失败: {str(e)}")
+        
+        ocr_result = self._merge_tiles(image_path, tiles, responses, tile_blocks)
+        self._record_tiles(ocr_result, prepared_tiles, preprocess_seconds,
+                           time.perf_counter() - request_start)
+        self._store_cache(cache_key, ocr_result)
+        return ocr_result
+    
+    def _tile_blocks(
+        self,
+        result_data: Dict[str, Any],
+        tile: ImageTile,
+        prepared: PreparedImage
+    ) -> List[TextBlock]:
+        """
+        解析单个条带的识别结果，坐标映射回原图（重叠区的文本块在合并时与相邻条带去重）
+        
+        Args:
+            result_data: 条带的 API 响应
+            tile: 条带
+            prepared: 条带的预处理结果
+            
+        Returns:
+            List[TextBlock]: 条带内的文本块
+        """
+        if 'choices' not in result_data or len(result_data['choices']) == 0:
+            raise ValueError("API 响应格式错误：缺少 choices 字段")
+        
+        content = result_data['choices'][0]['message']['content']
+        with metrics.stage('parse'):
+            parsed_blocks = parse_deepseek_ocr_response(content)
+        if not parsed_blocks:
+            # 没有坐标时使用清理后的纯文本，边界框取条带负责的区域
+            clean_text = clean_ocr_text(content)
+            if not clean_text:
+                return []
+            box = BoundingBox(0, max(tile.top, tile.keep_top), prepared.original_size[0],
+                              min(tile.bottom, tile.keep_bottom))
+            return [TextBlock(text=clean_text, box=box, confidence=None)]
+        
+        return [self._to_text_block(block, prepared) for block in parsed_blocks]
+    
+    def _merge_tiles(
+        self,
+        image_path: str,
+        tiles: List[ImageTile],
+        responses: List[Dict[str, Any]],
+        tile_blocks: List[List[TextBlock]]
+    ) -> OCRResult:
+        """按条带顺序合并文本块（重叠区去重），原始响应中保留每个条带的响应和累计的 token 用量"""
+        usage: Dict[str, Any] = {}
+        for result_data in responses:
+            for key, value in (result_data.get('usage') or {}).items():
+                if isinstance(value, (int, float)):
+                    usage[key] = usage.get(key, 0) + value
+        raw_response = {
+            'model': self.model_name,
+            'usage': usage or None,
+            'tiles': [
+                {'top': tile.top, 'bottom': tile.bottom, 'response': result_data}
+                for tile, result_data in zip(tiles, responses)
+            ]
+        }
+        return OCRResult(
+            image_path=image_path,
+            text_blocks=self._dedupe_overlaps(tiles, tile_blocks),
+            raw_response=raw_response
+        )
+    
+    @staticmethod
+    def _dedupe_overlaps(tiles: List[ImageTile], tile_blocks: List[List[TextBlock]]) -> List[TextBlock]:
+        """
+        去掉相邻条带在重叠区重复识别的文本块
+        
+        重叠区中的一行在两个条带中各出现一次，被条带边缘截断时其中一份只有部分文字。
+        两份位置重合时保留离所在条带边缘更远（更完整）的一份，不论其中心落在哪个条带的负责区域，
+        因此跨越分界线的一行既不会重复，也不会因两份都被判给相邻条带而丢失；
+        只在一个条带中识别出的文本块按中心所在的负责区域取舍。
+        
+        Args:
+            tiles: 条带列表
+            tile_blocks: 与条带一一对应的文本块（原图坐标）
+            
+        Returns:
+            List[TextBlock]: 按条带顺序合并后的文本块
+        """
+        dropped: Set[int] = set()
+        matched: Set[int] = set()
+        for i in range(len(tiles) - 1):
+            upper, lower = tiles[i], tiles[i + 1]
+            lower_candidates = [block for block in tile_blocks[i + 1] if block.box.y1 < lower.overlap_top]
+            for block in tile_blocks[i]:
+                if block.box.y2 <= upper.overlap_bottom or id(block) in dropped:
+                    continue
+                for other in lower_candidates:
+                    if id(other) in matched or not OCRService._same_region(block.box, other.box):
+                        continue
+                    matched.update((id(block), id(other)))
+                    # 离条带的截断边缘越远，识别出的文字越完整
+                    if upper.bottom - block.box.y2 >= other.box.y1 - lower.top:
+                        dropped.add(id(other))
+                    else:
+                        dropped.add(id(block))
+                    break
+        
+        return [
+            block
+            for tile, blocks in zip(tiles, tile_blocks)
+            for block in blocks
+            if id(block) not in dropped and (id(block) in matched or tile.owns(block.box))
+        ]
+    
+    @staticmethod
+    def _same_region(a: BoundingBox, b: BoundingBox) -> bool:
+        """两个边界框在水平和垂直方向的重合长度是否都超过较大边界框的一半（视为同一段文字）"""
+        overlap_x = min(a.x2, b.x2) - max(a.x1, b.x1)
+        overlap_y = min(a.y2, b.y2) - max(a.y1, b.y1)
+        return (overlap_x > 0.5 * max(a.width, b.width)
+                and overlap_y > 0.5 * max(a.height, b.height))
+    
+    @staticmethod
+    def _parse_sse_line(line: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        解析一行 SSE 数据（OpenAI 兼容的流式格式）
+        
+        Args:
+            line: 形如 "data: {...}" 的一行
+            
+        Returns:
+            Tuple[Optional[str], Optional[Dict]]: (新增的文本内容, token 用量)
+        """
+        if not line or not line.startswith('data:'):
+            return None, None
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return None, None
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            return None, None
+        choices = chunk.get('choices') or []
+        delta = choices[0].get('delta', {}).get('content') if choices else None
+        return delta, chunk.get('usage')
+    
+    def _read_sse_content(self, lines: Iterable[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        读取完整的 SSE 流并拼接内容
+        
+        Args:
+            lines: SSE 响应的行迭代器
+            
+        Returns:
+            Tuple[str, Optional[Dict]]: (完整内容, token 用量)
+        """
+        parts = []
+        usage = None
+        for line in lines:
+            delta, line_usage = self._parse_sse_line(line)
+            usage = line_usage or usage
+            if delta:
+                parts.append(delta)
+        return ''.join(parts), usage
+    
+    def _stream_raw_response(self, content: str, usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """将流式响应拼装成与非流式响应相同结构的原始响应"""
+        return {
+            'model': self.model_name,
+            'choices': [{'message': {'role': 'assistant', 'content': content}}],
+            'usage': usage
+        }
+    
+    async def warmup_async(self, count: Optional[int] = None):
+        """
+        预先建立到 OCR API 的连接
+        
+        Args:
+            count: 预建立的连接数，为 None 时使用配置中的 OCR_POOL_WARMUP
+        """
+        count = config.ocr_pool_warmup if count is None else count
+        if count > 0:
+            await self.http.awarmup(config.api_base_url, count, headers=self._build_headers())
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+        
+        Returns:
+            Dict[str, Any]: 连接池统计数据
+        """
+        return self.http.get_stats()
+    
+    async def aclose(self):
+        """关闭 HTTP 连接池，释放连接"""
+        await self.http.aclose()
+        self.http.close()
+    
+    def _check_request(self, image_path: str):
+        """
+        验证配置和图片文件（检查本服务实际使用的 API 密钥，而不是全局配置中的值）
+        
+        Args:
+            image_path: 图片文件路径
+            
+        Raises:
+            ValueError: API 配置无效
+            FileNotFoundError: 图片文件不存在
+        """
+        if not self.api_key:
+            raise ValueError("配置无效: 未配置 MODELVERSE_API_KEY，请在 .env 文件中设置")
+        if not config.api_base_url:
+            raise ValueError("配置无效: API 基础 URL 未配置")
         
-        # 验证文件
         if not Path(image_path).exists():
             raise FileNotFoundError(f"图片文件不存在: {image_path}")
+    
+    def _lookup_cache(
+        self,
+        image_path: str,
+        prompt: str,
+        image_hash: Optional[str] = None
+    ) -> tuple[Optional[str], Optional[OCRResult]]:
+        """
+        按图片内容、模型和提示词查询缓存
         
-        # 获取图片的 Data URL
-        image_data_url = get_image_data_url(image_path)
+        Args:
+            image_path: 图片文件路径
+            prompt: 提示词
+            image_hash: 图片内容哈希，为 None 时读取文件计算
+            
+        Returns:
+            tuple[Optional[str], Optional[OCRResult]]: (缓存键, 命中的结果)，未启用缓存时均为 None
+        """
+        if self.cache is None:
+            return None, None
+        with metrics.stage('cache_lookup'):
+            cache_key = OCRCache.make_key(
+                image_hash or hash_file(image_path), self.model_name, prompt, self._preprocess_signature()
+            )
+            return cache_key, self.cache.get(cache_key, image_path)
+    
+    def _preprocess_signature(self) -> str:
+        """影响识别结果的预处理参数（作为缓存键的一部分）"""
+        if not self.preprocess_enabled and not self.tile_enabled:
+            return ''
+        signature = (f"{self.upload_format}:{self.max_image_side}:"
+                     f"{self.upload_quality}:{self.grayscale_tolerance}")
+        if self.tile_enabled:
+            signature += (f"|tile:{self.tile_min_aspect}:{self.tile_aspect}:"
+                          f"{self.tile_overlap}:{self.tile_max}")
+        return signature
+    
+    def _prepare_image(
+        self,
+        image_path: str,
+        image_data: Optional[bytes] = None
+    ) -> Tuple[PreparedImage, float]:
+        """
+        准备发送给 API 的图片（按配置缩放、转灰度并重新编码）
         
-        # 构造请求体
-        payload = {
+        Args:
+            image_path: 图片文件路径
+            image_data: 已在内存中的图片内容，提供时不再读取文件
+            
+        Returns:
+            Tuple[PreparedImage, float]: (预处理结果, 预处理耗时秒数)
+        """
+        start = time.perf_counter()
+        if self.preprocess_enabled:
+            prepared = image_processor.prepare_for_ocr(
+                image_path,
+                max_side=self.max_image_side,
+                image_format=self.upload_format,
+                quality=self.upload_quality,
+                gray_tolerance=self.grayscale_tolerance,
+                data=image_data
+            )
+        else:
+            if Path(image_path).suffix.lower() not in SUPPORTED_IMAGE_FORMATS:
+                raise ValueError(f"不支持的图片格式: {Path(image_path).suffix}")
+            size = image_processor.get_image_size(image_path, image_data)
+            original_bytes = len(image_data) if image_data is not None else Path(image_path).stat().st_size
+            prepared = PreparedImage(
+                mime_type=get_image_mime_type(image_path),
+                original_size=size,
+                sent_size=size,
+                original_bytes=original_bytes,
+                sent_bytes=original_bytes,
+                data=image_data,
+                source_path=image_path if image_data is None else None
+            )
+        elapsed = time.perf_counter() - start
+        metrics.observe_stage('preprocess', elapsed)
+        return prepared, elapsed
+    
+    def _record_preprocess(
+        self,
+        ocr_result: OCRResult,
+        prepared: PreparedImage,
+        preprocess_seconds: float,
+        request_seconds: float
+    ):
+        """记录单次请求的预处理效果，并累计到全局统计"""
+        ocr_result.metadata['preprocess'] = {
+            **prepared.to_stats(),
+            'preprocess_ms': round(preprocess_seconds * 1000, 2),
+            'request_ms': round(request_seconds * 1000, 2),
+        }
+        with self._stats_lock:
+            totals = self._preprocess_totals
+            totals['requests'] += 1
+            totals['original_bytes'] += prepared.original_bytes
+            totals['sent_bytes'] += prepared.sent_bytes
+            totals['preprocess_seconds'] += preprocess_seconds
+            totals['request_seconds'] += request_seconds
+    
+    def _record_tiles(
+        self,
+        ocr_result: OCRResult,
+        prepared_tiles: List[PreparedImage],
+        preprocess_seconds: float,
+        request_seconds: float
+    ):
+        """记录切块识别的预处理效果（所有条带合计为一次请求）"""
+        original_bytes = sum(prepared.original_bytes for prepared in prepared_tiles)
+        sent_bytes = sum(prepared.sent_bytes for prepared in prepared_tiles)
+        ocr_result.metadata['preprocess'] = {
+            'tiles': [
+                {**prepared.to_stats(), 'offset': list(prepared.offset)}
+                for prepared in prepared_tiles
+            ],
+            'original_bytes': original_bytes,
+            'sent_bytes': sent_bytes,
+            'bytes_saved': original_bytes - sent_bytes,
+            'preprocess_ms': round(preprocess_seconds * 1000, 2),
+            'request_ms': round(request_seconds * 1000, 2),
+        }
+        with self._stats_lock:
+            totals = self._preprocess_totals
+            totals['requests'] += 1
+            totals['original_bytes'] += original_bytes
+            totals['sent_bytes'] += sent_bytes
+            totals['preprocess_seconds'] += preprocess_seconds
+            totals['request_seconds'] += request_seconds
+    
+    def get_preprocess_stats(self) -> Dict[str, Any]:
+        """
+        获取图片预处理统计信息
+        
+        Returns:
+            Dict[str, Any]: 累计节省的字节数、平均预处理耗时和平均请求耗时
+        """
+        with self._stats_lock:
+            totals = dict(self._preprocess_totals)
+        count = totals['requests']
+        return {
+            'enabled': self.preprocess_enabled,
+            'requests': count,
+            'original_bytes': totals['original_bytes'],
+            'sent_bytes': totals['sent_bytes'],
+            'bytes_saved': totals['original_bytes'] - totals['sent_bytes'],
+            'avg_preprocess_ms': round(totals['preprocess_seconds'] * 1000 / count, 2) if count else 0.0,
+            'avg_request_ms': round(totals['request_seconds'] * 1000 / count, 2) if count else 0.0,
+        }
+    
+    def _store_cache(self, cache_key: Optional[str], ocr_result: OCRResult):
+        """按保留策略处理原始响应后，将识别结果写入缓存"""
+        with metrics.stage('cache_store'):
+            self._retain_raw_response(cache_key, ocr_result)
+            if self.cache is not None and cache_key is not None:
+                self.cache.put(cache_key, ocr_result)
+    
+    def _retain_raw_response(self, cache_key: Optional[str], ocr_result: OCRResult):
+        """
+        按保留策略处理原始响应：丢弃，或写入磁盘日志后只在结果中保留结果 ID
+        
+        Args:
+            cache_key: 缓存键（作为结果 ID，相同图片和参数的结果共用一条日志）
+            ocr_result: OCR 识别结果
+        """
+        if self.raw_response_retention == RETENTION_MEMORY or ocr_result.raw_response is None:
+            return
+        if self.raw_response_retention == RETENTION_SPILL and self.raw_response_log is not None:
+            result_id = cache_key or uuid.uuid4().hex
+            self.raw_response_log.append(result_id, ocr_result.raw_response)
+            ocr_result.raw_response_id = result_id
+        ocr_result.raw_response = None
+    
+    def get_raw_response(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        按结果 ID 读取写入磁盘日志的原始响应
+        
+        Returns:
+            Optional[Dict[str, Any]]: 原始 API 响应，未启用日志或已被清理时返回 None
+        """
+        if self.raw_response_log is None:
+            return None
+        return self.raw_response_log.get(result_id)
+    
+    def get_raw_response_stats(self) -> Dict[str, Any]:
+        """
+        获取原始响应保留统计信息
+        
+        Returns:
+            Dict[str, Any]: 保留策略及磁盘日志统计
+        """
+        stats: Dict[str, Any] = {'retention': self.raw_response_retention}
+        if self.raw_response_log is not None:
+            stats.update(self.raw_response_log.get_stats())
+        return stats
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取 OCR 结果缓存统计信息
+        
+        Returns:
+            Dict[str, Any]: 缓存统计数据，未启用缓存时返回 {'enabled': False}
+        """
+        if self.cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.cache.get_stats()}
+    
+    def _build_payload(self, image_data_url: str, prompt: str, stream: bool) -> Dict[str, Any]:
+        """
+        构造 API 请求体
+        
+        Args:
+            image_data_url: 图片的 Data URL
+            prompt: 提示词
+            stream: 是否使用流式响应
+            
+        Returns:
+            Dict[str, Any]: 请求体
+        """
+        return {
             "model": self.model_name,
             "messages": [
                 {
@@ -80,74 +982,135 @@ class OCRService:
             "max_tokens": self.max_tokens,
             "stream": stream
         }
+    
+    def _build_body(self, prepared: PreparedImage, prompt: str, stream: bool) -> StreamingJSONBody:
+        """
+        构造流式请求体（图片在发送时按块进行 Base64 编码）
         
-        # 设置请求头
+        Args:
+            prepared: 预处理后的图片
+            prompt: 提示词
+            stream: 是否使用流式响应
+            
+        Returns:
+            StreamingJSONBody: 请求体
+        """
+        return StreamingJSONBody(
+            self._build_payload(IMAGE_PLACEHOLDER, prompt, stream),
+            mime_type=prepared.mime_type,
+            data=prepared.data,
+            path=prepared.source_path
+        )
+    
+    def _build_headers(self, body: Optional[StreamingJSONBody] = None) -> Dict[str, str]:
+        """构造请求头"""
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        if body is not None:
+            headers.update(body.headers)
+        return headers
+    
+    def _parse_response(
+        self,
+        image_path: str,
+        result_data: Dict[str, Any],
+        prepared: Optional[PreparedImage] = None
+    ) -> OCRResult:
+        """
+        将 API 响应解析为 OCRResult
         
-        try:
-            # 发送请求（禁用代理以避免代理连接问题）
-            response = requests.post(
-                self.api_url,
-                json=payload,
-                headers=headers,
-                timeout=self.timeout,
-                proxies={'http': None, 'https': None}  # 禁用代理
-            )
-            response.raise_for_status()
+        Args:
+            image_path: 图片文件路径
+            result_data: API 返回的 JSON 数据
+            prepared: 发送的预处理图片，用于将坐标映射回原图
             
-            # 解析响应
-            result_data = response.json()
+        Returns:
+            OCRResult: OCR 识别结果
             
-            # 提取识别的文本
-            if 'choices' not in result_data or len(result_data['choices']) == 0:
-                raise ValueError("API 响应格式错误：缺少 choices 字段")
-
-            content = result_data['choices'][0]['message']['content']
+        Raises:
+            ValueError: 响应格式错误
+        """
+        # 提取识别的文本
+        if 'choices' not in result_data or len(result_data['choices']) == 0:
+            raise ValueError("API 响应格式错误：缺少 choices 字段")
 
-            # 创建 OCRResult 对象
-            ocr_result = OCRResult(
-                image_path=image_path,
-                raw_response=result_data
-            )
+        content = result_data['choices'][0]['message']['content']
+        return self._build_result(image_path, content, result_data, prepared)
+    
+    def _build_result(
+        self,
+        image_path: str,
+        content: str,
+        raw_response: Dict[str, Any],
+        prepared: Optional[PreparedImage] = None
+    ) -> OCRResult:
+        """
+        将模型输出的文本内容解析为 OCRResult
+        
+        Args:
+            image_path: 图片文件路径
+            content: 模型输出的文本内容
+            raw_response: 原始 API 响应
+            prepared: 发送的预处理图片，用于将坐标映射回原图
+            
+        Returns:
+            OCRResult: OCR 识别结果
+        """
+        # 创建 OCRResult 对象
+        ocr_result = OCRResult(
+            image_path=image_path,
+            raw_response=raw_response
+        )
 
-            # 解析 DeepSeek OCR 的响应格式
-            # DeepSeek OCR 返回包含文本和边界框坐标的特殊格式
+        # 解析 DeepSeek OCR 的响应格式
+        # DeepSeek OCR 返回包含文本和边界框坐标的特殊格式
+        with metrics.stage('parse'):
             parsed_blocks = parse_deepseek_ocr_response(content)
 
-            if parsed_blocks:
-                # 添加解析后的文本块（包含坐标信息）
-                for block in parsed_blocks:
-                    box_coords = block['box']  # [x1, y1, x2, y2]
-                    ocr_result.add_text_block(
-                        text=block['text'],
-                        box=BoundingBox(
-                            x1=box_coords[0],
-                            y1=box_coords[1],
-                            x2=box_coords[2],
-                            y2=box_coords[3]
-                        ),
-                        confidence=None
-                    )
-            else:
-                # 如果解析失败，使用清理后的纯文本
-                clean_text = clean_ocr_text(content)
-                ocr_result.add_text_block(
-                    text=clean_text,
-                    box=BoundingBox(0, 0, 0, 0),
-                    confidence=None
-                )
+        if parsed_blocks:
+            # 添加解析后的文本块（包含坐标信息）
+            for block in parsed_blocks:
+                ocr_result.text_blocks.append(self._to_text_block(block, prepared))
+        else:
+            # 如果解析失败，使用清理后的纯文本
+            clean_text = clean_ocr_text(content)
+            ocr_result.add_text_block(
+                text=clean_text,
+                box=BoundingBox(0, 0, 0, 0),
+                confidence=None
+            )
 
-            return ocr_result
-            
-        except requests.exceptions.Timeout:
-            raise requests.RequestException(f"API 请求超时（超过 {self.timeout} 秒）")
-        except requests.exceptions.RequestException as e:
-            raise requests.RequestException(f"API 请求失败: {str(e)}")
-        except (KeyError, IndexError) as e:
-            raise ValueError(f"API 响应解析失败: {str(e)}")
+        return ocr_result
+    
+    @staticmethod
+    def _to_text_block(block: Dict[str, Any], prepared: Optional[PreparedImage] = None) -> TextBlock:
+        """
+        将解析出的文本块字典转换为 TextBlock
+        
+        Args:
+            block: 解析出的文本块，坐标按发送图片的宽高归一化到 0-999
+            prepared: 发送的预处理图片，用于将归一化坐标映射为原图像素坐标（切块时再加上切块的偏移）
+        """
+        box_coords = block['box']  # [x1, y1, x2, y2]
+        if prepared is None:
+            box = BoundingBox(
+                x1=box_coords[0],
+                y1=box_coords[1],
+                x2=box_coords[2],
+                y2=box_coords[3]
+            )
+        else:
+            scale_x, scale_y = prepared.scale_x, prepared.scale_y
+            offset_x, offset_y = prepared.offset
+            box = BoundingBox(
+                x1=box_coords[0] * scale_x + offset_x,
+                y1=box_coords[1] * scale_y + offset_y,
+                x2=box_coords[2] * scale_x + offset_x,
+                y2=box_coords[3] * scale_y + offset_y
+            )
+        return TextBlock(text=block['text'], box=box, confidence=None)
     
     def recognize_with_markdown(self, image_path: str) -> str:
         """
@@ -0,0 +1,147 @@
+"""
+PDF 处理模块
+按页惰性光栅化 PDF：每次只渲染一页，内存占用与总页数无关
+"""
+
+import io
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from .config import config
+
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    from pdf2image.exceptions import (
+        PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError, PDFPopplerTimeoutError
+    )
+except ImportError:  # 未安装 pdf2image 时不支持 PDF
+    convert_from_path = None
+    pdfinfo_from_path = None
+
+
+# 允许的光栅化分辨率范围
+MIN_DPI = 72
+MAX_DPI = 600
+
+
+class PDFError(ValueError):
+    """PDF 无法处理（缺少依赖、文件损坏或页数超出上限）"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PDFProcessor:
+    """基于 pdf2image（Poppler）的逐页光栅化"""
+
+    def __init__(
+        self,
+        dpi: int = 200,
+        max_pages: int = 200,
+        poppler_path: Optional[str] = None,
+        timeout: Optional[int] = None
+    ):
+        """
+        初始化 PDF 处理器
+
+        Args:
+            dpi: 默认的光栅化分辨率
+            max_pages: 单个 PDF 最多处理的页数
+            poppler_path: Poppler 可执行文件所在目录，为 None 时从 PATH 中查找
+            timeout: 渲染单页的超时时间（秒），为 None 时不限制
+        """
+        self.dpi = dpi
+        self.max_pages = max_pages
+        self.poppler_path = poppler_path
+        self.timeout = timeout
+
+    def is_available(self) -> bool:
+        """是否已安装 pdf2image 和 Poppler"""
+        if convert_from_path is None:
+            return False
+        if self.poppler_path:
+            return Path(self.poppler_path).is_dir()
+        return shutil.which('pdftoppm') is not None and shutil.which('pdfinfo') is not None
+
+    def page_count(self, pdf_path: str) -> int:
+        """
+        读取 PDF 的页数（不渲染任何页面）
+
+        Args:
+            pdf_path: PDF 文件路径
+
+        Returns:
+            int: 页数
+
+        Raises:
+            PDFError: 缺少依赖、文件损坏或页数超出上限
+        """
+        self._check_available()
+        try:
+            info = pdfinfo_from_path(pdf_path, poppler_path=self.poppler_path, timeout=self.timeout)
+        except PDFInfoNotInstalledError:
+            raise PDFError("未找到 Poppler，无法处理 PDF 文件", status_code=501)
+        except PDFPopplerTimeoutError:
+            raise PDFError(f"读取 PDF 信息超时（超过 {self.timeout} 秒）", status_code=504)
+        except (PDFPageCountError, PDFSyntaxError) as e:
+            raise PDFError(f"PDF 文件无效或已损坏: {str(e)}")
+
+        pages = int(info.get('Pages', 0))
+        if pages <= 0:
+            raise PDFError("PDF 文件中没有页面")
+        if pages > self.max_pages:
+            raise PDFError(f"PDF 页数过多（{pages} 页），单个文件最多 {self.max_pages} 页")
+        return pages
+
+    def render_page(self, pdf_path: str, page: int, dpi: Optional[int] = None) -> bytes:
+        """
+        将 PDF 的一页光栅化为 PNG
+
+        Args:
+            pdf_path: PDF 文件路径
+            page: 页码（从 1 开始）
+            dpi: 光栅化分辨率，为 None 时使用默认值
+
+        Returns:
+            bytes: PNG 图片内容
+
+        Raises:
+            PDFError: 缺少依赖或页面无法渲染
+        """
+        self._check_available()
+        try:
+            images = convert_from_path(
+                pdf_path,
+                dpi=dpi or self.dpi,
+                first_page=page,
+                last_page=page,
+                poppler_path=self.poppler_path,
+                timeout=self.timeout
+            )
+        except PDFPopplerTimeoutError:
+            raise PDFError(f"第 {page} 页渲染超时（超过 {self.timeout} 秒）", status_code=504)
+        except (PDFPageCountError, PDFSyntaxError) as e:
+            raise PDFError(f"第 {page} 页渲染失败: {str(e)}")
+        if not images:
+            raise PDFError(f"第 {page} 页渲染失败")
+
+        with images[0] as image:
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def _check_available(self):
+        """检查依赖是否可用"""
+        if not self.is_available():
+            raise PDFError("服务端未安装 pdf2image 或 Poppler，暂不支持 PDF 文件", status_code=501)
+
+
+# 全局 PDF 处理器实例
+pdf_processor = PDFProcessor(
+    dpi=config.pdf_dpi,
+    max_pages=config.pdf_max_pages,
+    poppler_path=config.pdf_poppler_path,
+    timeout=config.pdf_render_timeout
+)
@@ -0,0 +1,187 @@
+"""
+题目编辑模块
+在已保存的识别结果上合并题目、拆分题目或移动文本块，只重新计算受影响题目的文本和边界框
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict
+
+from .models import Question
+from .document_store import StoredDocument
+from .question_splitter import QuestionSplitter, question_splitter
+
+
+class EditError(ValueError):
+    """编辑请求无效（题目或文本块不存在、无法拆分等）"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class EditDelta:
+    """一次编辑的结果（只包含变化的部分）"""
+    updated: List[Question] = field(default_factory=list)  # 新增或内容变化的题目
+    removed: List[int] = field(default_factory=list)  # 被删除的题目 ID
+
+
+class QuestionEditor:
+    """
+    题目编辑器
+
+    编辑时不修改原有的 Question 对象：受影响的题目替换为新对象，题目列表整体替换，
+    正在导出等操作中持有旧列表的请求不受影响。文本块编号在上传时确定，编辑前后不变。
+    """
+
+    def __init__(self, splitter: QuestionSplitter):
+        """
+        初始化编辑器
+
+        Args:
+            splitter: 题目分割器（用于合并题目）
+        """
+        self.splitter = splitter
+
+    def merge(self, document: StoredDocument, question_ids: List[int]) -> EditDelta:
+        """
+        合并多道题目（合并后的题目使用文档中第一道题的 ID 和位置）
+
+        Args:
+            document: 识别结果文档
+            question_ids: 要合并的题目 ID
+
+        Returns:
+            EditDelta: 合并后的题目及被删除的题目 ID
+
+        Raises:
+            EditError: 题目不存在或少于两道
+        """
+        positions = self._positions(document)
+        selected = sorted({self._position(positions, question_id) for question_id in question_ids})
+        if len(selected) < 2:
+            raise EditError("请至少选择两道题目进行合并")
+
+        questions = document.questions
+        merged = self.splitter.merge_questions(questions, selected)
+        removed = [questions[i].question_id for i in selected[1:]]
+
+        dropped = set(selected[1:])
+        updated = [q for i, q in enumerate(questions) if i not in dropped]
+        updated[selected[0]] = merged
+        document.index.assign(document.index.block_ids(merged), merged.question_id)
+        return self._commit(document, updated, EditDelta(updated=[merged], removed=removed))
+
+    def split(self, document: StoredDocument, question_id: int, block: int) -> EditDelta:
+        """
+        从指定文本块处拆分题目（该文本块及之后的文本块成为新题目，排在原题目之后）
+
+        Args:
+            document: 识别结果文档
+            question_id: 要拆分的题目 ID
+            block: 文本块编号（新题目的第一个文本块）
+
+        Returns:
+            EditDelta: 拆分后的两道题目
+
+        Raises:
+            EditError: 题目不存在、文本块不属于该题目或是题目的第一个文本块
+        """
+        position = self._position(self._positions(document), question_id)
+        question = document.questions[position]
+        block_ids = document.index.block_ids(question)
+        if block not in block_ids:
+            raise EditError(f"文本块 {block} 不属于题目 {question_id}")
+        at = block_ids.index(block)
+        if at == 0:
+            raise EditError("不能从题目的第一个文本块处拆分")
+
+        head = Question(question_id=question_id, text_blocks=question.text_blocks[:at])
+        tail = Question(question_id=self._next_question_id(document), text_blocks=question.text_blocks[at:])
+
+        updated = list(document.questions)
+        updated[position:position + 1] = [head, tail]
+        document.index.assign(block_ids[at:], tail.question_id)
+        return self._commit(document, updated, EditDelta(updated=[head, tail]))
+
+    def move_block(self, document: StoredDocument, block: int, question_id: int) -> EditDelta:
+        """
+        将文本块移到另一道题目（插入到目标题目中第一个阅读顺序在它之后的文本块之前；原题目为空时删除）
+
+        Args:
+            document: 识别结果文档
+            block: 文本块编号
+            question_id: 目标题目 ID
+
+        Returns:
+            EditDelta: 原题目和目标题目的变化
+
+        Raises:
+            EditError: 文本块或目标题目不存在
+        """
+        index = document.index
+        if not 0 <= block < len(index.blocks):
+            raise EditError(f"文本块 {block} 不存在", status_code=404)
+        positions = self._positions(document)
+        target_position = self._position(positions, question_id)
+        source_id = index.block_questions[block]
+        if source_id == question_id:
+            return EditDelta()
+        source_position = self._position(positions, source_id)
+
+        questions = document.questions
+        moved = index.blocks[block]
+        source = questions[source_position]
+        target = questions[target_position]
+        # 文本块编号即上传时的阅读顺序；目标题目的文本块不一定按编号排列（如合并过不相邻的题目），
+        # 按题目中的实际顺序查找插入位置
+        target_ids = index.block_ids(target)
+        at = next((k for k, i in enumerate(target_ids) if i > block), len(target_ids))
+
+        new_source = Question(
+            question_id=source_id,
+            text_blocks=[b for b in source.text_blocks if b is not moved]
+        )
+        new_target = Question(
+            question_id=question_id,
+            text_blocks=target.text_blocks[:at] + [moved] + target.text_blocks[at:]
+        )
+
+        updated = list(questions)
+        updated[target_position] = new_target
+        index.assign([block], question_id)
+        if new_source.text_blocks:
+            updated[source_position] = new_source
+            delta = EditDelta(updated=[new_source, new_target])
+        else:
+            del updated[source_position]
+            delta = EditDelta(updated=[new_target], removed=[source_id])
+        return self._commit(document, updated, delta)
+
+    @staticmethod
+    def _positions(document: StoredDocument) -> Dict[int, int]:
+        """题目 ID -> 在题目列表中的位置"""
+        return {q.question_id: i for i, q in enumerate(document.questions)}
+
+    @staticmethod
+    def _position(positions: Dict[int, int], question_id: int) -> int:
+        position = positions.get(question_id)
+        if position is None:
+            raise EditError(f"题目 {question_id} 不存在", status_code=404)
+        return position
+
+    @staticmethod
+    def _next_question_id(document: StoredDocument) -> int:
+        """新题目的 ID（大于现有的所有题目 ID，已有题目的 ID 保持不变）"""
+        return max((q.question_id for q in document.questions), default=0) + 1
+
+    @staticmethod
+    def _commit(document: StoredDocument, questions: List[Question], delta: EditDelta) -> EditDelta:
+        """替换题目列表，并在题目边界框索引中只替换变化的题目"""
+        document.questions = questions
+        document.index.replace_questions(delta.removed, delta.updated)
+        return delta
+
+
+# 全局题目编辑器实例
+question_editor = QuestionEditor(question_splitter)
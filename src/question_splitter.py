@@ -4,8 +4,143 @@
 """
 
 import re
-from typing import List, Tuple, Optional
-from .models import Question, TextBlock, BoundingBox, OCRResult
+from dataclasses import dataclass
+from typing import List, Tuple, Optional, Dict
+from .models import Question, TextBlock, BoundingBox, OCRResult, BlockColumns
+from .layout_analyzer import LayoutAnalyzer, layout_analyzer
+
+
+# 可以提取为公共前缀的模式开头（去除首尾空白后的文本中只会匹配空串）
+SHARED_PATTERN_PREFIX = r'^\s*'
+
+
+@dataclass
+class QuestionNumber:
+    """题号识别结果"""
+    number: str  # 题号（如 "3"、"三"）
+    style: str  # 题号样式（默认模式为样式名称，自定义模式为模式字符串）
+    end: int  # 题号及其后空白在去除首尾空白后的文本中的结束位置
+
+
+class QuestionNumberClassifier:
+    """
+    题号分类器
+    
+    将所有题号模式按顺序合并为一个正则表达式的分支，一次匹配即可得到题号和样式，
+    结果与依次尝试每个模式相同（排在前面的模式优先）。
+    模式无法安全合并时（包含命名分组、反向引用或 (?i) 这类作用于整个表达式的行内标志）退回依次匹配。
+    """
+    
+    def __init__(self, patterns: List[str], styles: Optional[List[str]] = None):
+        """
+        初始化题号分类器
+        
+        Args:
+            patterns: 题号匹配模式列表，第一个分组为题号
+            styles: 与模式一一对应的样式名称，为 None 时使用模式字符串
+            
+        Raises:
+            ValueError: 模式没有捕获题号的分组，或样式数量与模式数量不一致
+        """
+        self.patterns = list(patterns)
+        self.styles = list(styles) if styles is not None else list(self.patterns)
+        if len(self.styles) != len(self.patterns):
+            raise ValueError("题号样式数量与模式数量不一致")
+        
+        self.compiled_patterns = [re.compile(p) for p in self.patterns]
+        for pattern in self.compiled_patterns:
+            if pattern.groups < 1:
+                raise ValueError(f"题号模式必须包含捕获题号的分组: {pattern.pattern}")
+        
+        # 分支分组名 -> (题号所在的分组编号, 样式)
+        self._branches: Dict[str, Tuple[int, str]] = {}
+        self._combined = self._combine()
+    
+    def _combine(self) -> Optional[re.Pattern]:
+        """将所有模式合并为一个正则表达式，无法安全合并时返回 None"""
+        for pattern in self.compiled_patterns:
+            if pattern.groupindex or re.search(r'\\[1-9]|\(\?P=', pattern.pattern):
+                return None
+            # 全局行内标志 (?aiLmsux) 合并后会作用于所有分支（Python 3.11 之前只给出警告），
+            # 编译结果中除默认的 UNICODE 以外的标志都来自这类行内标志；(?i:...) 这样的局部标志不受影响
+            if pattern.flags & ~re.UNICODE:
+                return None
+        
+        # 所有模式都以 ^\s* 开头时提取为公共前缀，避免每个分支重复匹配
+        shared = all(p.startswith(SHARED_PATTERN_PREFIX) for p in self.patterns)
+        branches = []
+        group = 0
+        for i, (pattern, style) in enumerate(zip(self.compiled_patterns, self.styles)):
+            body = pattern.pattern[len(SHARED_PATTERN_PREFIX):] if shared else pattern.pattern
+            name = f"_q{i}"
+            branches.append(f"(?P<{name}>{body})")
+            # 分支分组之后紧跟模式自身的分组，第一个即为题号
+            self._branches[name] = (group + 2, style)
+            group += 1 + pattern.groups
+        
+        combined = '(?:' + '|'.join(branches) + ')'
+        if shared:
+            combined = r'\s*' + combined
+        try:
+            return re.compile(combined)
+        except re.error:
+            self._branches.clear()
+            return None
+    
+    def _match(self, text: str) -> Optional[Tuple[re.Match, int, str]]:
+        """
+        匹配文本开头的题号（classify 和 number 共用）
+        
+        先去除首尾空白，合并表达式开头的公共前缀因此只会匹配空串。
+        
+        Returns:
+            Optional[Tuple[re.Match, int, str]]: 匹配结果、题号所在的分组编号和样式，不是题目开始时返回 None
+        """
+        text = text.strip()
+        if self._combined is not None:
+            match = self._combined.match(text)
+            if match is None:
+                return None
+            group, style = self._branches[match.lastgroup]
+            return match, group, style
+        
+        for pattern, style in zip(self.compiled_patterns, self.styles):
+            match = pattern.match(text)
+            if match:
+                return match, 1, style
+        return None
+    
+    def classify(self, text: str) -> Optional[QuestionNumber]:
+        """
+        识别文本开头的题号
+        
+        Args:
+            text: 要检查的文本
+            
+        Returns:
+            Optional[QuestionNumber]: 题号及样式，不是题目开始时返回 None
+        """
+        found = self._match(text)
+        if found is None:
+            return None
+        match, group, style = found
+        return QuestionNumber(match.group(group), style, match.end())
+    
+    def number(self, text: str) -> Optional[str]:
+        """
+        识别文本开头的题号（只返回题号，供逐行判断时使用）
+        
+        Args:
+            text: 要检查的文本
+            
+        Returns:
+            Optional[str]: 题号，不是题目开始时返回 None
+        """
+        found = self._match(text)
+        if found is None:
+            return None
+        match, group, _ = found
+        return match.group(group)
 
 
 class QuestionSplitter:
@@ -21,15 +156,31 @@ class QuestionSplitter:
         r'^\s*([一二三四五六七八九十]+)[\.、．]\s*',  # 匹配: 一、 二、
     ]
     
-    def __init__(self, patterns: Optional[List[str]] = None):
+    # 默认题号模式对应的样式名称
+    QUESTION_NUMBER_STYLES = [
+        'arabic',  # 1.
+        'parenthesized',  # (1)
+        'fullwidth_parenthesized',  # （1）
+        'bracketed',  # [1]
+        'lenticular',  # 【1】
+        'chinese',  # 一、
+    ]
+    
+    def __init__(self, patterns: Optional[List[str]] = None, layout: Optional[LayoutAnalyzer] = None):
         """
         初始化题目分割器
         
         Args:
             patterns: 自定义的题号匹配模式列表，如果为 None 则使用默认模式
+            layout: 版面分析器，如果为 None 则使用全局实例
         """
+        self.layout = layout or layout_analyzer
         self.patterns = patterns or self.QUESTION_NUMBER_PATTERNS
-        self.compiled_patterns = [re.compile(p) for p in self.patterns]
+        self.classifier = QuestionNumberClassifier(
+            self.patterns,
+            styles=None if patterns else self.QUESTION_NUMBER_STYLES
+        )
+        self.compiled_patterns = self.classifier.compiled_patterns
     
     def is_question_start(self, text: str) -> Tuple[bool, Optional[str]]:
         """
@@ -41,12 +192,20 @@ class QuestionSplitter:
         Returns:
             Tuple[bool, Optional[str]]: (是否是题目开始, 题号)
         """
-        for pattern in self.compiled_patterns:
-            match = pattern.match(text.strip())
-            if match:
-                question_number = match.group(1)
-                return True, question_number
-        return False, None
+        question_number = self.classifier.number(text)
+        return question_number is not None, question_number
+    
+    def classify_question_number(self, text: str) -> Optional[QuestionNumber]:
+        """
+        识别文本开头的题号及其样式
+        
+        Args:
+            text: 要检查的文本
+            
+        Returns:
+            Optional[QuestionNumber]: 题号及样式，不是题目开始时返回 None
+        """
+        return self.classifier.classify(text)
     
     def split_text_by_lines(self, text: str) -> List[Question]:
         """
@@ -110,7 +269,7 @@ class QuestionSplitter:
         Returns:
             List[Question]: 题目列表
         """
-        # 对文本块进行排序（按 y 坐标，然后按 x 坐标）
+        # 对文本块按阅读顺序排序（检测分栏，栏内逐行从左到右）
         sorted_blocks = self._sort_text_blocks(ocr_result.text_blocks)
         
         questions = []
@@ -154,12 +313,8 @@ class QuestionSplitter:
         Returns:
             List[TextBlock]: 排序后的文本块列表
         """
-        # 按 y 坐标升序，y 相近时按 x 坐标升序
-        # y 坐标差异小于 10 像素认为是同一行
-        return sorted(
-            blocks,
-            key=lambda b: (round(b.box.y1 / 10) * 10, b.box.x1)
-        )
+        order = self.layout.reading_order(BlockColumns(blocks))
+        return [blocks[i] for i in order]
     
     def merge_questions(self, questions: List[Question], indices: List[int]) -> Question:
         """
@@ -0,0 +1,220 @@
+"""
+原始响应日志模块
+按保留策略处理 OCRResult.raw_response：保留在内存、直接丢弃，或写入压缩的追加式磁盘日志并按结果 ID 延迟读取
+"""
+
+import json
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+from .config import config
+
+
+# 保留策略
+RETENTION_MEMORY = 'memory'  # 原始响应随结果保存在内存和缓存中
+RETENTION_DROP = 'drop'  # 丢弃原始响应
+RETENTION_SPILL = 'spill'  # 写入磁盘日志，结果中只保留结果 ID
+RETENTION_POLICIES = (RETENTION_MEMORY, RETENTION_DROP, RETENTION_SPILL)
+
+# 记录头：结果 ID 长度、压缩后的数据长度
+RECORD_HEADER = struct.Struct('>HI')
+
+
+class RawResponseLog:
+    """追加式的压缩原始响应日志（按段文件滚动，超出容量后删除最早的段）"""
+
+    def __init__(
+        self,
+        log_dir: Path,
+        max_bytes: int = 200 * 1024 * 1024,
+        segment_bytes: int = 16 * 1024 * 1024,
+        compress_level: int = 6
+    ):
+        """
+        初始化日志
+
+        Args:
+            log_dir: 日志目录
+            max_bytes: 日志总大小上限，超出后删除最早的段文件
+            segment_bytes: 单个段文件的大小，超出后写入新的段文件
+            compress_level: zlib 压缩级别（1-9）
+        """
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.compress_level = compress_level
+
+        self._lock = threading.Lock()
+        # 结果 ID -> (段号, 记录中压缩数据的偏移, 压缩数据长度)
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        # 段号 -> 段文件大小，按写入顺序排列
+        self._segments: OrderedDict[int, int] = OrderedDict()
+        # 段号 -> 该段中的结果 ID（删除段时清理索引）
+        self._segment_ids: Dict[int, List[str]] = {}
+        self._total_bytes = 0
+
+        self.records_written = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.segments_removed = 0
+
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def append(self, result_id: str, raw_response: Dict[str, Any]):
+        """
+        写入一条原始响应（相同结果 ID 再次写入时，读取返回最新的一条）
+
+        Args:
+            result_id: 结果 ID
+            raw_response: 原始 API 响应
+        """
+        encoded = json.dumps(raw_response, ensure_ascii=False).encode('utf-8')
+        payload = zlib.compress(encoded, self.compress_level)
+        key = result_id.encode('utf-8')
+        record = RECORD_HEADER.pack(len(key), len(payload)) + key + payload
+
+        with self._lock:
+            segment = self._current_segment(len(record))
+            offset = self._segments[segment]
+            with open(self._segment_path(segment), 'ab') as f:
+                f.write(record)
+
+            self._index[result_id] = (segment, offset + RECORD_HEADER.size + len(key), len(payload))
+            self._segment_ids[segment].append(result_id)
+            self._segments[segment] += len(record)
+            self._total_bytes += len(record)
+
+            self.records_written += 1
+            self.raw_bytes += len(encoded)
+            self.compressed_bytes += len(payload)
+            self._evict()
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取原始响应
+
+        Args:
+            result_id: 结果 ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 原始 API 响应，不存在或已被清理时返回 None
+        """
+        with self._lock:
+            location = self._index.get(result_id)
+        if location is None:
+            return None
+
+        # 记录写入后不会再修改，读取时不需要持有锁
+        segment, offset, length = location
+        try:
+            with open(self._segment_path(segment), 'rb') as f:
+                f.seek(offset)
+                payload = f.read(length)
+        except OSError:
+            return None
+
+        try:
+            return json.loads(zlib.decompress(payload))
+        except (zlib.error, json.JSONDecodeError):
+            return None
+
+    def __contains__(self, result_id: str) -> bool:
+        with self._lock:
+            return result_id in self._index
+
+    def clear(self):
+        """删除所有段文件"""
+        with self._lock:
+            for segment in list(self._segments):
+                self._remove_segment(segment)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取日志统计信息
+
+        Returns:
+            Dict[str, Any]: 记录数、压缩前后的字节数及磁盘占用
+        """
+        with self._lock:
+            return {
+                'records': len(self._index),
+                'segments': len(self._segments),
+                'disk_bytes': self._total_bytes,
+                'records_written': self.records_written,
+                'raw_bytes': self.raw_bytes,
+                'compressed_bytes': self.compressed_bytes,
+                'compression_ratio': round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else 0.0,
+                'segments_removed': self.segments_removed,
+            }
+
+    # ============ 段文件 ============
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.log_dir / f"{segment:08d}.log"
+
+    def _current_segment(self, record_size: int) -> int:
+        """返回可以写入该记录的段号，当前段写满时新建一个段"""
+        if self._segments:
+            segment = next(reversed(self._segments))
+            if self._segments[segment] == 0 or self._segments[segment] + record_size <= self.segment_bytes:
+                return segment
+            segment += 1
+        else:
+            segment = 0
+        self._segments[segment] = 0
+        self._segment_ids[segment] = []
+        return segment
+
+    def _load_index(self):
+        """启动时扫描段文件重建索引，截断末尾不完整的记录"""
+        for path in sorted(self.log_dir.glob('*.log')):
+            try:
+                segment = int(path.stem)
+            except ValueError:
+                continue
+            ids: List[str] = []
+            with open(path, 'rb') as f:
+                data = f.read()
+            offset = 0
+            while offset + RECORD_HEADER.size <= len(data):
+                key_length, length = RECORD_HEADER.unpack_from(data, offset)
+                start = offset + RECORD_HEADER.size + key_length
+                if start + length > len(data):
+                    break
+                result_id = data[offset + RECORD_HEADER.size:start].decode('utf-8')
+                self._index[result_id] = (segment, start, length)
+                ids.append(result_id)
+                offset = start + length
+            if offset < len(data):
+                with open(path, 'r+b') as f:
+                    f.truncate(offset)
+            self._segments[segment] = offset
+            self._segment_ids[segment] = ids
+            self._total_bytes += offset
+        self._evict()
+
+    def _remove_segment(self, segment: int):
+        self._total_bytes -= self._segments.pop(segment, 0)
+        for result_id in self._segment_ids.pop(segment, []):
+            if self._index.get(result_id, (None,))[0] == segment:
+                del self._index[result_id]
+        self._segment_path(segment).unlink(missing_ok=True)
+
+    def _evict(self):
+        """删除最早的段文件，直到总大小不超过上限（始终保留正在写入的段）"""
+        while self._total_bytes > self.max_bytes and len(self._segments) > 1:
+            self._remove_segment(next(iter(self._segments)))
+            self.segments_removed += 1
+
+
+# 全局原始响应日志实例（仅在保留策略为 spill 时启用）
+raw_response_log = RawResponseLog(
+    log_dir=config.ocr_raw_response_log_dir,
+    max_bytes=config.ocr_raw_response_log_max_bytes,
+    segment_bytes=config.ocr_raw_response_log_segment_bytes
+) if config.ocr_raw_response_retention == RETENTION_SPILL else None
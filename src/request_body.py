@@ -0,0 +1,171 @@
+"""
+流式请求体模块
+按块生成包含图片 Data URL 的 JSON 请求体，避免在内存中保存整张图片的 Base64 字符串
+"""
+
+import json
+import base64
+import asyncio
+from time import perf_counter
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+
+# 每次编码的原始字节数（3 的倍数，保证各块的 Base64 可以直接拼接）
+CHUNK_SIZE = 3 * 64 * 1024
+
+# 请求体模板中表示图片 Data URL 的占位符
+IMAGE_PLACEHOLDER = '__ocr_image_data_url__'
+
+
+class StreamingJSONBody:
+    """
+    流式 JSON 请求体
+
+    请求体模板中的占位符字符串会被替换为图片的 Data URL，图片内容在发送时
+    按块读取并编码，峰值内存与图片大小无关。请求体长度可以预先计算，
+    因此发送时使用 Content-Length 而不是分块传输编码。
+
+    同时支持三种读取方式：
+    - read(size): 文件对象接口（requests / http.client）
+    - 同步迭代: 逐块产出 bytes
+    - aiter_bytes(): 异步逐块产出 bytes，文件读取在线程池中执行（httpx.AsyncClient）
+    """
+
+    def __init__(
+        self,
+        payload: Dict[str, Any],
+        mime_type: str,
+        data: Optional[bytes] = None,
+        path: Optional[str] = None,
+        placeholder: str = IMAGE_PLACEHOLDER,
+        chunk_size: int = CHUNK_SIZE
+    ):
+        """
+        初始化请求体
+
+        Args:
+            payload: 请求体模板，其中某个字符串值等于 placeholder
+            mime_type: 图片的 MIME 类型
+            data: 内存中的图片内容（与 path 二选一）
+            path: 图片文件路径（与 data 二选一）
+            placeholder: 占位符字符串
+            chunk_size: 每次编码的原始字节数，会向下取整为 3 的倍数
+
+        Raises:
+            ValueError: 未提供图片内容，或模板中不包含占位符
+        """
+        if (data is None) == (path is None):
+            raise ValueError("必须且只能提供 data 或 path 之一")
+
+        template = json.dumps(payload)
+        marker = json.dumps(placeholder)[1:-1]
+        index = template.find(marker)
+        if index < 0:
+            raise ValueError("请求体模板中缺少图片占位符")
+
+        self._prefix = (template[:index] + f"data:{mime_type};base64,").encode('ascii')
+        self._suffix = template[index + len(marker):].encode('ascii')
+        self._data = data
+        self._path = path
+        self._chunk_size = max(3, chunk_size - chunk_size % 3)
+
+        if data is not None:
+            raw_size = len(data)
+        else:
+            with open(path, 'rb') as f:
+                raw_size = f.seek(0, 2)
+        self._length = len(self._prefix) + 4 * ((raw_size + 2) // 3) + len(self._suffix)
+
+        # 累计的 Base64 编码耗时（编码与发送交替进行，无法单独计时）
+        self.encode_seconds = 0.0
+
+        # read() 接口使用的状态
+        self._reader: Optional[Iterator[bytes]] = None
+        self._current = memoryview(b'')
+
+    def __len__(self) -> int:
+        """请求体的总字节数"""
+        return self._length
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """发送该请求体需要的请求头"""
+        return {
+            'Content-Type': 'application/json',
+            'Content-Length': str(self._length),
+        }
+
+    def __iter__(self) -> Iterator[bytes]:
+        """逐块产出请求体"""
+        yield self._prefix
+        if self._data is not None:
+            view = memoryview(self._data)
+            for start in range(0, len(view), self._chunk_size):
+                yield self._encode(view[start:start + self._chunk_size])
+        else:
+            with open(self._path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self._chunk_size), b''):
+                    yield self._encode(chunk)
+        yield self._suffix
+
+    async def aiter_bytes(self) -> AsyncIterator[bytes]:
+        """
+        逐块异步产出请求体，文件读取和编码放到线程池中执行
+
+        httpx 会优先把同时可同步迭代的对象当作同步请求体，
+        因此异步客户端需要传入该方法返回的异步迭代器。
+        """
+        if self._data is not None:
+            for chunk in self:
+                yield chunk
+            return
+
+        yield self._prefix
+        f = await asyncio.to_thread(open, self._path, 'rb')
+        try:
+            while True:
+                chunk = await asyncio.to_thread(self._read_encoded, f)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+        yield self._suffix
+
+    def _read_encoded(self, f) -> bytes:
+        """读取并编码下一块文件内容"""
+        return self._encode(f.read(self._chunk_size))
+
+    def _encode(self, chunk) -> bytes:
+        """编码一块图片内容并累计耗时"""
+        start = perf_counter()
+        encoded = base64.b64encode(chunk)
+        self.encode_seconds += perf_counter() - start
+        return encoded
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        文件对象接口：读取最多 size 字节
+
+        Args:
+            size: 读取的最大字节数，负数表示读取剩余全部内容
+
+        Returns:
+            bytes: 读取的内容，读完时返回空字节串
+        """
+        if self._reader is None:
+            self._reader = iter(self)
+        if size is None or size < 0:
+            rest = bytes(self._current) + b''.join(self._reader)
+            self._current = memoryview(b'')
+            return rest
+
+        while not self._current:
+            chunk = next(self._reader, None)
+            if chunk is None:
+                return b''
+            self._current = memoryview(chunk)
+
+        out = bytes(self._current[:size])
+        self._current = self._current[size:]
+        return out
@@ -25,16 +25,165 @@ export const uploadImage = async (file) => {
   return response.data;
 };
 
+/**
+ * 上传图片并流式接收识别结果（Server-Sent Events）
+ * @param {File} file - 图片文件
+ * @param {Object} handlers - 事件回调 { onStart, onBlock, onResult, onError }
+ * @returns {Promise} - 流结束时完成
+ */
+export const uploadImageStream = async (file, handlers = {}) => {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await fetch(`${API_BASE_URL}/api/upload/stream`, {
+    method: 'POST',
+    body: formData,
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.detail || `HTTP ${response.status}`);
+  }
+
+  const callbacks = {
+    start: handlers.onStart,
+    block: handlers.onBlock,
+    result: handlers.onResult,
+    error: handlers.onError,
+  };
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // 每条消息以空行结尾
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const message = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      const callback = callbacks[event];
+      if (callback && data) callback(JSON.parse(data));
+    }
+  }
+};
+
 /**
  * 导出题目
+ * @param {string} documentId - 上传时返回的文档 ID
  * @param {Array<number>} questionIds - 题目 ID 列表
  * @param {string} exportFormat - 导出格式 ('text' | 'image' | 'both')
  * @returns {Promise} - 返回导出结果
  */
-export const exportQuestions = async (questionIds, exportFormat = 'both') => {
+export const exportQuestions = async (documentId, questionIds, exportFormat = 'both') => {
   const response = await api.post('/api/export', {
+    document_id: documentId,
+    question_ids: questionIds,
+    export_format: exportFormat,
+  });
+
+  return response.data;
+};
+
+/**
+ * 将题目打包为 ZIP 下载
+ * @param {string} documentId - 上传时返回的文档 ID
+ * @param {Array<number>} questionIds - 题目 ID 列表
+ * @param {string} exportFormat - 导出格式 ('text' | 'image' | 'both')
+ * @returns {Promise<Blob>} - 返回 ZIP 文件内容
+ */
+export const exportQuestionsZip = async (documentId, questionIds, exportFormat = 'both') => {
+  const response = await api.post('/api/export/zip', {
+    document_id: documentId,
     question_ids: questionIds,
     export_format: exportFormat,
+  }, {
+    responseType: 'blob',
+  });
+
+  return response.data;
+};
+
+/**
+ * 点选：查询原图坐标处的题目
+ * @param {string} documentId - 上传时返回的文档 ID
+ * @param {number} x - 原图 x 坐标
+ * @param {number} y - 原图 y 坐标
+ * @returns {Promise} - 返回命中的题目 ID 和文本块
+ */
+export const hitTest = async (documentId, x, y) => {
+  const response = await api.get(`/api/documents/${documentId}/hit`, {
+    params: { x, y },
+  });
+
+  return response.data;
+};
+
+/**
+ * 框选：查询与矩形区域相交的题目
+ * @param {string} documentId - 上传时返回的文档 ID
+ * @param {Object} box - 原图坐标中的区域 {x1, y1, x2, y2}
+ * @param {boolean} contained - 是否只选择完全位于区域内的文本块
+ * @returns {Promise} - 返回命中的题目 ID 和文本块
+ */
+export const queryRegion = async (documentId, box, contained = false) => {
+  const response = await api.get(`/api/documents/${documentId}/region`, {
+    params: { ...box, contained },
+  });
+
+  return response.data;
+};
+
+/**
+ * 合并题目
+ * @param {string} documentId - 上传时返回的文档 ID
+ * @param {Array<number>} questionIds - 要合并的题目 ID 列表
+ * @returns {Promise} - 返回变化的题目 {updated, removed, order}
+ */
+export const mergeQuestions = async (documentId, questionIds) => {
+  const response = await api.post(`/api/documents/${documentId}/merge`, {
+    question_ids: questionIds,
+  });
+
+  return response.data;
+};
+
+/**
+ * 从指定文本块处拆分题目
+ * @param {string} documentId - 上传时返回的文档 ID
+ * @param {number} questionId - 要拆分的题目 ID
+ * @param {number} block - 文本块编号（新题目的第一个文本块）
+ * @returns {Promise} - 返回变化的题目 {updated, removed, order}
+ */
+export const splitQuestion = async (documentId, questionId, block) => {
+  const response = await api.post(`/api/documents/${documentId}/split`, {
+    question_id: questionId,
+    block,
+  });
+
+  return response.data;
+};
+
+/**
+ * 将文本块移到另一道题目
+ * @param {string} documentId - 上传时返回的文档 ID
+ * @param {number} block - 文本块编号
+ * @param {number} questionId - 目标题目 ID
+ * @returns {Promise} - 返回变化的题目 {updated, removed, order}
+ */
+export const moveBlock = async (documentId, block, questionId) => {
+  const response = await api.post(`/api/documents/${documentId}/move`, {
+    block,
+    question_id: questionId,
   });
 
   return response.data;
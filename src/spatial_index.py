@@ -0,0 +1,267 @@
+"""
+空间索引模块
+对文档的文本块和题目边界框建立均匀网格索引，支持点选和框选查询
+"""
+
+import math
+from typing import List, Tuple, Dict, Optional, Sequence, Iterable
+
+from .models import Question, TextBlock
+
+
+# 平均每个网格中的矩形数量（决定网格大小）
+RECTS_PER_CELL = 4
+
+
+class GridIndex:
+    """
+    矩形的均匀网格索引
+
+    每个矩形登记到与其相交的所有网格中；点查询只检查一个网格，框查询只检查与查询区域相交的网格。
+    建立后可以逐个添加和删除矩形（网格大小不变），删除的编号不再复用。
+    """
+
+    def __init__(
+        self,
+        x1: Sequence[float],
+        y1: Sequence[float],
+        x2: Sequence[float],
+        y2: Sequence[float],
+        cell_size: Optional[float] = None
+    ):
+        """
+        建立索引
+
+        Args:
+            x1, y1, x2, y2: 各矩形的坐标（下标即查询结果中的编号）
+            cell_size: 网格边长，为 None 时按矩形数量和分布范围自动选择
+        """
+        self.x1, self.y1, self.x2, self.y2 = list(x1), list(y1), list(x2), list(y2)
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+        self._removed = 0
+
+        count = len(self.x1)
+        if count == 0:
+            self.cell_size = 1.0 if cell_size is None else cell_size
+            return
+        if cell_size is None:
+            area = (max(self.x2) - min(self.x1)) * (max(self.y2) - min(self.y1))
+            cell_size = math.sqrt(area * RECTS_PER_CELL / count) if area > 0 else 1.0
+        self.cell_size = max(cell_size, 1e-6)
+
+        cells = self._cells
+        size = self.cell_size
+        for i, (x1, y1, x2, y2) in enumerate(zip(self.x1, self.y1, self.x2, self.y2)):
+            rows = range(math.floor(y1 / size), math.floor(y2 / size) + 1)
+            for cx in range(math.floor(x1 / size), math.floor(x2 / size) + 1):
+                for cy in rows:
+                    bucket = cells.get((cx, cy))
+                    if bucket is None:
+                        cells[(cx, cy)] = [i]
+                    else:
+                        bucket.append(i)
+
+    def __len__(self) -> int:
+        return len(self.x1) - self._removed
+
+    def add(self, x1: float, y1: float, x2: float, y2: float) -> int:
+        """
+        添加一个矩形
+
+        Returns:
+            int: 矩形编号
+        """
+        if not self._cells:
+            # 索引中还没有矩形时按该矩形的大小选择网格边长
+            self.cell_size = max(x2 - x1, y2 - y1, 1.0)
+        i = len(self.x1)
+        self.x1.append(x1)
+        self.y1.append(y1)
+        self.x2.append(x2)
+        self.y2.append(y2)
+        for key in self._cell_range(x1, y1, x2, y2):
+            self._cells.setdefault(key, []).append(i)
+        return i
+
+    def remove(self, i: int):
+        """删除编号为 i 的矩形（坐标置为 NaN，之后的查询不再返回该编号）"""
+        for key in self._cell_range(self.x1[i], self.y1[i], self.x2[i], self.y2[i]):
+            bucket = self._cells[key]
+            bucket.remove(i)
+            if not bucket:
+                del self._cells[key]
+        self.x1[i] = self.y1[i] = self.x2[i] = self.y2[i] = math.nan
+        self._removed += 1
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    def _cell_range(self, x1: float, y1: float, x2: float, y2: float):
+        """与矩形相交的所有网格"""
+        for cx in range(self._cell(x1), self._cell(x2) + 1):
+            for cy in range(self._cell(y1), self._cell(y2) + 1):
+                yield cx, cy
+
+    def query_point(self, x: float, y: float) -> List[int]:
+        """
+        查询包含该点的矩形
+
+        Returns:
+            List[int]: 矩形编号（升序）
+        """
+        candidates = self._cells.get((self._cell(x), self._cell(y)), ())
+        return [
+            i for i in candidates
+            if self.x1[i] <= x <= self.x2[i] and self.y1[i] <= y <= self.y2[i]
+        ]
+
+    def query_rect(self, x1: float, y1: float, x2: float, y2: float, contained: bool = False) -> List[int]:
+        """
+        查询与区域相交（或完全位于区域内）的矩形
+
+        Args:
+            x1, y1, x2, y2: 查询区域
+            contained: 为 True 时只返回完全位于区域内的矩形
+
+        Returns:
+            List[int]: 矩形编号（升序）
+        """
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if y1 > y2:
+            y1, y2 = y2, y1
+
+        # 查询区域比索引范围大得多时，直接遍历所有矩形比逐个网格查找更快
+        cells = (self._cell(x2) - self._cell(x1) + 1) * (self._cell(y2) - self._cell(y1) + 1)
+        if cells >= len(self._cells):
+            candidates = range(len(self.x1))
+        else:
+            found = set()
+            for key in self._cell_range(x1, y1, x2, y2):
+                found.update(self._cells.get(key, ()))
+            candidates = sorted(found)
+
+        if contained:
+            return [
+                i for i in candidates
+                if x1 <= self.x1[i] and self.x2[i] <= x2 and y1 <= self.y1[i] and self.y2[i] <= y2
+            ]
+        return [
+            i for i in candidates
+            if self.x1[i] <= x2 and x1 <= self.x2[i] and self.y1[i] <= y2 and y1 <= self.y2[i]
+        ]
+
+
+class DocumentIndex:
+    """
+    文档中文本块和题目边界框的空间索引（坐标基于原图尺寸）
+
+    文本块编号在建立索引时确定，编辑题目（合并、拆分、移动文本块）时不变，
+    只需更新文本块所属的题目，并在题目边界框索引中替换变化的题目。
+    """
+
+    def __init__(self, questions: List[Question]):
+        """
+        建立索引
+
+        Args:
+            questions: 文档的题目列表
+        """
+        self.blocks: List[TextBlock] = []
+        self.block_questions: List[int] = []  # 每个文本块所属的题目 ID
+        for question in questions:
+            self.blocks.extend(question.text_blocks)
+            self.block_questions.extend([question.question_id] * len(question.text_blocks))
+        self._block_ids: Dict[int, int] = {id(block): i for i, block in enumerate(self.blocks)}
+        self.block_index = GridIndex(
+            [b.box.x1 for b in self.blocks], [b.box.y1 for b in self.blocks],
+            [b.box.x2 for b in self.blocks], [b.box.y2 for b in self.blocks]
+        )
+        boxed = [q for q in questions if q.bounding_box is not None]
+        self.question_ids: List[Optional[int]] = [q.question_id for q in boxed]  # 矩形编号 -> 题目 ID（已删除为 None）
+        self._question_slots: Dict[int, int] = {q.question_id: i for i, q in enumerate(boxed)}
+        boxes = [q.bounding_box for q in boxed]
+        self.question_index = GridIndex(
+            [b.x1 for b in boxes], [b.y1 for b in boxes],
+            [b.x2 for b in boxes], [b.y2 for b in boxes]
+        )
+
+    def block_ids(self, question: Question) -> List[int]:
+        """
+        题目中各文本块的编号
+
+        Raises:
+            KeyError: 文本块不在索引中
+        """
+        return [self._block_ids[id(block)] for block in question.text_blocks]
+
+    def assign(self, blocks: Iterable[int], question_id: int):
+        """
+        修改文本块所属的题目
+
+        Args:
+            blocks: 文本块编号
+            question_id: 新的题目 ID
+        """
+        for i in blocks:
+            self.block_questions[i] = question_id
+
+    def replace_questions(self, removed: Iterable[int], updated: Iterable[Question]):
+        """
+        在题目边界框索引中只替换变化的题目（其余题目的登记不变）
+
+        Args:
+            removed: 被删除的题目 ID
+            updated: 新增或内容变化的题目
+        """
+        updated = list(updated)
+        for question_id in [*removed, *(q.question_id for q in updated)]:
+            slot = self._question_slots.pop(question_id, None)
+            if slot is not None:
+                self.question_index.remove(slot)
+                self.question_ids[slot] = None
+        for question in updated:
+            box = question.bounding_box
+            if box is None:
+                continue
+            slot = self.question_index.add(box.x1, box.y1, box.x2, box.y2)
+            self.question_ids.append(question.question_id)
+            self._question_slots[question.question_id] = slot
+
+    def hit_test(self, x: float, y: float) -> Tuple[List[int], List[int]]:
+        """
+        点选：查询该点所在的题目和文本块
+
+        Args:
+            x, y: 原图坐标
+
+        Returns:
+            Tuple[List[int], List[int]]: (题目 ID 列表，边界框面积小的在前；文本块编号列表)
+        """
+        index = self.question_index
+        hits = index.query_point(x, y)
+        hits.sort(key=lambda i: (index.x2[i] - index.x1[i]) * (index.y2[i] - index.y1[i]))
+        return [self.question_ids[i] for i in hits], self.block_index.query_point(x, y)
+
+    def query_region(
+        self,
+        x1: float,
+        y1: float,
+        x2: float,
+        y2: float,
+        contained: bool = False
+    ) -> Tuple[List[int], List[int]]:
+        """
+        框选：查询与区域相交（或完全位于区域内）的文本块及其所属题目
+
+        Args:
+            x1, y1, x2, y2: 原图坐标中的查询区域
+            contained: 为 True 时只选择完全位于区域内的文本块
+
+        Returns:
+            Tuple[List[int], List[int]]: (题目 ID 列表，按文档中的顺序；文本块编号列表)
+        """
+        blocks = self.block_index.query_rect(x1, y1, x2, y2, contained)
+        question_ids = list(dict.fromkeys(self.block_questions[i] for i in blocks))
+        return question_ids, blocks
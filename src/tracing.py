@@ -0,0 +1,215 @@
+"""
+请求追踪模块
+为每个请求记录各处理阶段的耗时（含 OCR API 的首字节时间和 token 用量），
+用于生成 Server-Timing 响应头、OCRResponse 的调试信息和 JSONL 追踪日志
+"""
+
+import re
+import json
+import time
+import uuid
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from time import perf_counter
+from typing import Optional, Dict, Any, List
+
+from .config import config
+
+
+# 请求中携带的追踪 ID（由上游网关或客户端生成）的格式
+TRACE_ID_PATTERN = re.compile(r'^[0-9A-Za-z_-]{8,64}$')
+
+
+@dataclass
+class Span:
+    """一个处理阶段"""
+    name: str  # 阶段名
+    start_ms: float  # 相对请求开始的时间（毫秒）
+    duration_ms: float  # 耗时（毫秒）
+    error: Optional[str] = None  # 阶段抛出的异常类型
+
+
+class Trace:
+    """一个请求的追踪记录（同一请求在线程池和并发任务中记录的阶段都写入同一对象）"""
+
+    def __init__(self, trace_id: Optional[str] = None, method: str = '', path: str = '', debug: bool = False):
+        """
+        初始化追踪记录
+
+        Args:
+            trace_id: 追踪 ID，为 None 或格式不合法时生成新的 ID
+            method: 请求方法
+            path: 请求路径
+            debug: 是否在响应中返回调试信息
+        """
+        self.trace_id = trace_id if trace_id and TRACE_ID_PATTERN.match(trace_id) else uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.debug = debug
+        self.started_at = time.time()
+        self.status: Optional[int] = None
+        self.spans: List[Span] = []
+        self.usage: Dict[str, int] = {}  # OCR API 的 token 用量（多次调用累加）
+
+        self._start = perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed_ms(self) -> float:
+        """从请求开始到现在的毫秒数"""
+        return (perf_counter() - self._start) * 1000
+
+    def add_span(self, name: str, start: float, seconds: float, error: Optional[str] = None):
+        """
+        记录一个阶段
+
+        Args:
+            name: 阶段名
+            start: 阶段开始时的 perf_counter() 值
+            seconds: 耗时（秒）
+            error: 阶段抛出的异常类型
+        """
+        span = Span(name, round((start - self._start) * 1000, 3), round(seconds * 1000, 3), error)
+        with self._lock:
+            self.spans.append(span)
+
+    def add_usage(self, usage: Optional[Dict[str, Any]]):
+        """累加 OCR API 返回的 token 用量"""
+        if not usage:
+            return
+        with self._lock:
+            for key, value in usage.items():
+                if isinstance(value, (int, float)):
+                    self.usage[key] = self.usage.get(key, 0) + value
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        按阶段名汇总耗时
+
+        Returns:
+            Dict[str, Dict[str, float]]: 阶段名 -> {'count': 次数, 'duration_ms': 总耗时}，按首次出现的顺序排列
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            total = totals.setdefault(span.name, {'count': 0, 'duration_ms': 0.0})
+            total['count'] += 1
+            total['duration_ms'] += span.duration_ms
+        return totals
+
+    def server_timing(self) -> str:
+        """
+        生成 Server-Timing 响应头
+
+        同名阶段合并为一项（并发处理多张图片或多个条带时总耗时可能超过请求耗时），
+        最后附加 token 用量和请求总耗时。
+        """
+        entries = [
+            f'{name};dur={total["duration_ms"]:.1f}' + (f';desc="x{total["count"]}"' if total['count'] > 1 else '')
+            for name, total in self.summary().items()
+        ]
+        if self.usage:
+            desc = ' '.join(f'{key}={value}' for key, value in sorted(self.usage.items()))
+            entries.append(f'ocr_usage;desc="{desc}"')
+        entries.append(f'total;dur={self.elapsed_ms:.1f}')
+        return ', '.join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（调试信息和追踪日志的格式）"""
+        with self._lock:
+            spans = [asdict(span) for span in self.spans]
+            usage = dict(self.usage)
+        return {
+            'trace_id': self.trace_id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'started_at': self.started_at,
+            'duration_ms': round(self.elapsed_ms, 3),
+            'spans': spans,
+            'usage': usage or None,
+        }
+
+
+# 当前请求的追踪记录（asyncio 任务和线程池调用会继承调用方的上下文）
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """当前请求的追踪记录，不在请求中时返回 None"""
+    return _current_trace.get()
+
+
+def start_trace(trace: Trace):
+    """
+    将追踪记录设为当前上下文的记录
+
+    Returns:
+        用于 end_trace 的令牌
+    """
+    return _current_trace.set(trace)
+
+
+def end_trace(token):
+    """恢复进入请求前的上下文"""
+    _current_trace.reset(token)
+
+
+def record_span(name: str, seconds: float, error: Optional[str] = None, start: Optional[float] = None):
+    """
+    向当前请求的追踪记录中添加一个阶段（不在请求中时忽略）
+
+    Args:
+        name: 阶段名
+        seconds: 耗时（秒）
+        error: 阶段抛出的异常类型
+        start: 阶段开始时的 perf_counter() 值，为 None 时视为刚刚结束
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, perf_counter() - seconds if start is None else start, seconds, error)
+
+
+def record_usage(usage: Optional[Dict[str, Any]]):
+    """累加当前请求的 OCR API token 用量（不在请求中时忽略）"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_usage(usage)
+
+
+class TraceLog:
+    """追加式 JSONL 追踪日志（每个请求一行，可直接导入分析工具）"""
+
+    def __init__(self, path: Path):
+        """
+        初始化追踪日志
+
+        Args:
+            path: 日志文件路径
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def write(self, trace: Trace):
+        """写入一条追踪记录"""
+        line = json.dumps(trace.to_dict(), ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.written += 1
+
+    def read(self) -> List[Dict[str, Any]]:
+        """读取所有追踪记录（用于回放和测试）"""
+        if not self.path.exists():
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+# 全局追踪日志实例（仅在配置了 TRACE_LOG_PATH 时启用）
+trace_log = TraceLog(config.trace_log_path) if config.trace_log_path else None
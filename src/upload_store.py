@@ -0,0 +1,598 @@
+"""
+上传文件存储模块
+单次读取上传内容完成校验、哈希和写入，按内容哈希保存图片和 PDF（相同内容只保存一份），
+为每张图片生成多个尺寸的预览图，并按超时和总大小上限清理最久未使用的文件
+（仍被识别结果或后台任务引用的文件不会被清理）
+"""
+
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Any, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .config import config
+from .image_processor import image_processor
+from .utils import sniff_image_format, sniff_pdf_format, verify_image_bytes, get_image_mime_type
+
+
+# 写入文件时每次读取的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 判断图片格式需要的文件头字节数
+MAGIC_HEADER_SIZE = 8
+
+# 合法的存储文件名：内容哈希 + 扩展名（防止通过文件名访问存储目录之外的文件）
+_STORED_NAME = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+
+
+class UploadRejected(ValueError):
+    """上传的文件不符合要求（格式不支持、超出大小上限或图片损坏）"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class IngestedUpload:
+    """已写入存储的上传文件"""
+    path: Path  # 存储后的文件路径
+    content_hash: str  # 内容的 SHA-256 哈希
+    size: int  # 文件大小
+    mime_type: str  # 根据文件头判断的 MIME 类型
+    bytes_read: int  # 读取上传内容的总字节数（正常情况下等于 size）
+    data: Optional[bytes] = None  # 文件内容（保留在内存中供后续编码，无需再次读取磁盘）
+
+
+class UploadStore:
+    """内容寻址的上传文件存储（LRU 索引 + 后台清理）"""
+
+    def __init__(
+        self,
+        upload_dir: Path,
+        ttl: float = 86400,
+        max_bytes: int = 1024 * 1024 * 1024,
+        sweep_interval: float = 300,
+        preview_widths: Sequence[int] = (512, 1024, 2048),
+        preview_quality: int = 80
+    ):
+        """
+        初始化上传文件存储
+
+        Args:
+            upload_dir: 存储目录
+            ttl: 文件在未被访问时的保留时间（秒）
+            max_bytes: 存储目录的最大字节数（包含预览图），超出后删除最久未使用的文件
+            sweep_interval: 后台清理的间隔（秒）
+            preview_widths: 预览图的宽度列表
+            preview_quality: 预览图的 JPEG 质量
+        """
+        self.upload_dir = upload_dir
+        self.preview_dir = upload_dir / 'previews'
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.preview_widths = tuple(sorted(set(preview_widths)))
+        self.preview_quality = preview_quality
+
+        self._lock = threading.Lock()
+        # 索引：文件名 -> (文件大小, 最近访问时间)，按最近访问顺序排列
+        self._index: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._total_bytes = 0
+        # 已生成预览图的文件名（其大小已计入索引中的文件大小）
+        self._previewed: set[str] = set()
+        # 返回仍被引用的文件名的回调（如文档存储、后台任务队列），清理时跳过这些文件
+        self._pin_sources: List[Callable[[], Iterable[str]]] = []
+        # 正在处理中的文件（如逐页识别中的 PDF）：文件名 -> 固定次数
+        self._pins: Dict[str, int] = {}
+        self._pins_lock = threading.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.deduplicated = 0
+        self.evicted = 0
+        self.expired = 0
+
+        # 上传读取统计
+        self.uploads = 0
+        self.rejected = 0
+        self.bytes_read = 0
+
+        self.preview_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def ingest(self, source: BinaryIO, max_bytes: Optional[int] = None) -> IngestedUpload:
+        """
+        单次分块读取上传内容：判断格式、限制大小、计算哈希并写入存储
+
+        文件头不是支持的图片格式或超出大小上限时立即停止读取；
+        读取完成后直接用内存中的内容验证图片完整性，不再重新打开文件。
+
+        Args:
+            source: 上传文件的文件对象
+            max_bytes: 单个文件的最大字节数，为 None 时不限制
+
+        Returns:
+            IngestedUpload: 存储后的文件信息（保留文件内容）
+
+        Raises:
+            UploadRejected: 格式不支持、超出大小上限或图片损坏
+        """
+        tmp_path = self.upload_dir / f".{uuid.uuid4().hex}.tmp"
+        try:
+            suffix, content_hash, buffer, bytes_read = self._receive(
+                source, tmp_path, max_bytes, sniff_image_format,
+                "不支持的文件格式，仅支持 JPG、PNG、BMP 图片", keep_data=True
+            )
+            is_valid, error_msg = verify_image_bytes(buffer)
+            if not is_valid:
+                raise UploadRejected(error_msg)
+
+            path = self._commit(tmp_path, f"{content_hash}{suffix}")
+            with self._lock:
+                self.uploads += 1
+            return IngestedUpload(
+                path=path,
+                content_hash=content_hash,
+                size=len(buffer),
+                mime_type=get_image_mime_type(path.name),
+                bytes_read=bytes_read,
+                data=buffer
+            )
+        except UploadRejected:
+            with self._lock:
+                self.rejected += 1
+            raise
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def ingest_pdf(self, source: BinaryIO, max_bytes: Optional[int] = None) -> IngestedUpload:
+        """
+        单次分块读取上传的 PDF：判断格式、限制大小、计算哈希并写入存储
+
+        PDF 可能很大，内容直接写入磁盘而不保留在内存中，之后按页从文件光栅化。
+
+        Args:
+            source: 上传文件的文件对象
+            max_bytes: 单个文件的最大字节数，为 None 时不限制
+
+        Returns:
+            IngestedUpload: 存储后的文件信息（data 为 None）
+
+        Raises:
+            UploadRejected: 不是 PDF 文件或超出大小上限
+        """
+        tmp_path = self.upload_dir / f".{uuid.uuid4().hex}.tmp"
+        try:
+            suffix, content_hash, _, bytes_read = self._receive(
+                source, tmp_path, max_bytes, sniff_pdf_format, "不支持的文件格式，仅支持 PDF 文件"
+            )
+            path = self._commit(tmp_path, f"{content_hash}{suffix}")
+            with self._lock:
+                self.uploads += 1
+            return IngestedUpload(
+                path=path,
+                content_hash=content_hash,
+                size=bytes_read,
+                mime_type='application/pdf',
+                bytes_read=bytes_read
+            )
+        except UploadRejected:
+            with self._lock:
+                self.rejected += 1
+            raise
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def store(self, data: bytes, name: str) -> Path:
+        """
+        保存服务端生成的文件（如 PDF 光栅化后的页面图片）
+
+        Args:
+            data: 文件内容
+            name: 文件名（64 位十六进制键 + 扩展名）
+
+        Returns:
+            Path: 存储后的文件路径
+        """
+        if not _STORED_NAME.match(name):
+            raise ValueError(f"无效的存储文件名: {name}")
+        tmp_path = self.upload_dir / f".{uuid.uuid4().hex}.tmp"
+        try:
+            tmp_path.write_bytes(data)
+            return self._commit(tmp_path, name)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _receive(
+        self,
+        source: BinaryIO,
+        tmp_path: Path,
+        max_bytes: Optional[int],
+        sniff: Callable[[bytes], Optional[str]],
+        unsupported_message: str,
+        keep_data: bool = False
+    ) -> Tuple[str, str, bytearray, int]:
+        """
+        分块读取上传内容并写入临时文件，读到文件头后立即判断格式
+
+        Args:
+            source: 上传文件的文件对象
+            tmp_path: 临时文件路径
+            max_bytes: 单个文件的最大字节数，为 None 时不限制
+            sniff: 根据文件头返回扩展名的函数，不支持的格式返回 None
+            unsupported_message: 格式不支持时的错误信息
+            keep_data: 是否在内存中保留文件内容
+
+        Returns:
+            Tuple[str, str, bytearray, int]: (扩展名, 内容哈希, 文件内容, 读取的字节数)，
+                不保留内容时文件内容只包含文件头
+
+        Raises:
+            UploadRejected: 格式不支持或超出大小上限
+        """
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        bytes_read = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    # 有大小上限时最多多读 1 个字节，用于判断是否超限
+                    size = COPY_CHUNK_SIZE
+                    if max_bytes is not None:
+                        size = min(size, max_bytes + 1 - bytes_read)
+                    chunk = source.read(size)
+                    if not chunk:
+                        break
+                    bytes_read += len(chunk)
+
+                    if max_bytes is not None and bytes_read > max_bytes:
+                        raise UploadRejected(
+                            f"文件过大，单个文件不能超过 {max_bytes // (1024 * 1024)}MB", status_code=413
+                        )
+                    # 读到完整的文件头时立即判断格式，不支持的格式不再继续读取
+                    if len(buffer) < MAGIC_HEADER_SIZE <= len(buffer) + len(chunk):
+                        header = bytes(buffer) + chunk[:MAGIC_HEADER_SIZE]
+                        if sniff(header) is None:
+                            raise UploadRejected(unsupported_message)
+
+                    digest.update(chunk)
+                    if keep_data:
+                        buffer += chunk
+                    elif len(buffer) < MAGIC_HEADER_SIZE:
+                        buffer += chunk[:MAGIC_HEADER_SIZE - len(buffer)]
+                    f.write(chunk)
+        finally:
+            with self._lock:
+                self.bytes_read += bytes_read
+
+        suffix = sniff(bytes(buffer[:MAGIC_HEADER_SIZE]))
+        if suffix is None:
+            raise UploadRejected(unsupported_message)
+        return suffix, digest.hexdigest(), buffer, bytes_read
+
+    def _commit(self, tmp_path: Path, name: str) -> Path:
+        """将写好的临时文件放入存储（相同内容已存在时只刷新访问时间）"""
+        path = self.upload_dir / name
+        with self._lock:
+            if name in self._index and path.exists():
+                self.deduplicated += 1
+                tmp_path.unlink()
+                self._touch(name, path)
+            else:
+                size = tmp_path.stat().st_size
+                tmp_path.replace(path)
+                self._total_bytes -= self._index.pop(name, (0, 0))[0]
+                self._index[name] = (size, time.time())
+                self._total_bytes += size
+        self._enforce_budget(keep=name)
+        return path
+
+    def resolve(self, name: str) -> Optional[Path]:
+        """
+        按文件名查找已存储的文件（同时刷新访问时间）
+
+        Args:
+            name: 文件名（内容哈希 + 扩展名）
+
+        Returns:
+            Optional[Path]: 文件路径，不存在或已被清理时返回 None
+        """
+        if not _STORED_NAME.match(name):
+            return None
+        path = self.upload_dir / name
+        with self._lock:
+            if name not in self._index:
+                return None
+            if not path.exists():
+                self._forget(name)
+                return None
+            self._touch(name, path)
+        return path
+
+    def preview_path(self, name: str, width: int) -> Path:
+        """预览图的存储路径"""
+        return self.preview_dir / f"{Path(name).stem}_{width}.jpg"
+
+    def get_preview(self, name: str, width: int) -> Optional[Path]:
+        """
+        获取指定宽度的预览图（尚未生成时立即生成）
+
+        Args:
+            name: 原图文件名
+            width: 预览图宽度，必须是 preview_widths 之一
+
+        Returns:
+            Optional[Path]: 预览图路径；原图不比该宽度大时返回原图路径；
+                原图不存在或已被清理时返回 None
+        """
+        path = self.resolve(name)
+        if path is None:
+            return None
+        preview = self.preview_path(name, width)
+        if name not in self._previewed:
+            self.ensure_previews(name)
+        return preview if preview.exists() else path
+
+    def ensure_previews(self, name: str, data: Optional[bytes] = None):
+        """
+        生成原图的所有预览图（已生成时直接返回）
+
+        Args:
+            name: 原图文件名
+            data: 已在内存中的原图内容（提供时不再读取文件）
+        """
+        with self._lock:
+            if name in self._previewed or name not in self._index:
+                return
+        previews = image_processor.build_previews(
+            str(self.upload_dir / name), list(self.preview_widths), self.preview_quality, data
+        )
+
+        written = 0
+        for width, content in previews.items():
+            preview = self.preview_path(name, width)
+            tmp_path = preview.with_name(f".{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(content)
+            tmp_path.replace(preview)
+            written += len(content)
+
+        with self._lock:
+            if name not in self._index:
+                # 生成期间原图已被清理
+                self._remove_previews(name)
+                return
+            if name in self._previewed:
+                # 并发生成了相同的预览图，大小已经计入
+                return
+            size, last_access = self._index[name]
+            self._index[name] = (size + written, last_access)
+            self._total_bytes += written
+            self._previewed.add(name)
+        self._enforce_budget(keep=name)
+
+    def add_pin_source(self, source: Callable[[], Iterable[str]]):
+        """
+        注册引用来源：超时清理和容量淘汰时跳过其返回的文件名
+
+        上传文件的生命周期由引用它的识别结果和排队中的任务决定，
+        即使长时间未被访问或超出容量上限，也不会在仍被引用时删除。
+
+        Args:
+            source: 返回当前仍被引用的文件名（或文件路径）的回调，会在清理线程中调用
+        """
+        self._pin_sources.append(source)
+
+    def pin(self, name: str):
+        """
+        在处理期间固定文件（可多次固定，需调用相同次数的 unpin）
+
+        用于没有识别结果或任务引用、但仍在使用中的文件，如逐页识别中的 PDF。
+
+        Args:
+            name: 文件名
+        """
+        with self._pins_lock:
+            self._pins[name] = self._pins.get(name, 0) + 1
+
+    def unpin(self, name: str):
+        """解除一次 pin 的固定"""
+        with self._pins_lock:
+            count = self._pins.get(name, 0) - 1
+            if count > 0:
+                self._pins[name] = count
+            else:
+                self._pins.pop(name, None)
+
+    def remove(self, name: str) -> bool:
+        """
+        删除文件
+
+        Args:
+            name: 文件名
+
+        Returns:
+            bool: 文件存在并已删除时返回 True
+        """
+        with self._lock:
+            if name not in self._index:
+                return False
+            self._remove(name)
+            return True
+
+    def sweep(self) -> int:
+        """
+        清理超时未访问的文件，并将总大小控制在上限之内（仍被引用的文件除外）
+
+        Returns:
+            int: 删除的文件数
+        """
+        removed = 0
+        pinned = self._pinned_names()
+        with self._lock:
+            deadline = time.time() - self.ttl
+            for name, (_, last_access) in list(self._index.items()):
+                if last_access >= deadline:
+                    break
+                if name in pinned:
+                    continue
+                self._remove(name)
+                self.expired += 1
+                removed += 1
+            removed += self._evict_over_budget(pinned)
+        return removed
+
+    async def start(self):
+        """启动后台清理任务"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        """停止后台清理任务"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取存储统计信息
+
+        Returns:
+            Dict[str, Any]: 文件数、占用字节数、清理次数及上传读取统计
+                （bytes_read 与所有上传文件大小之和一致，说明每个文件只读取了一次）
+        """
+        with self._lock:
+            return {
+                'uploads': self.uploads,
+                'rejected': self.rejected,
+                'bytes_read': self.bytes_read,
+                'files': len(self._index),
+                'previewed': len(self._previewed),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'deduplicated': self.deduplicated,
+                'evicted': self.evicted,
+                'expired': self.expired,
+            }
+
+    def _pinned_names(self) -> Set[str]:
+        """汇总各引用来源当前引用的文件名和处理中固定的文件名"""
+        with self._pins_lock:
+            pinned: Set[str] = set(self._pins)
+        for source in self._pin_sources:
+            pinned.update(Path(name).name for name in source())
+        return pinned
+
+    async def _sweep_loop(self):
+        """定期清理过期文件"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await asyncio.to_thread(self.sweep)
+            except OSError as e:
+                print(f"清理上传文件失败: {e}")
+
+    # ============ 索引维护（调用方需持有锁） ============
+
+    def _load_index(self):
+        """启动时扫描存储目录，按修改时间恢复 LRU 顺序"""
+        entries = []
+        for path in self.upload_dir.iterdir():
+            if not path.is_file():
+                continue
+            if path.name.startswith('.') and path.suffix == '.tmp':
+                # 上次运行中断时遗留的临时文件
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        for mtime, name, size in sorted(entries):
+            self._index[name] = (size, mtime)
+            self._total_bytes += size
+
+        # 预览图的大小计入对应原图，原图已不存在的预览图直接删除
+        names_by_stem = {Path(name).stem: name for name in self._index}
+        for path in self.preview_dir.iterdir():
+            stem, _, width = path.stem.rpartition('_')
+            name = names_by_stem.get(stem)
+            if name is None or path.suffix != '.jpg' or not width.isdigit():
+                path.unlink(missing_ok=True)
+                continue
+            size, mtime = self._index[name]
+            preview_size = path.stat().st_size
+            self._index[name] = (size + preview_size, mtime)
+            self._total_bytes += preview_size
+            self._previewed.add(name)
+
+    def _touch(self, name: str, path: Path):
+        """刷新访问时间（同时更新文件修改时间，重启后可恢复 LRU 顺序）"""
+        size, _ = self._index[name]
+        self._index[name] = (size, time.time())
+        self._index.move_to_end(name)
+        path.touch()
+
+    def _forget(self, name: str):
+        """从索引中移除文件"""
+        self._total_bytes -= self._index.pop(name, (0, 0))[0]
+
+    def _remove(self, name: str):
+        """删除文件及其预览图并移出索引"""
+        self._forget(name)
+        (self.upload_dir / name).unlink(missing_ok=True)
+        self._remove_previews(name)
+
+    def _remove_previews(self, name: str):
+        """删除文件的所有预览图"""
+        self._previewed.discard(name)
+        for width in self.preview_widths:
+            self.preview_path(name, width).unlink(missing_ok=True)
+
+    def _enforce_budget(self, keep: str):
+        """
+        写入新文件后按上限淘汰旧文件
+
+        被引用的文件集合要调用其他模块（它们有自己的锁），因此在持有本存储的锁之外收集。
+        """
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+        pinned = self._pinned_names()
+        with self._lock:
+            self._evict_over_budget(pinned, keep=keep)
+
+    def _evict_over_budget(self, pinned: Set[str], keep: Optional[str] = None) -> int:
+        """
+        删除最久未使用的文件，直到总大小不超过上限（调用方需持有锁）
+
+        keep 指定的最新文件和 pinned 中仍被引用的文件不删除，只剩这些文件时允许暂时超出上限。
+        """
+        if self._total_bytes <= self.max_bytes:
+            return 0
+        removed = 0
+        for name in list(self._index):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if name == keep or name in pinned:
+                continue
+            self._remove(name)
+            self.evicted += 1
+            removed += 1
+        return removed
+
+
+# 全局上传文件存储实例
+upload_store = UploadStore(
+    upload_dir=config.upload_dir,
+    ttl=config.upload_ttl,
+    max_bytes=config.upload_max_bytes,
+    sweep_interval=config.upload_sweep_interval,
+    preview_widths=config.preview_widths,
+    preview_quality=config.preview_quality
+)
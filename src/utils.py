@@ -3,13 +3,15 @@
 提供通用的辅助函数，如文件处理、Base64 编码等
 """
 
+import io
 import re
-import json
 import base64
 from pathlib import Path
 from typing import Optional, List, Tuple, Dict
 from PIL import Image
 
+from .ocr_parser import DeepSeekOCRParser
+
 
 # 支持的图片格式
 SUPPORTED_IMAGE_FORMATS = {'.jpg', '.jpeg', '.png', '.bmp'}
@@ -54,18 +56,86 @@ def get_image_data_url(image_path: str) -> str:
         str: Data URL 格式的字符串，如 "data:image/jpeg;base64,..."
     """
     base64_str = encode_image_to_base64(image_path)
+    mime_type = get_image_mime_type(image_path)
     
-    # 根据文件扩展名确定 MIME 类型
-    path = Path(image_path)
+    return f"data:{mime_type};base64,{base64_str}"
+
+
+def get_image_mime_type(image_path: str) -> str:
+    """
+    根据文件扩展名确定图片的 MIME 类型
+    
+    Args:
+        image_path: 图片文件路径
+        
+    Returns:
+        str: MIME 类型，如 "image/png"
+    """
     mime_type_map = {
         '.jpg': 'image/jpeg',
         '.jpeg': 'image/jpeg',
         '.png': 'image/png',
         '.bmp': 'image/bmp'
     }
-    mime_type = mime_type_map.get(path.suffix.lower(), 'image/jpeg')
+    return mime_type_map.get(Path(image_path).suffix.lower(), 'image/jpeg')
+
+
+# 各图片格式文件头的魔数 -> 扩展名
+IMAGE_MAGIC_NUMBERS = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'BM', '.bmp'),
+)
+
+# PDF 文件头的魔数
+PDF_MAGIC_NUMBER = b'%PDF-'
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """
+    根据文件头判断图片格式
     
-    return f"data:{mime_type};base64,{base64_str}"
+    Args:
+        header: 文件开头的若干字节（至少 8 字节）
+        
+    Returns:
+        Optional[str]: 扩展名（如 '.png'），不是支持的图片格式时返回 None
+    """
+    for magic, suffix in IMAGE_MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return suffix
+    return None
+
+
+def sniff_pdf_format(header: bytes) -> Optional[str]:
+    """
+    根据文件头判断是否为 PDF 文件
+    
+    Args:
+        header: 文件开头的若干字节（至少 5 字节）
+        
+    Returns:
+        Optional[str]: 是 PDF 时返回 '.pdf'，否则返回 None
+    """
+    return '.pdf' if header.startswith(PDF_MAGIC_NUMBER) else None
+
+
+def verify_image_bytes(data: bytes) -> tuple[bool, Optional[str]]:
+    """
+    验证内存中的图片数据是否完整
+    
+    Args:
+        data: 图片文件内容
+        
+    Returns:
+        tuple[bool, Optional[str]]: (是否有效, 错误信息)
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+        return True, None
+    except Exception as e:
+        return False, f"图片文件损坏或无法读取: {str(e)}"
 
 
 def validate_image_file(file_path: str) -> tuple[bool, Optional[str]]:
@@ -152,69 +222,17 @@ def parse_deepseek_ocr_response(content: str) -> List[Dict[str, any]]:
     <|ref|>text<|/ref|><|det|>[[x1, y1, x2, y2]]<|/det|>
     实际文本内容
 
+    完整内容一次性输入 DeepSeekOCRParser，流式场景请直接使用该解析器。
+
     Args:
         content: OCR API 返回的原始内容
 
     Returns:
         List[Dict]: 解析后的文本块列表，每个包含 'text' 和 'box' 字段
     """
-    blocks = []
-
-    # 按行分割内容
-    lines = content.split('\n')
-    current_box = None
-    current_text_lines = []
-
-    for line in lines:
-        # 检查是否包含坐标标记
-        det_match = re.search(r'<\|det\|>(\[\[.*?\]\])<\|/det\|>', line)
-
-        if det_match:
-            # 保存上一个文本块
-            if current_box is not None and current_text_lines:
-                text = '\n'.join(current_text_lines).strip()
-                if text:
-                    blocks.append({
-                        'text': text,
-                        'box': current_box
-                    })
-
-            # 解析新的坐标
-            try:
-                coords_str = det_match.group(1)
-                coords = json.loads(coords_str)  # [[x1, y1, x2, y2]]
-                if coords and len(coords) > 0 and len(coords[0]) == 4:
-                    current_box = coords[0]  # [x1, y1, x2, y2]
-                else:
-                    current_box = [0, 0, 0, 0]
-            except (json.JSONDecodeError, IndexError, ValueError):
-                current_box = [0, 0, 0, 0]
-
-            # 重置文本行
-            current_text_lines = []
-
-            # 提取当前行中标记后面的文本
-            text_after_tag = re.sub(r'<\|ref\|>.*?<\|/ref\|>', '', line)
-            text_after_tag = re.sub(r'<\|det\|>.*?<\|/det\|>', '', text_after_tag)
-            text_after_tag = text_after_tag.strip()
-            if text_after_tag:
-                current_text_lines.append(text_after_tag)
-        else:
-            # 普通文本行，添加到当前文本块
-            clean_line = re.sub(r'<\|ref\|>.*?<\|/ref\|>', '', line)
-            clean_line = clean_line.strip()
-            if clean_line:
-                current_text_lines.append(clean_line)
-
-    # 保存最后一个文本块
-    if current_box is not None and current_text_lines:
-        text = '\n'.join(current_text_lines).strip()
-        if text:
-            blocks.append({
-                'text': text,
-                'box': current_box
-            })
-
+    parser = DeepSeekOCRParser()
+    blocks = parser.feed(content)
+    blocks.extend(parser.close())
     return blocks
 
 
@@ -0,0 +1,193 @@
+"""
+测试批量上传
+验证 NDJSON 结果按完成顺序输出、单张图片失败不影响其他图片、文件数量上限，
+以及客户端断开时取消尚未完成的识别任务
+"""
+
+import io
+import re
+import json
+import base64
+import asyncio
+
+import httpx
+from PIL import Image, ImageDraw
+
+import backend_api
+from src.config import config
+from src.http_pool import PooledHTTPClient
+from src.ocr_service import ocr_service
+
+MOCK_CONTENT = (
+    "<|ref|>text<|/ref|><|det|>[[36, 25, 912, 185]]<|/det|>\n"
+    "1. 第一道题目"
+)
+
+# 按图片宽度决定模拟 API 的响应：宽 300 的图片最慢，宽 250 的图片识别失败
+SLOW_WIDTH = 300
+FAIL_WIDTH = 250
+
+
+def make_png(width: int) -> bytes:
+    """生成指定宽度的图片（宽度不同，内容哈希也不同）"""
+    image = Image.new('RGB', (width, 200), 'white')
+    ImageDraw.Draw(image).rectangle([10, 10, width - 10, 40], fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+async def handler(request: httpx.Request) -> httpx.Response:
+    body = (await request.aread()).decode('ascii')
+    data = base64.b64decode(re.search(r'data:[^;]+;base64,([A-Za-z0-9+/=]+)', body).group(1))
+    with Image.open(io.BytesIO(data)) as image:
+        width = image.width
+    if width == FAIL_WIDTH:
+        await asyncio.sleep(0.05)
+        return httpx.Response(500, json={"error": "internal"})
+    await asyncio.sleep(0.3 if width == SLOW_WIDTH else 0.02)
+    return httpx.Response(200, json={"choices": [{"message": {"content": MOCK_CONTENT}}]})
+
+
+async def post_batch(files):
+    """替换全局 OCR 服务的 HTTP 客户端后调用批量上传接口，结束后恢复"""
+    original = (ocr_service.http, ocr_service.api_key, ocr_service.cache)
+    ocr_service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+    ocr_service.api_key = "test-key"
+    ocr_service.cache = None
+    try:
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=10) as client:
+            return await client.post("/api/upload/batch", files=files)
+    finally:
+        await ocr_service.http.aclose()
+        ocr_service.http, ocr_service.api_key, ocr_service.cache = original
+
+
+def test_batch_completion_order():
+    """每张图片完成后立即输出一行，失败的图片输出错误项"""
+    files = [
+        ('files', ('slow.png', make_png(SLOW_WIDTH), 'image/png')),
+        ('files', ('notes.txt', b'not an image', 'text/plain')),
+        ('files', ('fast.png', make_png(200), 'image/png')),
+        ('files', ('broken.png', b'\x89PNG\r\n\x1a\n' + b'\x00' * 64, 'image/png')),
+        ('files', ('fail.png', make_png(FAIL_WIDTH), 'image/png')),
+    ]
+    response = asyncio.run(post_batch(files))
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+
+    items = [json.loads(line) for line in response.text.splitlines()]
+    for item in items:
+        print(f"{item['index']} {item['filename']}: success={item['success']} {item['message']}")
+    assert sorted(item['index'] for item in items) == [0, 1, 2, 3, 4]
+
+    # 按完成顺序输出：最慢的图片排在最后，快的图片排在失败的识别请求之前
+    order = [item['index'] for item in items]
+    assert order[-1] == 0
+    assert order.index(2) < order.index(4)
+
+    by_index = {item['index']: item for item in items}
+    assert by_index[0]['success'] and by_index[2]['success']
+    assert by_index[0]['questions'] and by_index[0]['filename'] == 'slow.png'
+    assert not by_index[1]['success'] and '不支持的文件格式' in by_index[1]['message']
+    assert not by_index[3]['success'] and by_index[3]['questions'] == []
+    assert not by_index[4]['success'] and by_index[4]['message'].startswith('处理失败')
+
+
+def test_batch_max_files():
+    """超过 BATCH_MAX_FILES 时整个请求被拒绝"""
+    original = config.batch_max_files
+    config.batch_max_files = 2
+    try:
+        files = [('files', (f'{i}.png', make_png(100 + i), 'image/png')) for i in range(3)]
+        response = asyncio.run(post_batch(files))
+    finally:
+        config.batch_max_files = original
+    print(f"状态码: {response.status_code}, {response.json()['detail']}")
+    assert response.status_code == 400
+    assert '2' in response.json()['detail']
+
+
+def test_chunked_upload_size_limit():
+    """没有 Content-Length 的分块上传在超过上限后立即返回 413，不再读取剩余内容"""
+    chunk = b'x' * (256 * 1024)
+    sent = 0
+
+    async def body():
+        nonlocal sent
+        yield b'--boundary\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+        for _ in range(64):
+            sent += 1
+            yield chunk
+
+    async def run():
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=10) as client:
+            return await client.post(
+                "/api/upload/batch", content=body(),
+                headers={'Content-Type': 'multipart/form-data; boundary=boundary'}
+            )
+
+    original = backend_api.UPLOAD_ENDPOINTS['/api/upload/batch']
+    backend_api.UPLOAD_ENDPOINTS['/api/upload/batch'] = (1, 1024 * 1024)
+    try:
+        response = asyncio.run(run())
+    finally:
+        backend_api.UPLOAD_ENDPOINTS['/api/upload/batch'] = original
+    print(f"状态码: {response.status_code}, 已发送 {sent} 块")
+    assert response.status_code == 413
+    assert 'MB' in response.json()['detail']
+    # 上限为 1MB + 64KB，读到第 5 块时停止
+    assert sent == 5
+
+
+def test_previews_read_from_storage():
+    """批量上传时预览图从存储读取，不在后台任务中保留每张图片的内容"""
+    scheduled = []
+    original = backend_api._schedule_previews
+    backend_api._schedule_previews = lambda name, data=None: scheduled.append((name, data))
+    try:
+        files = [('files', (f'{i}.png', make_png(120 + i), 'image/png')) for i in range(3)]
+        response = asyncio.run(post_batch(files))
+    finally:
+        backend_api._schedule_previews = original
+    assert response.status_code == 200
+    assert len(scheduled) == 3
+    assert all(data is None for _, data in scheduled)
+
+
+def test_cancel_pending():
+    """停止读取结果（客户端断开）时取消尚未完成的任务"""
+    cancelled = []
+
+    async def item(index: int, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return backend_api._build_batch_error(index, f'{index}.png', 'done')
+
+    async def run():
+        stream = backend_api._stream_as_completed(item(i, delay) for i, delay in enumerate((5, 0.01, 5)))
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return json.loads(first)
+
+    first = asyncio.run(run())
+    assert first['index'] == 1
+    assert sorted(cancelled) == [0, 2]
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试批量上传")
+    print("=" * 60)
+    test_batch_completion_order()
+    test_batch_max_files()
+    test_chunked_upload_size_limit()
+    test_previews_read_from_storage()
+    test_cancel_pending()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,110 @@
+"""
+测试文本块的列式存储
+验证包围盒和文本拼接与逐个文本块计算的结果一致，以及题目聚合结果的缓存与更新
+"""
+
+import copy
+import math
+from dataclasses import FrozenInstanceError
+
+from src.models import BlockColumns, BoundingBox, Question, TextBlock, OCRResult
+
+
+def make_blocks():
+    """构造测试用的文本块"""
+    return [
+        TextBlock(text="2. 第二题", box=BoundingBox(10, 203, 300, 240)),
+        TextBlock(text="1. 第一题", box=BoundingBox(10, 20, 300, 60), confidence=0.9),
+        TextBlock(text="(A) 选项", box=BoundingBox(320, 24, 500, 58)),
+        TextBlock(text="", box=BoundingBox(5, 400, 50, 420)),
+    ]
+
+
+def test_columns_match_blocks():
+    """列式计算的结果与逐个文本块计算一致"""
+    blocks = make_blocks()
+    columns = BlockColumns(blocks)
+
+    assert len(columns) == 4
+    assert columns.union().to_tuple() == (5, 20, 500, 420)
+    assert columns.full_text == '\n'.join(b.text for b in blocks)
+    for start in range(5):
+        for stop in range(start, 5):
+            assert columns.text_range(start, stop) == '\n'.join(b.text for b in blocks[start:stop])
+
+    restored = columns.to_blocks()
+    assert [b.box.to_tuple() for b in restored] == [b.box.to_tuple() for b in blocks]
+    assert restored[1].confidence == 0.9 and restored[0].confidence is None
+
+    assert BlockColumns().union() is None and BlockColumns().text_range(0, 0) == ''
+
+
+def test_question_aggregates_cached():
+    """题目的包围盒和文本只计算一次，添加或合并文本块后更新"""
+    blocks = make_blocks()
+    question = Question(question_id=1, text_blocks=blocks[:2])
+    box = question.bounding_box
+    assert box.to_tuple() == (10, 20, 300, 240)
+    assert question.bounding_box is box
+
+    question.add_text_block(blocks[2])
+    assert question.bounding_box.to_tuple() == (10, 20, 500, 240)
+    assert question.text == '\n'.join(b.text for b in blocks[:3])
+
+    other = Question(question_id=2)
+    other.add_text_block(blocks[3])
+    question.merge_with(other)
+    assert question.bounding_box.to_tuple() == (5, 20, 500, 420)
+    assert question.text.endswith('(A) 选项\n')
+
+    # 直接修改 text_blocks 列表时视图会重建
+    question.text_blocks.pop()
+    assert question.bounding_box.to_tuple() == (10, 20, 500, 240)
+
+    # 替换单个文本块（长度不变）时同样重建
+    question.text_blocks[0] = TextBlock(text="3. 第三题", box=BoundingBox(10, 203, 300, 600))
+    assert question.bounding_box.to_tuple() == (10, 20, 500, 600)
+    assert question.text.startswith("3. 第三题\n")
+
+    # 文本块和边界框不可变，无法原地修改导致缓存过期
+    try:
+        question.text_blocks[0].box.y2 = 0
+        assert False, "应该抛出 FrozenInstanceError"
+    except FrozenInstanceError:
+        pass
+
+    question.text_blocks = []
+    assert question.bounding_box is None and question.text == ''
+    question.text_blocks.append(blocks[1])
+    assert question.text == blocks[1].text
+
+    # 复制后的题目与原题目互不影响
+    copied = copy.deepcopy(question)
+    copied.text_blocks.append(blocks[2])
+    assert question.text == blocks[1].text
+    assert copied.bounding_box.to_tuple() == (10, 20, 500, 60)
+
+    assert Question(question_id=1, text_blocks=blocks) == Question(question_id=1, text_blocks=list(blocks))
+
+
+def test_ocr_result_columns():
+    """OCRResult 添加文本块时同步更新列式视图"""
+    result = OCRResult(image_path='page.png')
+    result.add_text_block("1. 题目", BoundingBox(0, 0, 10, 10))
+    result.add_text_block("内容", BoundingBox(0, 20, 10, 30), confidence=0.5)
+    assert result.full_text == "1. 题目\n内容"
+    assert result.columns.union().to_tuple() == (0, 0, 10, 30)
+    assert math.isnan(result.columns.confidence[0])
+
+    restored = OCRResult.from_dict(result.to_dict())
+    assert restored.full_text == result.full_text
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试文本块的列式存储")
+    print("=" * 60)
+    test_columns_match_blocks()
+    test_question_aggregates_cached()
+    test_ocr_result_columns()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,81 @@
+"""
+测试识别结果存储
+验证按文档 ID 隔离结果，并按 LRU / 超时淘汰
+"""
+
+import time
+
+from src.document_store import DocumentStore
+from src.models import Question, TextBlock, BoundingBox
+
+
+def make_questions(count: int) -> list:
+    """构造题目列表"""
+    return [
+        Question(
+            question_id=i + 1,
+            text_blocks=[TextBlock(text=f"{i + 1}. 题目", box=BoundingBox(0, i * 100, 500, i * 100 + 80))]
+        )
+        for i in range(count)
+    ]
+
+
+def test_documents_are_isolated():
+    """不同上传的结果互不覆盖"""
+    store = DocumentStore(max_documents=10, ttl=60)
+    first = store.put(make_questions(2), "a.png")
+    second = store.put(make_questions(3), "b.png")
+
+    assert first.document_id != second.document_id
+    assert len(store.get(first.document_id).questions) == 2
+    assert store.get(second.document_id).image_path == "b.png"
+    assert store.get("missing") is None
+
+
+def test_lru_eviction():
+    """超过上限时淘汰最久未访问的文档"""
+    store = DocumentStore(max_documents=2, ttl=60)
+    first = store.put(make_questions(1), "a.png")
+    second = store.put(make_questions(1), "b.png")
+
+    # 访问第一个文档后，第二个文档成为最久未访问的
+    store.get(first.document_id)
+    third = store.put(make_questions(1), "c.png")
+
+    assert store.get(second.document_id) is None
+    assert store.get(first.document_id) is not None
+    assert store.get(third.document_id) is not None
+    assert store.get_stats()['evicted'] == 1
+
+
+def test_ttl_expiry():
+    """超过保留时间未访问的文档被清理"""
+    store = DocumentStore(max_documents=10, ttl=0.1)
+    document = store.put(make_questions(1), "a.png")
+    time.sleep(0.15)
+
+    assert store.get(document.document_id) is None
+    assert store.get_stats()['documents'] == 0
+
+
+def test_remove():
+    """删除文档后不再返回其图片路径"""
+    store = DocumentStore(max_documents=10, ttl=60)
+    document = store.put(make_questions(2), "a.png")
+    assert store.image_paths() == ["a.png"]
+
+    assert store.remove(document.document_id)
+    assert store.image_paths() == []
+    assert store.get(document.document_id) is None
+    assert not store.remove(document.document_id)
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试识别结果存储")
+    print("=" * 60)
+    test_documents_are_isolated()
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_remove()
+    print("\n✅ 测试完成！")
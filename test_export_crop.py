@@ -0,0 +1,89 @@
+"""
+测试批量裁剪导出
+验证原图只解码一次、裁剪结果与逐题裁剪一致，以及没有边界框的题目被跳过
+"""
+
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from src.exporter import Exporter
+from src.image_processor import image_processor
+from src.models import BoundingBox, Question, TextBlock
+
+
+def make_question(question_id: int, box=None) -> Question:
+    """构造测试用的题目"""
+    question = Question(question_id=question_id)
+    if box is not None:
+        question.add_text_block(TextBlock(text=f"{question_id}. 题目", box=BoundingBox(*box)))
+    return question
+
+
+def test_batch_crop_matches_single_crop():
+    """批量裁剪与逐题裁剪的结果完全一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        page = Path(tmp) / 'page.png'
+        image = Image.new('RGB', (400, 600), 'white')
+        for y in range(0, 600, 40):
+            image.paste((y % 255, 0, 0), (0, y, 400, y + 20))
+        image.save(page)
+
+        boxes = [BoundingBox(10, 10, 200, 90), BoundingBox(50, 300, 390, 590)]
+        batch = image_processor.crop_images_by_boxes(
+            str(page), [(box, str(Path(tmp) / f"batch_{i}.png")) for i, box in enumerate(boxes)]
+        )
+        for i, box in enumerate(boxes):
+            single = image_processor.crop_image_by_box(str(page), box, str(Path(tmp) / f"single_{i}.png"))
+            with Image.open(single) as a, Image.open(batch[i]) as b:
+                assert a.size == b.size and a.tobytes() == b.tobytes()
+
+        # 坐标无效时在写入任何文件之前报错
+        try:
+            image_processor.crop_images_by_boxes(str(page), [
+                (boxes[0], str(Path(tmp) / 'ok.png')),
+                (BoundingBox(500, 700, 600, 800), str(Path(tmp) / 'bad.png'))
+            ])
+            assert False, "无效坐标应被拒绝"
+        except ValueError:
+            pass
+        assert not (Path(tmp) / 'ok.png').exists()
+
+
+def test_export_batch_decodes_once():
+    """批量导出时原图只打开一次，没有边界框的题目不导出图片"""
+    with tempfile.TemporaryDirectory() as tmp:
+        page = Path(tmp) / 'page.png'
+        Image.new('RGB', (400, 600), 'white').save(page)
+        questions = [make_question(1, (10, 10, 200, 90)), make_question(2), make_question(3, (10, 300, 390, 590))]
+
+        opened = []
+        original_open = Image.open
+
+        def counting_open(fp, *args, **kwargs):
+            opened.append(fp)
+            return original_open(fp, *args, **kwargs)
+
+        Image.open = counting_open
+        try:
+            results = Exporter(Path(tmp) / 'exports').export_questions_batch(questions, str(page))
+        finally:
+            Image.open = original_open
+
+        print(f"导出结果: {results}")
+        assert opened == [str(page)]
+        assert set(results) == {1, 2, 3}
+        assert 'image' in results[1] and 'image' in results[3]
+        assert 'image' not in results[2] and 'text' in results[2]
+        with Image.open(results[3]['image']) as cropped:
+            assert cropped.size == (400, 310)
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试批量裁剪导出")
+    print("=" * 60)
+    test_batch_crop_matches_single_crop()
+    test_export_batch_decodes_once()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,121 @@
+"""
+测试 ZIP 流式导出
+验证压缩包内容与逐题导出一致、边生成边输出，以及不写入导出目录
+"""
+
+import io
+import zipfile
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from src.exporter import Exporter
+from src.image_processor import image_processor
+from src.models import BoundingBox, Question, TextBlock
+
+
+def make_question(question_id: int, box=None) -> Question:
+    """构造测试用的题目"""
+    question = Question(question_id=question_id)
+    if box is not None:
+        question.add_text_block(TextBlock(text=f"{question_id}. 题目", box=BoundingBox(*box)))
+    return question
+
+
+def test_zip_contents():
+    """压缩包包含每道题的文本和裁剪图片，没有边界框的题目只有文本"""
+    with tempfile.TemporaryDirectory() as tmp:
+        page = Path(tmp) / 'page.png'
+        image = Image.new('RGB', (400, 600), 'white')
+        image.paste((200, 0, 0), (0, 300, 400, 600))
+        image.save(page)
+        export_dir = Path(tmp) / 'exports'
+        questions = [make_question(1, (10, 10, 200, 90)), make_question(2), make_question(3, (10, 300, 390, 590))]
+
+        chunks = list(Exporter(export_dir).iter_zip_export(questions, str(page)))
+        print(f"输出片段数: {len(chunks)}，总大小: {sum(len(c) for c in chunks)} 字节")
+        # 每写完一个文件就有输出，而不是最后一次性输出
+        assert len([c for c in chunks if c]) >= 5
+        assert not any(export_dir.iterdir())
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            assert archive.testzip() is None
+            names = archive.namelist()
+            assert names == ['question_1.txt', 'question_1.png', 'question_2.txt',
+                             'question_3.txt', 'question_3.png']
+            assert archive.read('question_3.txt').decode('utf-8') == questions[2].text
+
+            # 裁剪结果与单独裁剪一致
+            single = image_processor.crop_question_image(str(page), questions[2], str(Path(tmp) / 'single.png'))
+            with Image.open(io.BytesIO(archive.read('question_3.png'))) as a, Image.open(single) as b:
+                assert a.size == b.size and a.tobytes() == b.tobytes()
+
+
+def test_zip_text_only():
+    """只导出文本时不读取原图"""
+    with tempfile.TemporaryDirectory() as tmp:
+        questions = [make_question(1, (10, 10, 200, 90))]
+        data = b''.join(Exporter(Path(tmp)).iter_zip_export(questions, str(Path(tmp) / 'missing.png'), 'text'))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.namelist() == ['question_1.txt']
+
+
+def test_iter_crops_validates_first():
+    """坐标无效或原图不存在时在调用时立即报错，而不是输出一部分压缩包之后"""
+    with tempfile.TemporaryDirectory() as tmp:
+        page = Path(tmp) / 'page.png'
+        Image.new('RGB', (400, 600), 'white').save(page)
+        boxes = [BoundingBox(10, 10, 200, 90), BoundingBox(500, 700, 600, 800)]
+        try:
+            image_processor.iter_crops(str(page), boxes)
+            assert False, "无效坐标应被拒绝"
+        except ValueError:
+            pass
+
+        questions = [make_question(1, (10, 10, 200, 90)), make_question(2, (500, 700, 600, 800))]
+        for path, error in ((str(page), ValueError), (str(Path(tmp) / 'missing.png'), FileNotFoundError)):
+            try:
+                Exporter(Path(tmp)).iter_zip_export(questions, path)
+                assert False, f"应该抛出 {error.__name__}"
+            except error:
+                pass
+
+
+def test_zip_endpoint_rejects_before_streaming():
+    """裁剪坐标超出原图时导出接口返回 400，而不是状态码 200 的残缺压缩包"""
+    import asyncio
+    import hashlib
+    import httpx
+    import backend_api
+    from src.document_store import document_store
+    from src.upload_store import upload_store
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 600), 'white').save(buffer, format='PNG')
+    data = buffer.getvalue()
+    stored = upload_store.store(data, hashlib.sha256(data).hexdigest() + '.png')
+    questions = [make_question(1, (10, 10, 200, 90)), make_question(2, (500, 700, 600, 800))]
+    document = document_store.put(questions, str(stored))
+
+    async def run():
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/export/zip", json={
+                "document_id": document.document_id, "question_ids": [1, 2], "export_format": "both"
+            })
+
+    response = asyncio.run(run())
+    print(f"状态码: {response.status_code}, {response.text}")
+    assert response.status_code == 400
+    assert response.headers['content-type'].startswith('application/json')
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试 ZIP 流式导出")
+    print("=" * 60)
+    test_zip_contents()
+    test_zip_text_only()
+    test_iter_crops_validates_first()
+    test_zip_endpoint_rejects_before_streaming()
+    print("\n✅ 测试完成！")
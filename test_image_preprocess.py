@@ -0,0 +1,100 @@
+"""
+测试图片预处理
+验证大图缩放、重新编码后上传字节数减少，且识别坐标被映射回原图
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+import httpx
+from PIL import Image, ImageDraw
+
+from src.http_pool import PooledHTTPClient
+from src.image_processor import image_processor
+from src.ocr_service import OCRService
+
+# 模拟 API 返回按图片宽高归一化到 0-999 的坐标
+MOCK_CONTENT = (
+    "<|ref|>text<|/ref|><|det|>[[100, 50, 600, 150]]<|/det|>\n"
+    "1. 第一道题目"
+)
+
+
+def make_large_image(path: Path, size=(4000, 2000)):
+    """生成一张带文字区域的大图"""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for y in range(100, size[1], 200):
+        draw.rectangle([200, y, size[0] - 200, y + 60], fill='black')
+    image.save(path, format='PNG')
+
+
+def test_prepare_for_ocr_downscales():
+    """长边超过上限时缩放，并记录原图和发送图片的尺寸"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'large.png'
+        make_large_image(path)
+
+        prepared = image_processor.prepare_for_ocr(str(path), max_side=1000)
+        stats = prepared.to_stats()
+        print(f"预处理结果: {stats}")
+
+        assert prepared.original_size == (4000, 2000)
+        assert max(prepared.sent_size) == 1000
+        assert prepared.scale_x == 4000 / 999
+        assert prepared.bytes_saved > 0
+        assert prepared.grayscale
+
+
+def test_small_image_is_not_upscaled():
+    """小图不放大，坐标比例只取决于原图尺寸"""
+    prepared = image_processor.prepare_for_ocr("test.png", max_side=4096)
+    assert prepared.sent_size == prepared.original_size
+    assert prepared.scale_x == prepared.original_size[0] / 999
+    assert prepared.scale_y == prepared.original_size[1] / 999
+
+
+def test_boxes_mapped_to_original_image():
+    """识别结果中的坐标应映射回原图坐标系"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": MOCK_CONTENT}}]
+        })
+
+    async def run(path: str):
+        service = OCRService()
+        service.api_key = "test-key"
+        service.cache = None
+        service.preprocess_enabled = True
+        service.max_image_side = 1000
+        service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+        try:
+            result = await service.recognize_image_async(path)
+            return result, service.get_preprocess_stats()
+        finally:
+            await service.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'large.png'
+        make_large_image(path)
+        result, stats = asyncio.run(run(str(path)))
+
+    print(f"映射后的坐标: {result.text_blocks[0].box.to_tuple()}")
+    print(f"预处理统计: {stats}")
+    # 归一化坐标按原图尺寸换算，与缩放到 1000 像素后发送无关
+    assert tuple(round(v) for v in result.text_blocks[0].box.to_tuple()) == (400, 100, 2402, 300)
+    assert result.metadata['preprocess']['original_size'] == [4000, 2000]
+    assert stats['requests'] == 1
+    assert stats['bytes_saved'] > 0
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试图片预处理")
+    print("=" * 60)
+    test_prepare_for_ocr_downscales()
+    test_small_image_is_not_upscaled()
+    test_boxes_mapped_to_original_image()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,111 @@
+"""
+测试后台任务队列
+验证任务提交、并发执行、失败处理以及结果过期
+"""
+
+import asyncio
+
+from src.job_queue import JobManager, JOB_DONE, JOB_FAILED, JOB_RUNNING
+
+
+async def handler(job):
+    """模拟 OCR 任务：等待一段时间后返回结果，value 为负数时失败"""
+    await asyncio.sleep(0.1)
+    if job.payload['value'] < 0:
+        raise ValueError("无效的参数")
+    return job.payload['value'] * 2
+
+
+def test_submit_and_result():
+    """任务并发执行，失败任务记录错误信息"""
+
+    async def run():
+        manager = JobManager(workers=4, result_ttl=60)
+        await manager.start(handler)
+        try:
+            jobs = [manager.submit({'value': v}) for v in (1, 2, 3, -1)]
+            await asyncio.sleep(0.3)
+            return jobs, manager.get_stats()
+        finally:
+            await manager.stop()
+
+    jobs, stats = asyncio.run(run())
+    print(f"任务统计: {stats}")
+    assert [job.result for job in jobs[:3]] == [2, 4, 6]
+    assert all(job.status == JOB_DONE for job in jobs[:3])
+    assert jobs[3].status == JOB_FAILED and "无效的参数" in jobs[3].error
+
+
+def test_result_ttl():
+    """已完成的任务超过保留时间后被清理（使用可控的时钟，不依赖真实的等待时间）"""
+    now = [1000.0]
+
+    async def run():
+        manager = JobManager(workers=1, result_ttl=60, clock=lambda: now[0])
+        await manager.start(handler)
+        try:
+            job = manager.submit({'value': 1})
+            await manager._queue.join()
+            assert job.finished_at == 1000.0
+
+            now[0] += 60
+            found = manager.get(job.job_id)
+            now[0] += 1
+            # 提交新任务时顺带清理过期的任务
+            manager.submit({'value': 2})
+            return found, manager.get(job.job_id), len(manager._jobs)
+        finally:
+            await manager.stop()
+
+    found, expired, remaining = asyncio.run(run())
+    assert found is not None and found.status == JOB_DONE
+    assert expired is None
+    assert remaining == 1
+
+
+def test_stop_finishes_jobs():
+    """停止时执行中和排队中的任务都被标记为失败，不再占用引用的文件"""
+
+    async def run():
+        manager = JobManager(workers=1)
+        await manager.start(handler)
+        running = manager.submit({'value': 1})
+        queued = manager.submit({'value': 2})
+        await asyncio.sleep(0.05)
+        assert manager.active_payloads() == [{'value': 1}, {'value': 2}]
+        await manager.stop()
+        return running, queued, manager.active_payloads(), manager.get_stats()
+
+    running, queued, payloads, stats = asyncio.run(run())
+    print(f"停止后: {running.status} {running.error} / {queued.status} {queued.error}")
+    assert running.status == JOB_FAILED and running.finished_at is not None
+    assert "取消" in running.error and running.result is None
+    assert queued.status == JOB_FAILED and queued.started_at is None
+    assert payloads == []
+    assert stats[JOB_RUNNING] == 0 and stats[JOB_FAILED] == 2
+
+
+def test_queue_full():
+    """等待中的任务超过上限时拒绝提交"""
+
+    async def run():
+        manager = JobManager(workers=1, max_pending=1)
+        await manager.start(handler)
+        try:
+            manager.submit({'value': 1})
+            manager.submit({'value': 2})
+            return False
+        except asyncio.QueueFull:
+            return True
+        finally:
+            await manager.stop()
+
+    assert asyncio.run(run())
+
+
+if __name__ == '__main__':
+    test_submit_and_result()
+    test_result_ttl()
+    test_stop_finishes_jobs()
+    test_queue_full()
+    print("\n✅ 测试完成！")
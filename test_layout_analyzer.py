@@ -0,0 +1,141 @@
+"""
+测试版面分析
+验证双栏页面先读左栏再读右栏、通栏标题分段、单栏和选项行保持逐行顺序，以及题目分割结果；
+边界情况：空页面、只有一栏、栏的 x 区间重叠
+"""
+
+from src.layout_analyzer import LayoutAnalyzer
+from src.models import BlockColumns, BoundingBox, OCRResult, TextBlock
+from src.question_splitter import QuestionSplitter
+
+
+def block(text, x1, y1, x2, y2) -> TextBlock:
+    """构造测试用的文本块"""
+    return TextBlock(text=text, box=BoundingBox(x1, y1, x2, y2))
+
+
+def two_column_page():
+    """双栏试卷：通栏标题、左右两栏题目、中间的通栏大题标题"""
+    return [
+        block("期末考试", 100, 20, 900, 60),
+        block("4. 右栏第二题", 520, 180, 950, 210),
+        block("1. 左栏第一题", 50, 100, 470, 130),
+        block("3. 右栏第一题", 520, 100, 950, 130),
+        block("左栏内容", 50, 140, 470, 170),
+        block("右栏内容", 520, 140, 950, 170),
+        block("2. 左栏第二题", 50, 180, 470, 210),
+        block("左栏内容", 50, 220, 470, 250),
+        block("二、解答题", 50, 300, 950, 340),
+        block("5. 左栏", 50, 360, 470, 390),
+        block("6. 右栏", 520, 362, 950, 392),
+    ]
+
+
+def texts(blocks, order):
+    return [blocks[i].text for i in order]
+
+
+def test_two_columns():
+    """双栏页面按栏阅读，通栏文本块把页面分为上下两段"""
+    blocks = two_column_page()
+    analyzer = LayoutAnalyzer()
+    columns = BlockColumns(blocks)
+    layout_columns = analyzer.find_columns(columns)
+    print(f"分栏: {layout_columns}")
+    assert layout_columns == [(50, 470), (520, 950)]
+
+    order = texts(blocks, analyzer.reading_order(columns))
+    print(f"阅读顺序: {order}")
+    assert order == [
+        "期末考试", "1. 左栏第一题", "左栏内容", "2. 左栏第二题", "左栏内容",
+        "3. 右栏第一题", "右栏内容", "4. 右栏第二题", "二、解答题", "5. 左栏", "6. 右栏",
+    ]
+
+    # 不检测分栏时逐行阅读（左右两栏交错）
+    flat = texts(blocks, LayoutAnalyzer(detect_columns=False).reading_order(columns))
+    assert flat[1:3] == ["1. 左栏第一题", "3. 右栏第一题"]
+
+    questions = QuestionSplitter().split_ocr_result(OCRResult(image_path="page.png", text_blocks=blocks))
+    assert [q.text.split('\n')[0] for q in questions][1:5] == [
+        "1. 左栏第一题", "2. 左栏第二题", "3. 右栏第一题", "4. 右栏第二题"
+    ]
+    assert questions[1].text == "1. 左栏第一题\n左栏内容"
+
+
+def test_single_column_and_options():
+    """单栏页面和两行两列的选项保持逐行顺序"""
+    blocks = [
+        block("1. 下列说法正确的是", 50, 100, 900, 130),
+        block("B. 选项二", 480, 150, 700, 180),
+        block("A. 选项一", 50, 152, 300, 178),
+        block("C. 选项三", 50, 200, 300, 230),
+        block("D. 选项四", 480, 200, 700, 230),
+        block("2. 计算", 50, 260, 400, 290),
+        block("(5分)", 850, 262, 950, 288),
+    ]
+    order = texts(blocks, LayoutAnalyzer().reading_order(BlockColumns(blocks)))
+    print(f"阅读顺序: {order}")
+    assert order == ["1. 下列说法正确的是", "A. 选项一", "B. 选项二", "C. 选项三", "D. 选项四", "2. 计算", "(5分)"]
+
+    # 没有坐标的文本块保持原顺序
+    placeholders = [block(str(i), 0, 0, 0, 0) for i in range(5)]
+    assert LayoutAnalyzer().reading_order(BlockColumns(placeholders)) == list(range(5))
+
+
+def test_empty_and_single_block():
+    """空页面和只有一个文本块的页面"""
+    analyzer = LayoutAnalyzer()
+    empty = BlockColumns([])
+    assert analyzer.find_columns(empty) == []
+    assert analyzer.reading_order(empty) == []
+
+    single = BlockColumns([block("1. 唯一的题目", 50, 100, 470, 130)])
+    assert analyzer.find_columns(single) == []
+    assert analyzer.reading_order(single) == [0]
+
+
+def test_single_column():
+    """只有一栏时逐行阅读"""
+    analyzer = LayoutAnalyzer()
+    blocks = [
+        block("2. 第二题", 50, 200, 400, 230),
+        block("1. 第一题", 50, 100, 420, 130),
+        block("第一题内容", 60, 140, 410, 170),
+        block("第二题内容", 60, 240, 380, 270),
+    ]
+    columns = BlockColumns(blocks)
+    assert len(analyzer.find_columns(columns)) < 2
+    assert texts(blocks, analyzer.reading_order(columns)) == ["1. 第一题", "第一题内容", "2. 第二题", "第二题内容"]
+
+
+def test_overlapping_columns():
+    """左右两栏的 x 区间重叠时合并为一栏，逐行阅读；位置相同的文本块保持原顺序"""
+    analyzer = LayoutAnalyzer()
+    blocks = [
+        block("1. 左栏", 50, 100, 470, 130),
+        block("3. 右栏", 520, 100, 950, 130),
+        block("左栏超出空隙", 280, 140, 540, 170),
+        block("右栏内容", 520, 140, 950, 170),
+        block("2. 左栏", 50, 180, 470, 210),
+        block("右栏内容", 520, 180, 950, 210),
+    ]
+    columns = BlockColumns(blocks)
+    assert analyzer.find_columns(columns) == [(50, 950)]
+    assert texts(blocks, analyzer.reading_order(columns)) == [
+        "1. 左栏", "3. 右栏", "左栏超出空隙", "右栏内容", "2. 左栏", "右栏内容",
+    ]
+
+    duplicates = [block("甲", 50, 100, 470, 130), block("乙", 50, 100, 470, 130), block("丙", 50, 100, 470, 130)]
+    assert analyzer.reading_order(BlockColumns(duplicates)) == [0, 1, 2]
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试版面分析")
+    print("=" * 60)
+    test_two_columns()
+    test_single_column_and_options()
+    test_empty_and_single_block()
+    test_single_column()
+    test_overlapping_columns()
+    print("\n✅ 测试完成！")
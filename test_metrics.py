@@ -0,0 +1,116 @@
+"""
+测试监控指标
+验证 Prometheus 文本格式输出、阶段计时与异常计数、未启用时不记录，并输出记录一次观测的开销
+"""
+
+import io
+import time
+import asyncio
+
+from PIL import Image
+
+from src.metrics import MetricsRegistry, metrics
+from src.models import BoundingBox, OCRResult
+
+
+def test_render_format():
+    """直方图按桶累计输出，计数器带标签，标签值中的特殊字符被转义"""
+    registry = MetricsRegistry(prefix='test')
+    for seconds in (0.0005, 0.003, 0.003, 0.7, 500):
+        registry.observe_stage('split', seconds)
+    registry.add_received('upload', 1024)
+    registry.add_received('upload', 512)
+    registry.stage_errors.labels('ocr_request', 'Bad"Error').inc()
+
+    text = registry.render()
+    print(text[:400])
+    lines = text.splitlines()
+    assert '# TYPE test_stage_duration_seconds histogram' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="split",le="0.001"} 1' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="split",le="0.005"} 3' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="split",le="1.0"} 4' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="split",le="+Inf"} 5' in lines
+    assert 'test_stage_duration_seconds_count{stage="split"} 5' in lines
+    assert 'test_bytes_received_total{source="upload"} 1536.0' in lines
+    assert 'test_stage_errors_total{stage="ocr_request",error="Bad\\"Error"} 1.0' in lines
+    assert text.endswith('\n')
+
+    try:
+        registry.stage_seconds.labels('a', 'b')
+        assert False, "应该抛出 ValueError"
+    except ValueError:
+        pass
+
+
+def test_stage_timer():
+    """阶段抛出异常时同时记录耗时和异常类型，异常继续向外抛出"""
+    registry = MetricsRegistry()
+    with registry.stage('parse'):
+        time.sleep(0.01)
+    try:
+        with registry.stage('parse'):
+            raise KeyError('choices')
+    except KeyError:
+        pass
+
+    child = registry.stage_seconds.labels('parse')
+    assert child.count == 2 and child.sum >= 0.01
+    assert registry.stage_errors.labels('parse', 'KeyError').value == 1
+
+    # 未启用时不记录任何数据
+    disabled = MetricsRegistry(enabled=False)
+    with disabled.stage('parse'):
+        pass
+    disabled.add_sent('export', 100)
+    disabled.observe_page(10, 2)
+    assert 'stage="parse"' not in disabled.render()
+    assert 'export' not in disabled.render()
+
+
+def test_overhead():
+    """大量计时全部被记录（开销只输出供参考，不作为断言，避免受测试机器负载影响）"""
+    registry = MetricsRegistry()
+    count = 100000
+    start = time.perf_counter()
+    for _ in range(count):
+        with registry.stage('split'):
+            pass
+    elapsed = (time.perf_counter() - start) / count
+    print(f"每次计时开销: {elapsed * 1e6:.2f} us")
+    child = registry.stage_seconds.labels('split')
+    assert child.count == count
+    assert child.sum > 0
+    assert 'stage="split"' in registry.render()
+
+
+def test_pipeline_metrics():
+    """分割并保存识别结果时记录分割、保存阶段和每页的文本块数、题目数"""
+    import backend_api
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), 'white').save(buffer, format='PNG')
+    ocr_result = OCRResult(image_path='page.png')
+    ocr_result.add_text_block("1. 第一题", BoundingBox(10, 10, 400, 40))
+    ocr_result.add_text_block("2. 第二题", BoundingBox(10, 100, 400, 140))
+
+    before = metrics.stage_seconds.labels('split').count
+    document = asyncio.run(backend_api._split_and_store(ocr_result, 'page.png', buffer.getvalue()))
+    assert len(document.questions) == 2 and document.image_size == (800, 600)
+    assert metrics.stage_seconds.labels('split').count == before + 1
+
+    response = asyncio.run(backend_api.get_metrics())
+    body = response.body.decode('utf-8')
+    assert response.media_type.startswith('text/plain')
+    assert 'cut_ai_stage_duration_seconds_count{stage="store"}' in body
+    assert 'cut_ai_page_questions_bucket{le="2.0"}' in body
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试监控指标")
+    print("=" * 60)
+    test_render_format()
+    test_stage_timer()
+    test_overhead()
+    test_pipeline_metrics()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,214 @@
+"""
+测试异步 OCR 接口
+使用 httpx.MockTransport 模拟 DeepSeek OCR API，验证多个请求可以并发执行
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+from src.http_pool import PooledHTTPClient
+from src.ocr_service import OCRService
+
+TEST_IMAGE = "test.png"
+
+MOCK_CONTENT = (
+    "<|ref|>text<|/ref|><|det|>[[36, 25, 912, 185]]<|/det|>\n"
+    "1. 第一道题目\n"
+    "<|ref|>text<|/ref|><|det|>[[34, 680, 928, 997]]<|/det|>\n"
+    "2. 第二道题目"
+)
+
+
+def make_service(delay: float = 0.0, max_connections: int = 20, handler=None) -> OCRService:
+    """创建使用模拟传输层的 OCR 服务（handler 为 None 时延迟 delay 秒后返回 MOCK_CONTENT）"""
+
+    async def default_handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": MOCK_CONTENT}}]
+        })
+
+    service = OCRService()
+    service.api_key = "test-key"
+    service.cache = None
+    service.http = PooledHTTPClient(
+        timeout=5,
+        max_connections=max_connections,
+        async_transport=httpx.MockTransport(handler or default_handler)
+    )
+    return service
+
+
+def test_recognize_image_async():
+    """异步接口返回解析后的文本块"""
+
+    async def run():
+        service = make_service()
+        try:
+            return await service.recognize_image_async(TEST_IMAGE)
+        finally:
+            await service.aclose()
+
+    result = asyncio.run(run())
+    print(f"解析出 {len(result.text_blocks)} 个文本块")
+    assert len(result.text_blocks) == 2
+    # test.png 为 1197x534，坐标按 0-999 归一化
+    box = result.text_blocks[0].box
+    assert (round(box.x1), round(box.y1), round(box.x2), round(box.y2)) == (43, 13, 1093, 99)
+    assert result.text_blocks[1].box.y2 <= 534
+
+
+def test_concurrent_requests():
+    """多个异步请求应并发执行：所有请求同时到达模拟接口（按并发数判断，不依赖耗时）"""
+    count = 20
+    in_flight = peak = 0
+
+    async def run():
+        all_arrived = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            if in_flight == count:
+                all_arrived.set()
+            try:
+                # 请求依次执行时等不到其余请求，超时后返回，由并发数断言报告失败
+                await asyncio.wait_for(all_arrived.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            in_flight -= 1
+            return httpx.Response(200, json={"choices": [{"message": {"content": MOCK_CONTENT}}]})
+
+        service = make_service(handler=handler)
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                service.recognize_image_async(TEST_IMAGE) for _ in range(count)
+            ])
+            return results, time.perf_counter() - start
+        finally:
+            await service.aclose()
+
+    results, elapsed = asyncio.run(run())
+    print(f"{count} 个请求总耗时: {elapsed:.2f} 秒，最大并发数: {peak}")
+    assert len(results) == count
+    assert peak == count
+
+
+
+def test_pool_limit_and_stats():
+    """超过连接数上限的请求需要排队，并计入等待次数"""
+    count = 6
+
+    async def run():
+        service = make_service(0.05, max_connections=2)
+        try:
+            await asyncio.gather(*[
+                service.recognize_image_async(TEST_IMAGE) for _ in range(count)
+            ])
+            return service.get_pool_stats()
+        finally:
+            await service.aclose()
+
+    stats = asyncio.run(run())
+    print(f"连接池统计: {stats}")
+    assert stats['requests_total'] == count
+    assert stats['requests_in_flight'] == 0
+    assert stats['requests_waited'] == count - 2
+
+
+def test_connections_opened():
+    """连接被复用时只新建一次连接；预热请求同样经过闸门并计入统计"""
+    accepted = []
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        accepted.append(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode('latin-1').split("\r\n"):
+                    if line.lower().startswith('content-length:'):
+                        length = int(line.split(':', 1)[1])
+                await reader.readexactly(length)
+                body = b"" if head.startswith(b"HEAD") else b"ok"
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def run():
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+        client = PooledHTTPClient(timeout=5, max_connections=4)
+        try:
+            for _ in range(3):
+                async with client.astream('POST', url, content=b"{}") as response:
+                    await response.aread()
+            sequential = client.get_stats()
+            await client.awarmup(url, 3)
+            return sequential, client.get_stats()
+        finally:
+            await client.aclose()
+            server.close()
+            await server.wait_closed()
+
+    sequential, warmed = asyncio.run(run())
+    print(f"连接池统计: {warmed}")
+    assert sequential['requests_total'] == 3
+    assert sequential['connections_opened_total'] == 1
+    assert warmed['requests_total'] == 6
+    assert warmed['connections_opened_total'] == len(accepted) >= 2
+    assert warmed['requests_in_flight'] == 0
+
+
+def test_recognize_image_stream():
+    """流式识别：文本块在流结束前就被产出，最终结果与非流式一致"""
+    sent = []
+
+    async def sse_body():
+        # 按 7 个字符切分，模拟标记被拆分在多个 chunk 中
+        for i in range(0, len(MOCK_CONTENT), 7):
+            sent.append(i)
+            chunk = {"choices": [{"delta": {"content": MOCK_CONTENT[i:i + 7]}}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b'data: {"choices": [], "usage": {"total_tokens": 42}}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=sse_body(), headers={"content-type": "text/event-stream"})
+
+    async def run():
+        service = make_service()
+        service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+        events = []
+        try:
+            async for event, data in service.recognize_image_stream(TEST_IMAGE):
+                events.append((event, data, len(sent)))
+        finally:
+            await service.aclose()
+        return events
+
+    events = asyncio.run(run())
+    blocks = [e for e in events if e[0] == 'block']
+    result = events[-1][1]
+    print(f"流式产出 {len(blocks)} 个文本块")
+    assert len(blocks) == 2
+    assert blocks[0][2] < len(range(0, len(MOCK_CONTENT), 7))  # 第一个块在流结束前产出
+    assert events[-1][0] == 'done'
+    assert [b.text for b in result.text_blocks] == ["1. 第一道题目", "2. 第二道题目"]
+    assert result.raw_response["usage"] == {"total_tokens": 42}
+
+
+if __name__ == '__main__':
+    test_recognize_image_async()
+    test_concurrent_requests()
+    test_pool_limit_and_stats()
+    test_connections_opened()
+    test_recognize_image_stream()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,100 @@
+"""
+测试 OCR 结果缓存
+验证内存 / 磁盘两级缓存的命中、淘汰以及 OCRService 的缓存接入
+"""
+
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from src.http_pool import PooledHTTPClient
+from src.models import OCRResult, BoundingBox
+from src.ocr_cache import OCRCache, hash_file
+from src.ocr_service import OCRService
+
+TEST_IMAGE = "test.png"
+
+
+def make_result(blocks: int = 3) -> OCRResult:
+    """构造测试用的 OCR 结果"""
+    result = OCRResult(image_path="a.png", raw_response={"id": "test"})
+    for i in range(blocks):
+        result.add_text_block(f"{i + 1}. 第 {i + 1} 题", BoundingBox(0, i * 10, 100, i * 10 + 8))
+    return result
+
+
+def test_memory_and_disk_tiers():
+    """内存淘汰后仍能从磁盘命中，并且重启后磁盘缓存依然有效"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = OCRCache(Path(tmp), memory_items=1)
+        cache.put("k1", make_result())
+        cache.put("k2", make_result(5))
+
+        hit = cache.get("k1", "b.png")
+        assert hit is not None and hit.image_path == "b.png"
+        assert len(hit.text_blocks) == 3
+        assert cache.get("missing", "b.png") is None
+
+        stats = cache.get_stats()
+        print(f"缓存统计: {stats}")
+        assert stats['disk_hits'] == 1 and stats['misses'] == 1
+
+        reloaded = OCRCache(Path(tmp), memory_items=1)
+        assert reloaded.get("k2", "c.png").text_blocks[4].box.to_tuple() == (0, 40, 100, 48)
+
+
+def test_disk_eviction():
+    """磁盘缓存超出字节上限时淘汰最久未使用的条目"""
+    with tempfile.TemporaryDirectory() as tmp:
+        size = len(json.dumps(make_result().to_dict(), ensure_ascii=False).encode('utf-8'))
+        cache = OCRCache(Path(tmp), memory_items=0, disk_max_bytes=size * 2)
+        for key in ("k1", "k2", "k3"):
+            cache.put(key, make_result())
+        stats = cache.get_stats()
+        print(f"淘汰后统计: {stats}")
+        assert stats['evictions'] >= 1
+        assert stats['disk_bytes'] <= size * 2
+        assert cache.get("k3", "a.png") is not None
+        assert cache.get("k1", "a.png") is None
+
+
+def test_service_cache_hit():
+    """相同图片第二次识别直接返回缓存，不再请求 API"""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {
+            "content": "<|ref|>text<|/ref|><|det|>[[1, 2, 3, 4]]<|/det|>\n1. 题目"
+        }}]})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = OCRService()
+        service.api_key = "test-key"
+        service.cache = OCRCache(Path(tmp))
+        service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+
+        async def run():
+            try:
+                first = await service.recognize_image_async(TEST_IMAGE)
+                second = await service.recognize_image_async(TEST_IMAGE)
+                return first, second
+            finally:
+                await service.aclose()
+
+        first, second = asyncio.run(run())
+        assert len(calls) == 1
+        assert second.text_blocks[0].box.to_tuple() == first.text_blocks[0].box.to_tuple()
+        assert second is not first
+        assert service.get_cache_stats()['memory_hits'] == 1
+        print(f"图片哈希: {hash_file(TEST_IMAGE)[:16]}...")
+
+
+if __name__ == '__main__':
+    test_memory_and_disk_tiers()
+    test_disk_eviction()
+    test_service_cache_hit()
+    print("\n✅ 测试完成！")
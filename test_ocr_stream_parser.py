@@ -0,0 +1,66 @@
+"""
+测试 DeepSeek OCR 增量解析器
+验证任意切分（包括把标记切成两半）的输入与整段解析结果一致
+"""
+
+import random
+
+from src.ocr_parser import DeepSeekOCRParser, iter_deepseek_blocks
+from src.utils import parse_deepseek_ocr_response
+
+test_content = """前言文字（没有坐标，应被忽略）
+<|ref|>text<|/ref|><|det|>[[36, 25, 912, 185]]<|/det|>       
+42.(10分)现有 \\(n(n>100000)\\) 个数保存在一维数组M中
+<|ref|>text<|/ref|><|det|>[[67, 194, 914, 345]]<|/det|>（1）同一行的文本
+第二行<|ref|>sub<|/ref|>内容
+
+<|ref|>text<|/ref|><|det|>[[1.5, 2, 3, 4], [5, 6, 7, 8]]<|/det|>
+小数坐标
+<|ref|>text<|/ref|><|det|>[[bad]]<|/det|>
+无效坐标
+<|ref|>image<|/ref|><|det|>[[10, 20, 30, 40]]<|/det|>
+<|ref|>text<|/ref|><|det|>[[34, 680, 928, 997]]<|/det|>
+43.(15分）最后一题"""
+
+
+def test_parse_whole_content():
+    """整段解析的结果"""
+    blocks = parse_deepseek_ocr_response(test_content)
+    for block in blocks:
+        print(f"{block['box']}: {block['text'][:20]}")
+    assert [b['box'] for b in blocks] == [
+        [36, 25, 912, 185],
+        [67, 194, 914, 345],
+        [1.5, 2, 3, 4],
+        [0, 0, 0, 0],
+        [34, 680, 928, 997],
+    ]
+    assert blocks[1]['text'] == "（1）同一行的文本\n第二行内容"
+    assert blocks[-1]['text'] == "43.(15分）最后一题"
+
+
+def test_random_chunks():
+    """随机切分后增量输入，结果与整段解析一致"""
+    expected = parse_deepseek_ocr_response(test_content)
+    rng = random.Random(42)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(test_content)), rng.randint(1, 40)))
+        chunks = [test_content[i:j] for i, j in zip([0] + cuts, cuts + [len(test_content)])]
+        assert list(iter_deepseek_blocks(chunks)) == expected
+
+
+def test_blocks_emitted_early():
+    """文本块在下一个坐标标记到达时立即产出，不必等待输入结束"""
+    parser = DeepSeekOCRParser()
+    assert parser.feed("<|ref|>text<|/ref|><|det|>[[1, 2, 3, 4]]<|/det|>\n1. 第一题\n<|ref|>te") == []
+    blocks = parser.feed("xt<|/ref|><|det|>[[5, 6, 7, 8]]<|/det|>\n")
+    assert blocks == [{'text': "1. 第一题", 'box': [1, 2, 3, 4]}]
+    assert parser.feed("2. 第二题") == []
+    assert parser.close() == [{'text': "2. 第二题", 'box': [5, 6, 7, 8]}]
+
+
+if __name__ == '__main__':
+    test_parse_whole_content()
+    test_random_chunks()
+    test_blocks_emitted_early()
+    print("\n✅ 测试完成！")
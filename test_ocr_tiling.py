@@ -0,0 +1,128 @@
+"""
+测试长图切块识别
+验证长图按重叠条带切分、并发识别，坐标映射回原图且重叠区的文本块只保留一份
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from src.http_pool import PooledHTTPClient
+from src.image_processor import image_processor
+from src.models import BoundingBox, TextBlock
+from src.ocr_service import OCRService
+
+# 每个条带返回相同的内容（坐标按条带宽高归一化）：第一个文本块位于条带顶部的重叠区，第二个位于条带中部
+MOCK_CONTENT = (
+    "<|ref|>text<|/ref|><|det|>[[100, 20, 600, 60]]<|/det|>\n"
+    "重叠区文字\n"
+    "<|ref|>text<|/ref|><|det|>[[100, 500, 600, 540]]<|/det|>\n"
+    "1. 条带中部的题目"
+)
+
+
+def test_plan_tiles():
+    """高宽比超过阈值时切分为相互重叠、覆盖整张图的条带"""
+    assert image_processor.plan_tiles((1000, 1500)) == []
+
+    tiles = image_processor.plan_tiles((1000, 5000), tile_aspect=1.4, overlap=0.1)
+    print(f"条带: {[(tile.top, tile.bottom) for tile in tiles]}")
+    assert [(tile.top, tile.bottom) for tile in tiles] == [(0, 1400), (1200, 2600), (2400, 3800), (3600, 5000)]
+    assert tiles[0].keep_top == 0 and tiles[-1].keep_bottom == float('inf')
+    for upper, lower in zip(tiles, tiles[1:]):
+        assert upper.keep_bottom == lower.keep_top
+        assert lower.top < upper.bottom
+
+    # 超过条带数量上限时增大条带高度
+    tiles = image_processor.plan_tiles((1000, 50000), max_tiles=4)
+    assert len(tiles) == 4
+    assert tiles[-1].bottom == 50000
+
+
+def test_seam_dedupe():
+    """跨越分界线的一行在两个条带中的识别结果只保留一份，中心落在不同负责区域时也不丢失"""
+    tiles = image_processor.plan_tiles((1000, 2600))
+    assert [(tile.top, tile.bottom, tile.keep_bottom) for tile in tiles[:1]] == [(0, 1400, 1300)]
+    assert tiles[0].overlap_bottom == 1200 and tiles[1].overlap_top == 1400
+
+    def block(text, y1, y2):
+        return TextBlock(text=text, box=BoundingBox(100, y1, 900, y2))
+
+    upper = [
+        block("1. 上方条带内部", 100, 160),
+        # 被上方条带下边缘截断，中心 1275 落在上方条带的负责区域
+        block("2. 被截断", 1150, 1400),
+        # 中心 1310 落在下方条带的负责区域，下方条带估计的中心却在上方
+        block("3. 位置估计不同的一行", 1290, 1330),
+        # 只有上方条带识别出、中心不在负责区域的文本块
+        block("误检", 1350, 1390),
+    ]
+    lower = [
+        block("被截断的一段文字", 1200, 1420),
+        block("3. 位置估计不同的一行", 1270, 1320),
+        block("4. 下方条带内部", 2000, 2060),
+    ]
+
+    merged = OCRService._dedupe_overlaps(tiles, [upper, lower])
+    texts = [b.text for b in merged]
+    print(f"去重结果: {texts}")
+    # 旧的按中心取舍会同时保留两份“被截断”的文本块，并丢掉第 3 行
+    assert texts == ["1. 上方条带内部", "2. 被截断", "3. 位置估计不同的一行", "4. 下方条带内部"]
+    assert merged[2].box.y1 == 1290
+
+
+def test_tiled_recognition():
+    """各条带并发识别，坐标映射回原图，重叠区的重复文本块被去掉"""
+    requests_seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": MOCK_CONTENT}}],
+            "usage": {"total_tokens": 10}
+        })
+
+    async def run(path: str):
+        service = OCRService()
+        service.api_key = "test-key"
+        service.cache = None
+        service.max_image_side = 1000
+        service.tile_enabled = True
+        service.tile_aspect = 1.4
+        service.tile_overlap = 0.1
+        service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+        try:
+            streamed = [data async for event, data in service.recognize_image_stream(path) if event == 'block']
+            service.cache = None
+            result = await service.recognize_image_async(path)
+            return streamed, result
+        finally:
+            await service.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'tall.png'
+        Image.new('RGB', (1000, 5000), 'white').save(path, format='PNG')
+        streamed, result = asyncio.run(run(str(path)))
+
+    centers = [round(block.box.center_y) for block in result.text_blocks]
+    print(f"文本块中心: {centers}")
+    assert len(requests_seen) == 8
+    assert [block.text for block in result.text_blocks].count('重叠区文字') == 1
+    assert centers == [56, 729, 1929, 3129, 4329]
+    assert len(streamed) == len(result.text_blocks)
+    assert result.raw_response['usage'] == {'total_tokens': 40}
+    assert len(result.metadata['preprocess']['tiles']) == 4
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试长图切块识别")
+    print("=" * 60)
+    test_plan_tiles()
+    test_seam_dedupe()
+    test_tiled_recognition()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,168 @@
+"""
+测试 PDF 逐页光栅化
+验证按页数读取信息、单页渲染的分辨率、页数上限以及损坏和空文件的处理（需要安装 Poppler），
+上传接口拒绝无效文件，并在逐页识别期间固定 PDF 文件
+"""
+
+import io
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from src.http_pool import PooledHTTPClient
+from src.ocr_service import ocr_service
+from src.pdf_processor import PDFProcessor, PDFError
+from src.upload_store import upload_store
+
+
+def make_pdf(path: Path, pages: int = 3):
+    """生成每页 A4 大小（72 DPI 下 595x842）的多页 PDF"""
+    images = [Image.new('RGB', (595, 842), color) for color in ('white', 'gray', 'black')[:pages]]
+    images[0].save(path, format='PDF', resolution=72, save_all=True, append_images=images[1:])
+
+
+def test_render_single_pages():
+    """每次只渲染指定的一页，尺寸随 DPI 变化"""
+    processor = PDFProcessor(dpi=72)
+    if not processor.is_available():
+        print("未安装 pdf2image 或 Poppler，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'paper.pdf'
+        make_pdf(path)
+        assert processor.page_count(str(path)) == 3
+
+        with Image.open(io.BytesIO(processor.render_page(str(path), 3))) as page:
+            print(f"第 3 页尺寸: {page.size}")
+            assert abs(page.size[0] - 595) <= 1
+            assert page.getpixel((10, 10))[0] < 10
+
+        with Image.open(io.BytesIO(processor.render_page(str(path), 1, dpi=144))) as page:
+            assert abs(page.size[0] - 1190) <= 2
+
+
+def test_page_limit():
+    """页数超过上限时拒绝处理"""
+    processor = PDFProcessor(max_pages=2)
+    if not processor.is_available():
+        print("未安装 pdf2image 或 Poppler，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'paper.pdf'
+        make_pdf(path)
+        try:
+            processor.page_count(str(path))
+            assert False, "超过页数上限应被拒绝"
+        except PDFError as e:
+            assert e.status_code == 400
+
+
+def test_corrupt_and_empty_pdfs():
+    """截断、只有文件头和空的 PDF 在读取页数时被拒绝，不会渲染"""
+    processor = PDFProcessor()
+    if not processor.is_available():
+        print("未安装 pdf2image 或 Poppler，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        valid = Path(tmp) / 'valid.pdf'
+        make_pdf(valid, pages=1)
+        contents = {
+            'truncated.pdf': valid.read_bytes()[:200],
+            'header_only.pdf': b'%PDF-1.4\n',
+            'empty.pdf': b'',
+        }
+        for name, data in contents.items():
+            path = Path(tmp) / name
+            path.write_bytes(data)
+            try:
+                processor.page_count(str(path))
+                assert False, f"{name} 应被拒绝"
+            except PDFError as e:
+                print(f"{name}: {e}")
+                assert e.status_code == 400
+
+
+def test_upload_rejects_invalid_pdfs():
+    """上传接口拒绝空文件和非 PDF 文件；无法读取页数的 PDF 返回错误且不保留固定"""
+    import backend_api
+
+    async def post(data: bytes):
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=10) as client:
+            return await client.post("/api/upload/pdf", files={'file': ('paper.pdf', data, 'application/pdf')})
+
+    for data in (b'', b'not a pdf at all', Image.new('RGB', (8, 8)).tobytes()):
+        response = asyncio.run(post(data))
+        assert response.status_code == 400, response.text
+
+    # 有文件头但内容损坏：安装 Poppler 时为文件无效（400），否则为不支持 PDF（501）
+    response = asyncio.run(post(b'%PDF-1.4\n%%EOF\n'))
+    print(f"损坏的 PDF: {response.status_code}, {response.json()['detail']}")
+    assert response.status_code == (400 if backend_api.pdf_processor.is_available() else 501)
+    assert upload_store._pins == {}
+
+
+def test_upload_pins_pdf():
+    """逐页识别期间 PDF 不会被清理，输出结束后解除固定（用替换的渲染函数代替 Poppler）"""
+    import backend_api
+
+    pinned_during = []
+
+    def page_count(path):
+        return 2
+
+    def render_page(path, page, dpi=None):
+        pinned_during.append(Path(path).name in upload_store._pinned_names())
+        buffer = io.BytesIO()
+        Image.new('RGB', (200 + page, 300), 'white').save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"choices": [{"message": {
+            "content": "<|ref|>text<|/ref|><|det|>[[1, 2, 300, 40]]<|/det|>\n1. 题目"
+        }}]})
+
+    async def run(data: bytes):
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=10) as client:
+            return await client.post("/api/upload/pdf", files={'file': ('paper.pdf', data, 'application/pdf')})
+
+    processor = backend_api.pdf_processor
+    original = (processor.page_count, processor.render_page, ocr_service.http, ocr_service.api_key, ocr_service.cache)
+    processor.page_count, processor.render_page = page_count, render_page
+    ocr_service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+    ocr_service.api_key = "test-key"
+    ocr_service.cache = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'paper.pdf'
+            make_pdf(path, pages=1)
+            response = asyncio.run(run(path.read_bytes()))
+    finally:
+        asyncio.run(ocr_service.http.aclose())
+        processor.page_count, processor.render_page, ocr_service.http, ocr_service.api_key, ocr_service.cache = original
+
+    pages = [json.loads(line) for line in response.text.splitlines()]
+    print(f"逐页结果: {[(p['page'], p['success']) for p in pages]}")
+    assert sorted(p['page'] for p in pages) == [1, 2] and all(p['success'] for p in pages)
+    assert pinned_during == [True, True]
+    assert upload_store._pins == {}
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试 PDF 逐页光栅化")
+    print("=" * 60)
+    test_render_single_pages()
+    test_page_limit()
+    test_corrupt_and_empty_pdfs()
+    test_upload_rejects_invalid_pdfs()
+    test_upload_pins_pdf()
+    print("\n✅ 测试完成！")
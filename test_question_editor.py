@@ -0,0 +1,148 @@
+"""
+测试题目编辑
+验证合并、拆分、移动文本块只替换受影响的题目，并同步更新空间索引
+"""
+
+import time
+
+from src.document_store import DocumentStore
+from src.models import BoundingBox, Question, TextBlock
+from src.question_editor import QuestionEditor, EditError
+from src.question_splitter import QuestionSplitter
+
+
+def make_document(question_count: int = 3, blocks_per_question: int = 3):
+    """每道题占一段，每段包含若干行文本块"""
+    questions = []
+    for i in range(question_count):
+        question = Question(question_id=i + 1)
+        for j in range(blocks_per_question):
+            y = i * 400 + j * 50
+            question.add_text_block(TextBlock(text=f"{i + 1}-{j}", box=BoundingBox(50, y, 900, y + 40)))
+        questions.append(question)
+    return DocumentStore().put(questions, "a.png")
+
+
+def test_merge():
+    """合并后的题目使用第一道题的 ID 和位置，未受影响的题目对象不变"""
+    document = make_document(4)
+    editor = QuestionEditor(QuestionSplitter())
+    untouched = document.questions[1]
+
+    delta = editor.merge(document, [4, 3, 1])
+    print(f"合并结果: {delta.updated}, 删除: {delta.removed}")
+    assert [q.question_id for q in document.questions] == [1, 2]
+    assert delta.removed == [3, 4]
+    merged = delta.updated[0]
+    assert merged is document.questions[0] and document.questions[1] is untouched
+    assert merged.text.split('\n') == ['1-0', '1-1', '1-2', '3-0', '3-1', '3-2', '4-0', '4-1', '4-2']
+    assert merged.bounding_box.to_tuple() == (50, 0, 900, 1340)
+
+    # 空间索引随之更新
+    assert document.index.hit_test(100, 1220) == ([1], [9])
+    assert document.index.query_region(0, 0, 1000, 2000)[0] == [1, 2]
+
+    for ids in ([1], [1, 1], [1, 99]):
+        try:
+            editor.merge(document, ids)
+            assert False, "应该抛出 EditError"
+        except EditError:
+            pass
+
+
+def test_split():
+    """拆分后新题目排在原题目之后，使用新的 ID"""
+    document = make_document(2, 4)
+    editor = QuestionEditor(QuestionSplitter())
+    original = document.questions[0]
+
+    delta = editor.split(document, 1, 2)
+    head, tail = delta.updated
+    assert [q.question_id for q in document.questions] == [1, 3, 2]
+    assert head.text == '1-0\n1-1' and tail.text == '1-2\n1-3'
+    assert tail.bounding_box.to_tuple() == (50, 100, 900, 190)
+    assert original.text == '1-0\n1-1\n1-2\n1-3'  # 原对象不被修改
+    assert document.index.block_ids(tail) == [2, 3]
+    assert document.index.hit_test(100, 120) == ([3], [2])
+
+    # 不属于该题目的文本块、题目的第一个文本块、不存在的题目
+    for question_id, block in ((1, 5), (3, 2), (99, 0)):
+        try:
+            editor.split(document, question_id, block)
+            assert False, "应该抛出 EditError"
+        except EditError as e:
+            print(f"拆分被拒绝: {e}")
+
+
+def test_move_block():
+    """移动的文本块按阅读顺序插入目标题目，原题目为空时被删除"""
+    document = make_document(3, 2)
+    editor = QuestionEditor(QuestionSplitter())
+
+    delta = editor.move_block(document, 2, 1)
+    assert [q.question_id for q in delta.updated] == [2, 1]
+    assert document.questions[0].text == '1-0\n1-1\n2-0'
+    assert document.questions[1].text == '2-1'
+    assert document.index.block_questions[2] == 1
+
+    # 文本块排在目标题目原有文本块之前；原题目为空后被删除
+    delta = editor.move_block(document, 3, 3)
+    assert delta.removed == [2]
+    assert [q.question_id for q in document.questions] == [1, 3]
+    assert document.questions[1].text == '2-1\n3-0\n3-1'
+    assert document.index.hit_test(100, 460) == ([3], [3])
+
+    # 移到所在题目不产生变化
+    assert not editor.move_block(document, 3, 3).updated
+    try:
+        editor.move_block(document, 100, 1)
+        assert False, "应该抛出 EditError"
+    except EditError as e:
+        assert e.status_code == 404
+
+
+def test_move_into_merged_question():
+    """合并不相邻的题目后，移入的文本块仍按阅读顺序插入；题目边界框索引只替换变化的题目"""
+    document = make_document(3, 2)
+    editor = QuestionEditor(QuestionSplitter())
+
+    editor.merge(document, [1, 3])
+    assert document.index.block_ids(document.questions[0]) == [0, 1, 4, 5]
+    slots = len(document.index.question_ids)
+
+    editor.move_block(document, 3, 1)
+    merged = document.questions[0]
+    assert document.index.block_ids(merged) == [0, 1, 3, 4, 5]
+    assert merged.text == '1-0\n1-1\n2-1\n3-0\n3-1'
+    assert document.index.hit_test(100, 470) == ([1], [3])
+    # 题目 2 只剩第一行，位于合并后的题目内部，点选时面积小的题目在前
+    assert document.index.hit_test(100, 420) == ([2, 1], [2])
+
+    # 每次编辑只为变化的题目登记新的边界框
+    assert len(document.index.question_ids) == slots + 2
+    assert len(document.index.question_index) == 2
+
+
+def test_edit_cost():
+    """编辑的耗时与页面上的文本块总数基本无关"""
+    document = make_document(100, 50)
+    editor = QuestionEditor(QuestionSplitter())
+    start = time.perf_counter()
+    for i in range(50):
+        editor.merge(document, [document.questions[i].question_id, document.questions[i + 1].question_id])
+    elapsed = (time.perf_counter() - start) / 50
+    print(f"合并平均耗时: {elapsed * 1000:.2f} ms")
+    assert len(document.questions) == 50
+    assert elapsed < 0.05
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试题目编辑")
+    print("=" * 60)
+    test_merge()
+    test_split()
+    test_move_block()
+    test_move_into_merged_question()
+    test_edit_cost()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,102 @@
+"""
+测试题号分类器
+验证合并后的正则表达式与依次尝试每个模式的结果一致，能返回题号样式，并支持自定义模式
+"""
+
+import re
+
+from src.question_splitter import QuestionSplitter, QuestionNumberClassifier
+
+SAMPLES = [
+    "1. 这是第一道题目", "12、填空题", "3．选择题", "  (4) 括号题号", "（5）全角括号", "[6] 方括号",
+    "【7】实心方括号", "一、选择题", "十二. 解答题", "这是题目的正文", "A. 选项", "1 没有分隔符",
+    "(a) 字母", "", "   ", "2.", "（）空括号", "x1. 前缀", "\t8、 制表符开头",
+]
+
+
+def legacy_is_question_start(patterns, text):
+    """原实现：依次尝试每个模式（作为对照）"""
+    for pattern in [re.compile(p) for p in patterns]:
+        match = pattern.match(text.strip())
+        if match:
+            return True, match.group(1)
+    return False, None
+
+
+def test_default_patterns():
+    """默认模式：结果与逐个模式匹配一致，并返回样式名称"""
+    splitter = QuestionSplitter()
+    assert splitter.classifier._combined is not None
+    for text in SAMPLES:
+        assert splitter.is_question_start(text) == legacy_is_question_start(splitter.patterns, text), text
+
+    styles = {text: splitter.classify_question_number(text) for text in SAMPLES}
+    print(f"样式: { {t: m.style for t, m in styles.items() if m} }")
+    assert styles["1. 这是第一道题目"].style == 'arabic'
+    assert styles["（5）全角括号"].style == 'fullwidth_parenthesized'
+    assert styles["一、选择题"].number == '一' and styles["一、选择题"].style == 'chinese'
+    assert styles["\t8、 制表符开头"].end == 3
+    assert styles["这是题目的正文"] is None
+
+
+def test_custom_patterns():
+    """自定义模式：按顺序优先匹配，无法合并的模式退回依次匹配"""
+    patterns = [r'^Q(\d+)[:：]', r'^\s*(\d+)\)', r'^\s*(\d+)']
+    splitter = QuestionSplitter(patterns)
+    assert splitter.classifier._combined is not None
+    for text in ["Q3: 题目", "Q3 题目", "4) 题目", "  5 题目", "题目"]:
+        assert splitter.is_question_start(text) == legacy_is_question_start(patterns, text), text
+    assert splitter.classify_question_number("4) 题目").style == r'^\s*(\d+)\)'
+
+    # 包含反向引用和全局行内标志的模式不能合并（合并后标志会作用于其他模式）
+    for patterns in ([r'^(\d)(\d)\1'], [r'(?i)^part\s+(\d+)', r'^(\d+)\.'],
+                     [r'^(\d+)\.', r'(?i)^part\s+(\d+)', r'^Q(\d+)'], [r'(?a)^(\w+)\)']):
+        splitter = QuestionSplitter(patterns)
+        assert splitter.classifier._combined is None, patterns
+        for text in ["121", "122", "PART 3", "2. 题目", "Q3", "q3", "三) 题目"]:
+            assert splitter.is_question_start(text) == legacy_is_question_start(patterns, text), text
+
+    # 局部标志只作用于所在分组，可以合并
+    patterns = [r'^(?i:part)\s+(\d+)', r'^Q(\d+)']
+    splitter = QuestionSplitter(patterns)
+    assert splitter.classifier._combined is not None
+    for text in ["PART 3", "part 3", "Q3", "q3"]:
+        assert splitter.is_question_start(text) == legacy_is_question_start(patterns, text), text
+
+    try:
+        QuestionNumberClassifier([r'^\d+\.'])
+        assert False, "没有分组的模式应被拒绝"
+    except ValueError:
+        pass
+
+
+def test_false_positives():
+    """正文中的数字、括号和汉字数字不是题号，合并匹配与依次匹配的结果都为 None"""
+    texts = [
+        "第1题 选择题", "2024年高考真题", "100元 可以买几本书", "1 2 3 4", "(a) 字母选项", "(1 缺少右括号",
+        "（1) 括号不配对", "[x] 复选框", "【注】本题不计分", "一些学生参加了比赛", "十分钟后出发",
+        "A1. 带字母前缀", "题目1. 编号在后", "①. 圈号", "- 1. 列表项", "一 没有分隔符",
+    ]
+    splitter = QuestionSplitter()
+    fallback = QuestionNumberClassifier(splitter.patterns, splitter.classifier.styles)
+    fallback._combined = None
+    for text in texts:
+        assert splitter.classify_question_number(text) is None, text
+        assert splitter.classifier.number(text) is None, text
+        assert fallback.classify(text) is None and fallback.number(text) is None, text
+        assert legacy_is_question_start(splitter.patterns, text) == (False, None), text
+
+    # 正文中的题号不影响开头的判断，只识别开头的题号
+    match = splitter.classify_question_number("3. 计算 1. 和 (2) 的值")
+    assert match.number == '3' and match.end == 3
+    assert fallback.classify("3. 计算 1. 和 (2) 的值") == match
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试题号分类器")
+    print("=" * 60)
+    test_default_patterns()
+    test_custom_patterns()
+    test_false_positives()
+    print("\n✅ 测试完成！")
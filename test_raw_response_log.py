@@ -0,0 +1,111 @@
+"""
+测试原始响应保留策略
+验证压缩日志的写入、按结果 ID 读取、段文件滚动淘汰、重启后恢复索引，以及 OCRService 的接入
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from src.http_pool import PooledHTTPClient
+from src.ocr_cache import OCRCache
+from src.ocr_service import OCRService
+from src.raw_response_log import RawResponseLog, RETENTION_DROP, RETENTION_SPILL
+
+TEST_IMAGE = "test.png"
+
+
+def make_response(index: int) -> dict:
+    """构造测试用的原始响应（内容重复，便于压缩）"""
+    return {"id": f"resp-{index}", "choices": [{"message": {"content": "1. 题目内容 " * 200}}]}
+
+
+def test_append_and_get():
+    """写入后按结果 ID 读取，重启后索引依然有效，末尾不完整的记录被截断"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = RawResponseLog(Path(tmp))
+        log.append("a", make_response(1))
+        log.append("b", make_response(2))
+        log.append("a", make_response(3))
+
+        assert log.get("a")["id"] == "resp-3"
+        assert log.get("b") == make_response(2)
+        assert log.get("missing") is None
+
+        stats = log.get_stats()
+        print(f"日志统计: {stats}")
+        assert stats['records'] == 2 and stats['records_written'] == 3
+        assert stats['compressed_bytes'] * 10 < stats['raw_bytes']
+
+        # 模拟写入过程中进程退出：末尾只写入了部分记录
+        segment = next(Path(tmp).glob('*.log'))
+        with open(segment, 'ab') as f:
+            f.write(b'\x00\x01x\x00')
+
+        reloaded = RawResponseLog(Path(tmp))
+        assert reloaded.get("a")["id"] == "resp-3"
+        assert reloaded.get_stats()['disk_bytes'] == stats['disk_bytes']
+        reloaded.append("c", make_response(4))
+        assert reloaded.get("c")["id"] == "resp-4"
+
+
+def test_segment_eviction():
+    """超出容量时删除最早的段文件，只清理该段中的结果"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = RawResponseLog(Path(tmp), max_bytes=400, segment_bytes=200)
+        for i in range(10):
+            log.append(f"r{i}", make_response(i))
+
+        stats = log.get_stats()
+        print(f"淘汰后统计: {stats}")
+        assert stats['segments_removed'] >= 1
+        assert stats['disk_bytes'] <= 400
+        assert log.get("r0") is None
+        assert log.get("r9")["id"] == "resp-9"
+        assert len(list(Path(tmp).glob('*.log'))) == stats['segments']
+
+
+def test_service_retention():
+    """spill 策略下结果和缓存中不再保存原始响应，可以按结果 ID 读取；drop 策略直接丢弃"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"id": "resp", "choices": [{"message": {
+            "content": "<|ref|>text<|/ref|><|det|>[[1, 2, 3, 4]]<|/det|>\n1. 题目"
+        }}]})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = OCRService()
+        service.api_key = "test-key"
+        service.cache = OCRCache(None)
+        service.raw_response_retention = RETENTION_SPILL
+        service.raw_response_log = RawResponseLog(Path(tmp))
+        service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+
+        async def run():
+            try:
+                first = await service.recognize_image_async(TEST_IMAGE)
+                second = await service.recognize_image_async(TEST_IMAGE)
+                service.cache = OCRCache(None)
+                service.raw_response_retention = RETENTION_DROP
+                third = await service.recognize_image_async(TEST_IMAGE)
+                return first, second, third
+            finally:
+                await service.aclose()
+
+        first, second, third = asyncio.run(run())
+        assert first.raw_response is None and first.raw_response_id is not None
+        assert second.raw_response is None and second.raw_response_id == first.raw_response_id
+        assert service.get_raw_response(first.raw_response_id)["id"] == "resp"
+        assert third.raw_response is None and third.raw_response_id is None
+        assert service.get_raw_response_stats()['records_written'] == 1
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试原始响应保留策略")
+    print("=" * 60)
+    test_append_and_get()
+    test_segment_eviction()
+    test_service_retention()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,121 @@
+"""
+测试流式请求体
+验证按块生成的 JSON 请求体与一次性序列化的结果完全一致
+"""
+
+import asyncio
+import base64
+import json
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from src.request_body import StreamingJSONBody, IMAGE_PLACEHOLDER
+
+TEST_IMAGE = "test.png"
+
+
+def make_payload(url: str) -> dict:
+    """构造与 OCR 请求结构一致的请求体"""
+    return {
+        "model": "deepseek-ocr",
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "请识别图片中的所有文字"},
+                {"type": "image_url", "image_url": {"url": url}}
+            ]
+        }],
+        "stream": False
+    }
+
+
+def expected_body(raw: bytes, mime_type: str = "image/png") -> bytes:
+    """一次性序列化的请求体"""
+    url = f"data:{mime_type};base64,{base64.b64encode(raw).decode('ascii')}"
+    return json.dumps(make_payload(url)).encode('ascii')
+
+
+def test_file_body_matches_json():
+    """从文件按块编码的请求体与 json.dumps 的结果一致"""
+    raw = Path(TEST_IMAGE).read_bytes()
+    body = StreamingJSONBody(make_payload(IMAGE_PLACEHOLDER), "image/png",
+                             path=TEST_IMAGE, chunk_size=1000)
+    data = b''.join(body)
+    assert data == expected_body(raw)
+    assert len(body) == len(data)
+    assert body.headers['Content-Length'] == str(len(data))
+
+
+def test_bytes_body_all_remainders():
+    """各种长度的内存数据都能正确拼接 Base64（覆盖末尾填充的情况）"""
+    for size in range(0, 20):
+        raw = bytes(range(size))
+        body = StreamingJSONBody(make_payload(IMAGE_PLACEHOLDER), "image/png",
+                                 data=raw, chunk_size=6)
+        assert b''.join(body) == expected_body(raw)
+        assert len(body) == len(expected_body(raw))
+
+
+def test_read_interface():
+    """文件对象接口按指定大小读取，读完返回空字节串"""
+    raw = Path(TEST_IMAGE).read_bytes()
+    body = StreamingJSONBody(make_payload(IMAGE_PLACEHOLDER), "image/png", path=TEST_IMAGE)
+    parts = []
+    while True:
+        part = body.read(8192)
+        if not part:
+            break
+        assert len(part) <= 8192
+        parts.append(part)
+    assert b''.join(parts) == expected_body(raw)
+
+
+def test_async_iteration():
+    """异步迭代产出相同的请求体"""
+    raw = Path(TEST_IMAGE).read_bytes()
+
+    async def run():
+        body = StreamingJSONBody(make_payload(IMAGE_PLACEHOLDER), "image/png",
+                                 path=TEST_IMAGE, chunk_size=3000)
+        return b''.join([chunk async for chunk in body.aiter_bytes()])
+
+    assert asyncio.run(run()) == expected_body(raw)
+
+
+def test_httpx_sends_content_length():
+    """通过 httpx 发送时使用 Content-Length，服务端收到完整 JSON"""
+    received = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        received['headers'] = request.headers
+        received['body'] = await request.aread()
+        return httpx.Response(200, json={})
+
+    async def run(path: str):
+        body = StreamingJSONBody(make_payload(IMAGE_PLACEHOLDER), "image/png", path=path)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await client.post("http://ocr.test/v1", content=body.aiter_bytes(), headers=body.headers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'large.png'
+        raw = bytes(range(256)) * 4096  # 1 MB
+        path.write_bytes(raw)
+        asyncio.run(run(str(path)))
+
+    assert 'transfer-encoding' not in received['headers']
+    assert received['headers']['content-length'] == str(len(received['body']))
+    assert received['body'] == expected_body(raw)
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试流式请求体")
+    print("=" * 60)
+    test_file_body_matches_json()
+    test_bytes_body_all_remainders()
+    test_read_interface()
+    test_async_iteration()
+    test_httpx_sends_content_length()
+    print("\n✅ 测试完成！")
@@ -0,0 +1,133 @@
+"""
+测试文本块空间索引
+验证网格索引的点查询、框查询与逐个比较的结果一致，以及文档索引的题目命中和更新
+"""
+
+import random
+import time
+
+from src.document_store import DocumentStore
+from src.models import BoundingBox, Question, TextBlock
+from src.spatial_index import GridIndex, DocumentIndex
+
+
+def random_boxes(count: int, seed: int = 0):
+    """在 2480x3508 的页面上生成大小不一的矩形"""
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        x, y = rng.uniform(0, 2400), rng.uniform(0, 3400)
+        boxes.append((x, y, x + rng.uniform(5, 600), y + rng.uniform(5, 80)))
+    return boxes
+
+
+def test_grid_matches_brute_force():
+    """网格索引的结果与逐个比较一致"""
+    boxes = random_boxes(3000)
+    index = GridIndex(*zip(*boxes))
+    rng = random.Random(1)
+
+    for _ in range(200):
+        x, y = rng.uniform(-50, 2500), rng.uniform(-50, 3600)
+        expected = [i for i, (a, b, c, d) in enumerate(boxes) if a <= x <= c and b <= y <= d]
+        assert index.query_point(x, y) == expected
+
+        w, h = rng.uniform(0, 800), rng.uniform(0, 800)
+        expected = [i for i, (a, b, c, d) in enumerate(boxes) if a <= x + w and x <= c and b <= y + h and y <= d]
+        assert index.query_rect(x + w, y + h, x, y) == expected
+        expected = [i for i, (a, b, c, d) in enumerate(boxes) if x <= a and c <= x + w and y <= b and d <= y + h]
+        assert index.query_rect(x, y, x + w, y + h, contained=True) == expected
+
+    # 查询区域覆盖整页
+    assert index.query_rect(-1e9, -1e9, 1e9, 1e9) == list(range(len(boxes)))
+    assert GridIndex([], [], [], []).query_point(0, 0) == []
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        index.query_point(rng.uniform(0, 2480), rng.uniform(0, 3508))
+    elapsed = (time.perf_counter() - start) / 1000
+    print(f"点查询平均耗时: {elapsed * 1e6:.1f} us")
+    assert elapsed < 1e-3
+
+
+def test_document_index():
+    """点选返回最内层的题目，框选按文档顺序返回题目；替换题目后只更新变化的题目"""
+    questions = [
+        Question(question_id=1, text_blocks=[
+            TextBlock(text="1. 第一题", box=BoundingBox(50, 100, 900, 140)),
+            TextBlock(text="内容", box=BoundingBox(50, 150, 400, 190)),
+        ]),
+        Question(question_id=2, text_blocks=[
+            TextBlock(text="2. 第二题", box=BoundingBox(50, 300, 900, 340)),
+        ]),
+        Question(question_id=3),
+    ]
+    index = DocumentIndex(questions)
+
+    question_ids, blocks = index.hit_test(600, 170)
+    print(f"点选结果: {question_ids}, {blocks}")
+    assert question_ids == [1] and blocks == []
+    assert index.hit_test(100, 160) == ([1], [1])
+    assert index.hit_test(100, 250) == ([], [])
+
+    assert index.query_region(0, 130, 1000, 320) == ([1, 2], [0, 1, 2])
+    assert index.query_region(0, 130, 1000, 320, contained=True) == ([1], [1])
+
+    store = DocumentStore()
+    document = store.put(questions, "a.png")
+    assert document.index.hit_test(100, 320) == ([2], [2])
+
+    # 删除题目 2，题目 1 扩大到原题目 2 的位置，再添加一道新题
+    grown = Question(question_id=1, text_blocks=questions[0].text_blocks + questions[1].text_blocks)
+    added = Question(question_id=4, text_blocks=[TextBlock(text="4. 第四题", box=BoundingBox(50, 500, 900, 540))])
+    document.index.replace_questions([2], [grown, added])
+    assert document.index.hit_test(100, 320) == ([1], [2])
+    assert document.index.hit_test(100, 520) == ([4], [])
+    assert len(document.index.question_index) == 2
+    assert document.index.question_index.query_rect(0, 0, 1000, 1000) == [2, 3]
+
+    # 所有题目都被删除后，新登记的题目按自身大小重新选择网格
+    empty = DocumentIndex([])
+    empty.replace_questions([], [added])
+    assert empty.hit_test(100, 520) == ([4], [])
+    assert empty.hit_test(100, 560) == ([], [])
+
+def test_points_on_cell_borders():
+    """点和矩形边落在网格边界上时（含负坐标和浮点舍入），结果与逐个比较一致，边界包含在矩形内"""
+    def brute_force(boxes, x, y):
+        return [i for i, (a, b, c, d) in enumerate(boxes) if a <= x <= c and b <= y <= d]
+
+    boxes = [(0, 0, 10, 10), (10, 0, 20, 10), (0, 10, 10, 20), (-10, -10, 0, 0), (5, 5, 5, 5), (20, 20, 30, 30)]
+    index = GridIndex(*zip(*boxes), cell_size=10)
+    for x in range(-10, 31, 5):
+        for y in range(-10, 31, 5):
+            assert index.query_point(x, y) == brute_force(boxes, x, y), (x, y)
+    assert index.query_point(10, 10) == [0, 1, 2]
+    assert index.query_point(0, 0) == [0, 3]
+    # 宽高为 0 的查询区域落在网格边界上
+    assert index.query_rect(10, 0, 10, 20) == [0, 1, 2]
+    assert index.query_rect(20, 20, 20, 20) == [5]
+
+    # 网格边长为 0.1 时 0.3 / 0.1 向下取整为 2，登记和查询使用同一计算，结果一致
+    steps = [round(0.1 * k, 1) for k in range(11)]
+    boxes = [(a, b, a + 0.2, b + 0.3) for a in steps for b in steps]
+    index = GridIndex(*zip(*boxes), cell_size=0.1)
+    for x in steps:
+        for y in steps:
+            assert index.query_point(x, y) == brute_force(boxes, x, y), (x, y)
+
+    # 删除和添加后，边界上的点同样只返回现存的矩形
+    index.remove(0)
+    added = index.add(0.0, 0.0, 0.3, 0.3)
+    expected = [i + 1 for i in brute_force(boxes[1:], 0.3, 0.3)] + [added]
+    assert index.query_point(0.3, 0.3) == expected
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试文本块空间索引")
+    print("=" * 60)
+    test_grid_matches_brute_force()
+    test_document_index()
+    test_points_on_cell_borders()
+    print("\n✅ 测试完成！")
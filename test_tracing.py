@@ -0,0 +1,192 @@
+"""
+测试请求追踪
+验证阶段耗时汇总为 Server-Timing、OCR 请求记录首字节时间和 token 用量，
+以及响应头、调试信息和 JSONL 追踪日志
+"""
+
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from src.document_store import document_store
+from src.http_pool import PooledHTTPClient
+from src.metrics import MetricsRegistry
+from src.models import BoundingBox, Question, TextBlock
+from src.ocr_service import OCRService
+from src.tracing import Trace, TraceLog, current_trace, start_trace, end_trace
+
+TEST_IMAGE = "test.png"
+
+MOCK_CONTENT = (
+    "<|ref|>text<|/ref|><|det|>[[36, 25, 912, 185]]<|/det|>\n"
+    "1. 第一道题目"
+)
+
+
+def test_server_timing():
+    """同名阶段合并，附加 token 用量和总耗时；不合法的追踪 ID 被替换"""
+    trace = Trace(trace_id='bad id!')
+    assert trace.trace_id != 'bad id!' and len(trace.trace_id) == 32
+    assert Trace(trace_id='abcdef0123').trace_id == 'abcdef0123'
+
+    registry = MetricsRegistry(enabled=False)
+    token = start_trace(trace)
+    try:
+        assert current_trace() is trace
+        # 未启用指标时仍然记录到追踪中
+        with registry.stage('parse'):
+            pass
+        with registry.stage('parse'):
+            pass
+        try:
+            with registry.stage('split'):
+                raise ValueError("bad")
+        except ValueError:
+            pass
+        trace.add_usage({'prompt_tokens': 10, 'completion_tokens': 5, 'model': 'x'})
+        trace.add_usage({'prompt_tokens': 1})
+    finally:
+        end_trace(token)
+    assert current_trace() is None
+
+    header = trace.server_timing()
+    print(f"Server-Timing: {header}")
+    entries = header.split(', ')
+    assert entries[0].startswith('parse;dur=') and entries[0].endswith(';desc="x2"')
+    assert entries[1].startswith('split;dur=')
+    assert entries[2] == 'ocr_usage;desc="completion_tokens=5 prompt_tokens=11"'
+    assert entries[3].startswith('total;dur=')
+
+    data = trace.to_dict()
+    assert [span['name'] for span in data['spans']] == ['parse', 'parse', 'split']
+    assert data['spans'][2]['error'] == 'ValueError'
+    assert data['spans'][0]['start_ms'] >= 0
+
+
+def test_ocr_request_spans():
+    """OCR 请求记录请求耗时、首字节时间、Base64 编码耗时和 token 用量"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": MOCK_CONTENT}}],
+            "usage": {"prompt_tokens": 812, "completion_tokens": 64, "total_tokens": 876}
+        })
+
+    async def run():
+        service = OCRService()
+        service.api_key = "test-key"
+        service.cache = None
+        service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+        trace = Trace()
+        token = start_trace(trace)
+        try:
+            await service.recognize_image_async(TEST_IMAGE)
+        finally:
+            end_trace(token)
+            await service.aclose()
+        return trace
+
+    trace = asyncio.run(run())
+    summary = trace.summary()
+    print(f"阶段汇总: {summary}")
+    for name in ('preprocess', 'ocr_request', 'ocr_ttfb', 'encode', 'parse'):
+        assert name in summary, name
+    assert summary['ocr_ttfb']['duration_ms'] >= 50
+    assert summary['ocr_request']['duration_ms'] >= summary['ocr_ttfb']['duration_ms']
+    assert trace.usage == {'prompt_tokens': 812, 'completion_tokens': 64, 'total_tokens': 876}
+
+
+def test_stream_request_excludes_consumer_time():
+    """流式识别的请求耗时不包含调用方处理文本块的时间，调用方提前停止读取不计为错误"""
+    content = MOCK_CONTENT + "\n<|ref|>text<|/ref|><|det|>[[34, 680, 928, 997]]<|/det|>\n2. 第二道题目"
+
+    async def sse_body():
+        for i in range(0, len(content), 20):
+            chunk = {"choices": [{"delta": {"content": content[i:i + 20]}}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=sse_body(), headers={"content-type": "text/event-stream"})
+
+    async def run(stop_after_first: bool):
+        service = OCRService()
+        service.api_key = "test-key"
+        service.cache = None
+        service.http = PooledHTTPClient(timeout=5, async_transport=httpx.MockTransport(handler))
+        trace = Trace()
+        token = start_trace(trace)
+        try:
+            stream = service.recognize_image_stream(TEST_IMAGE)
+            async for event, _ in stream:
+                if event == 'block':
+                    await asyncio.sleep(0.2)
+                    if stop_after_first:
+                        break
+            await stream.aclose()
+        finally:
+            end_trace(token)
+            await service.aclose()
+        return [span for span in trace.spans if span.name == 'ocr_request']
+
+    spans = asyncio.run(run(False))
+    print(f"请求耗时: {spans[0].duration_ms:.1f} ms（调用方处理 2 个文本块共 400 ms）")
+    assert len(spans) == 1 and spans[0].error is None
+    assert spans[0].duration_ms < 200
+
+    spans = asyncio.run(run(True))
+    assert len(spans) == 1 and spans[0].error is None
+
+
+def test_middleware():
+    """响应头包含追踪 ID 和 Server-Timing，debug 时响应中包含追踪记录，并写入追踪日志"""
+    import backend_api
+
+    question = Question(question_id=1)
+    question.add_text_block(TextBlock(text="1. 题目", box=BoundingBox(10, 10, 200, 50)))
+    document = document_store.put([question], "page.png", (800, 600))
+
+    async def run(path: str, headers=None):
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_log = backend_api.trace_log
+        backend_api.trace_log = TraceLog(Path(tmp) / 'traces.jsonl')
+        try:
+            response = asyncio.run(run(f"/api/documents/{document.document_id}?debug=true",
+                                       {"X-Trace-Id": "client-trace-0001"}))
+            plain = asyncio.run(run(f"/api/documents/{document.document_id}"))
+            records = backend_api.trace_log.read()
+        finally:
+            backend_api.trace_log = original_log
+
+    assert response.status_code == 200
+    print(f"Server-Timing: {response.headers['server-timing']}")
+    assert response.headers['x-trace-id'] == 'client-trace-0001'
+    assert 'response;dur=' in response.headers['server-timing']
+    debug = response.json()['debug']
+    assert debug['trace_id'] == 'client-trace-0001'
+    assert [span['name'] for span in debug['spans']] == ['response']
+
+    assert plain.json()['debug'] is None
+    assert plain.headers['x-trace-id'] != 'client-trace-0001'
+
+    assert [r['trace_id'] for r in records] == ['client-trace-0001', plain.headers['x-trace-id']]
+    assert records[0]['status'] == 200 and records[0]['path'].endswith(document.document_id)
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试请求追踪")
+    print("=" * 60)
+    test_server_timing()
+    test_ocr_request_spans()
+    test_stream_request_excludes_consumer_time()
+    test_middleware()
+    print("\n✅ 测试完成！")
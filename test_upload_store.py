@@ -0,0 +1,272 @@
+"""
+测试上传文件存储
+验证单次读取完成校验和写入、按内容哈希去重，以及按超时和容量上限清理文件
+"""
+
+import io
+import time
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from src.upload_store import UploadStore, UploadRejected
+
+
+def make_png(color: str = 'white', size=(64, 32)) -> bytes:
+    """生成 PNG 图片内容"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class CountingReader(io.BytesIO):
+    """记录被读取字节数的文件对象"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def test_same_content_stored_once():
+    """相同内容只保存一份，不同内容的同名文件不会互相覆盖"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp), ttl=60, max_bytes=1024 * 1024)
+        first = store.ingest(io.BytesIO(make_png('white')))
+        again = store.ingest(io.BytesIO(make_png('white')))
+        other = store.ingest(io.BytesIO(make_png('black')))
+
+        assert first.path == again.path
+        assert first.path != other.path
+        assert first.path.suffix == '.png'
+        assert first.path.read_bytes() == make_png('white')
+        assert first.data == make_png('white')
+        assert first.mime_type == 'image/png'
+
+        stats = store.get_stats()
+        print(f"存储统计: {stats}")
+        assert stats['files'] == 2
+        assert stats['deduplicated'] == 1
+        assert not list(Path(tmp).glob('.*.tmp'))
+
+
+def test_upload_read_once():
+    """上传内容只被读取一次，读取字节数等于文件大小"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp))
+        data = make_png('white', size=(800, 600))
+        reader = CountingReader(data)
+        upload = store.ingest(reader, max_bytes=len(data))
+
+        assert reader.bytes_read == len(data)
+        assert upload.bytes_read == upload.size == len(data)
+        assert store.get_stats()['bytes_read'] == len(data)
+
+
+def test_rejects_early():
+    """格式不对或超出大小上限时立即停止读取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp))
+
+        reader = CountingReader(b"%PDF-1.7" + b"0" * (5 * 1024 * 1024))
+        try:
+            store.ingest(reader)
+            assert False, "非图片文件应被拒绝"
+        except UploadRejected as e:
+            assert e.status_code == 400
+        assert reader.bytes_read <= 1024 * 1024
+
+        data = make_png('white', size=(800, 600))
+        reader = CountingReader(data)
+        try:
+            store.ingest(reader, max_bytes=100)
+            assert False, "超出大小上限应被拒绝"
+        except UploadRejected as e:
+            assert e.status_code == 413
+        assert reader.bytes_read == 101
+
+        try:
+            store.ingest(io.BytesIO(make_png()[:40]))
+            assert False, "损坏的图片应被拒绝"
+        except UploadRejected:
+            pass
+
+        stats = store.get_stats()
+        assert stats['rejected'] == 3
+        assert stats['files'] == 0
+        assert not [path for path in Path(tmp).iterdir() if path.is_file()]
+
+
+def test_resolve_rejects_unknown_names():
+    """只能访问索引中的文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp), ttl=60, max_bytes=1024 * 1024)
+        path = store.ingest(io.BytesIO(make_png())).path
+
+        assert store.resolve(path.name) == path
+        assert store.resolve("../secret.png") is None
+        assert store.resolve("0" * 64 + ".png") is None
+
+
+def test_byte_budget_evicts_least_recently_used():
+    """超过容量上限时删除最久未使用的文件"""
+    images = [make_png(color) for color in ('red', 'green', 'blue')]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp), ttl=60, max_bytes=sum(len(d) for d in images) - 1)
+        first = store.ingest(io.BytesIO(images[0])).path
+        second = store.ingest(io.BytesIO(images[1])).path
+
+        # 访问第一个文件后，第二个文件成为最久未使用的
+        store.resolve(first.name)
+        third = store.ingest(io.BytesIO(images[2])).path
+
+        assert store.resolve(second.name) is None
+        assert not second.exists()
+        assert first.exists() and third.exists()
+        assert store.get_stats()['bytes'] == len(images[0]) + len(images[2])
+
+
+def test_sweep_removes_expired_files():
+    """后台清理删除超时未访问的文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp), ttl=0.1, max_bytes=1024 * 1024)
+        path = store.ingest(io.BytesIO(make_png())).path
+        time.sleep(0.15)
+
+        assert store.sweep() == 1
+        assert not path.exists()
+        assert store.get_stats()['expired'] == 1
+
+
+def test_pinned_files_are_kept():
+    """仍被引用的文件不会被超时清理或容量淘汰删除，引用解除后再清理"""
+    images = [make_png(color) for color in ('red', 'green', 'blue')]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp), ttl=60, max_bytes=sum(len(d) for d in images) - 1)
+        referenced = set()
+        store.add_pin_source(lambda: referenced)
+        first = store.ingest(io.BytesIO(images[0])).path
+        referenced.add(str(first))
+        second = store.ingest(io.BytesIO(images[1])).path
+
+        # 第一个文件最久未使用但仍被引用，淘汰第二个文件
+        store.ingest(io.BytesIO(images[2]))
+        assert first.exists() and not second.exists()
+
+        # 超时后仍被引用的文件保留，引用解除后被清理
+        store.ttl = 0
+        assert store.sweep() == 1
+        assert first.exists()
+        referenced.clear()
+        assert store.sweep() == 1
+        assert not first.exists()
+        assert store.get_stats()['files'] == 0
+
+
+def test_pin_sources_called_without_lock():
+    """收集被引用文件时不持有存储的锁（引用来源可能调用持有自身锁的模块）"""
+    images = [make_png(color) for color in ('red', 'green', 'blue')]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp), ttl=60, max_bytes=sum(len(d) for d in images) - 1)
+        locked = []
+
+        def source():
+            locked.append(store._lock.locked())
+            return ()
+
+        store.add_pin_source(source)
+        for data in images:
+            store.ingest(io.BytesIO(data))
+        store.ensure_previews(store.ingest(io.BytesIO(images[2])).path.name)
+        store.sweep()
+
+        print(f"引用来源调用次数: {len(locked)}")
+        assert locked and not any(locked)
+
+
+def test_index_restored_on_restart():
+    """重启后从存储目录恢复索引"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data = make_png()
+        path = UploadStore(Path(tmp)).ingest(io.BytesIO(data)).path
+        restored = UploadStore(Path(tmp))
+        assert restored.resolve(path.name) == path
+        assert restored.get_stats()['bytes'] == len(data)
+
+
+def test_preview_pyramid():
+    """按配置的宽度生成预览图，不放大小图，删除原图时一并删除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp), preview_widths=(512, 1024, 2048))
+        buffer = io.BytesIO()
+        Image.new('RGB', (1500, 3000), 'white').save(buffer, format='JPEG')
+        upload = store.ingest(io.BytesIO(buffer.getvalue()))
+        name = upload.path.name
+
+        store.ensure_previews(name, upload.data)
+        preview = store.get_preview(name, 512)
+        with Image.open(preview) as img:
+            assert img.size == (512, 1024)
+        with Image.open(store.get_preview(name, 1024)) as img:
+            assert img.size == (1024, 2048)
+
+        # 原图宽度小于 2048，返回原图
+        assert store.get_preview(name, 2048) == upload.path
+
+        stats = store.get_stats()
+        print(f"预览图统计: {stats}")
+        assert stats['previewed'] == 1
+        assert stats['bytes'] > upload.size
+
+        # 重启后预览图大小仍计入容量
+        assert UploadStore(Path(tmp), preview_widths=(512, 1024, 2048)).get_stats()['bytes'] == stats['bytes']
+
+        assert store.remove(name)
+        assert not preview.exists()
+        assert store.get_stats()['bytes'] == 0
+
+
+def test_ingest_pdf_and_generated_pages():
+    """PDF 直接写入磁盘不保留在内存中，服务端生成的页面图片按指定键保存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(Path(tmp))
+        data = b"%PDF-1.7\n" + b"0" * (3 * 1024 * 1024)
+        upload = store.ingest_pdf(io.BytesIO(data))
+        assert upload.path.suffix == '.pdf'
+        assert upload.data is None
+        assert upload.size == len(data)
+        assert upload.path.read_bytes() == data
+
+        try:
+            store.ingest_pdf(io.BytesIO(make_png()))
+            assert False, "图片不应作为 PDF 接收"
+        except UploadRejected:
+            pass
+
+        page_name = f"{'a' * 64}.png"
+        page = store.store(make_png('black'), page_name)
+        assert store.resolve(page_name) == page
+        assert store.get_stats()['bytes'] == len(data) + page.stat().st_size
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("测试上传文件存储")
+    print("=" * 60)
+    test_same_content_stored_once()
+    test_upload_read_once()
+    test_rejects_early()
+    test_resolve_rejects_unknown_names()
+    test_byte_budget_evicts_least_recently_used()
+    test_sweep_removes_expired_files()
+    test_pinned_files_are_kept()
+    test_pin_sources_called_without_lock()
+    test_index_restored_on_restart()
+    test_preview_pyramid()
+    test_ingest_pdf_and_generated_pages()
+    print("\n✅ 测试完成！")